@@ -2,36 +2,107 @@
 # Run with: python3 -m green_agent.api.a2a_interface
 # NOTE: go to http://localhost:8000/benchmark/info to see benchmark info 
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import Optional, Dict, List, Any
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List, Any, Callable, Iterable, Iterator, Literal, Tuple
+import asyncio
 import json
+import threading
 import uuid
-import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 from green_agent.main import RAIDGreenAgent
+from green_agent.api.events import EventBroker, encode
+from green_agent.api.job_queue import AssessmentQueue
+from green_agent.api.results_store import ACTIVE_STATUSES, ResultsStore
+from green_agent.evaluator.pipeline import PrefetchPipeline
+from green_agent.evaluator.scheduler import EvaluationScheduler
+from green_agent.evaluator.scorer import FixScore
+from green_agent.managers.command import cancel_scope
 
-# Store assessment results in memory (in production, use proper database)
-assessment_results = []
-active_assessments = {}
+# Assessments and their results, persisted in SQLite
+RESULTS_DIR = "data/assessment_results"
+# Opened by get_results_store() on first use, so importing the module creates no files
+_results_store: Optional[ResultsStore] = None
+_results_store_lock = threading.Lock()
 agent = RAIDGreenAgent()
+# Page sizes of /results and /bugs/list
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Last /leaderboard body served, reused until the leaderboard version changes
+leaderboard_cache: Dict[str, Any] = {"version": None, "body": None}
+# Parallel evaluation workers, created once the catalog is known
+scheduler: Optional[EvaluationScheduler] = None
+# Runners of the assessments queued in the results store
+assessment_queue: Optional[AssessmentQueue] = None
+# Evaluates submitted fixes when the scheduler is disabled
+fix_executor: Optional[ThreadPoolExecutor] = None
+# Concurrent evaluations of submitted fixes without the scheduler
+FIX_EXECUTOR_THREADS = 4
+# Fix submissions accepted per /evaluate/batch request
+MAX_BATCH_SIZE = 500
+# Finished batch jobs kept for clients to fetch (running ones are always kept)
+MAX_BATCH_JOBS = 100
+# Progress of running assessments, pushed to /events and /assess/{id}/events
+events = EventBroker()
+# Keep proxies from caching or buffering event streams
+EVENT_STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def get_results_store() -> ResultsStore:
+    """The results store in RESULTS_DIR, opened on first use"""
+    global _results_store
+    with _results_store_lock:
+        if _results_store is None:
+            _results_store = ResultsStore(f"{RESULTS_DIR}/results.db")
+        return _results_store
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global scheduler, assessment_queue, fix_executor
     # Startup
+    events.bind(asyncio.get_running_loop())
     if not agent.bugs_catalog:
-        agent.initialize_benchmark()
+        await asyncio.to_thread(agent.initialize_benchmark)
+    scheduler = EvaluationScheduler.from_config(agent.config, agent.config_path, agent.bugs_catalog)
+    if scheduler is None:
+        fix_executor = ThreadPoolExecutor(max_workers=FIX_EXECUTOR_THREADS, thread_name_prefix="evaluate")
     
     # Create results directory
-    Path("data/assessment_results").mkdir(parents=True, exist_ok=True)
+    Path(RESULTS_DIR).mkdir(parents=True, exist_ok=True)
+    
+    # Resume the assessments a previous process was running
+    assessment_queue = AssessmentQueue(get_results_store(), run_assessment,
+                                       runners=agent.config.get('queue', {}).get('runners', 1))
+    requeued = await asyncio.to_thread(assessment_queue.start)
+    if requeued:
+        print(f"Resuming {requeued} interrupted assessment(s)")
     
     yield
-    # Shutdown (if needed)
+    # Shutdown: running assessments stay queued for the next start
+    await asyncio.to_thread(assessment_queue.shutdown)
+    if fix_executor is not None:
+        fix_executor.shutdown(wait=False, cancel_futures=True)
+    if scheduler is not None:
+        await asyncio.to_thread(scheduler.shutdown)
+
+class EventStreamGZipMiddleware(GZipMiddleware):
+    """GZip that leaves event streams alone, since compressing buffers events until the stream ends"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/events"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
 
 app = FastAPI(title="RAID-AI Green Agent API", lifespan=lifespan)
+app.add_middleware(EventStreamGZipMiddleware, minimum_size=1024)
 
 class BugRequest(BaseModel):
     bug_index: int
@@ -41,11 +112,31 @@ class FixSubmission(BaseModel):
     fixed_files: Dict[str, str]  # filepath -> content
     patch: Optional[str] = None
 
+class BatchSubmission(BaseModel):
+    submissions: List[FixSubmission] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+@dataclass
+class BatchJob:
+    """Fixes of one /evaluate/batch request and the outcomes received so far"""
+    bug_indices: List[int]
+    created_at: str
+    outcomes: Dict[int, Dict] = field(default_factory=dict)  # Submission position -> score or error
+    
+    @property
+    def done(self) -> bool:
+        return len(self.outcomes) == len(self.bug_indices)
+
+batch_jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+batch_jobs_lock = threading.Lock()
+
 class AssessmentRequest(BaseModel):
     agent_id: str
     docker_image: Optional[str] = None
     config: Optional[Dict[str, Any]] = None
     bug_indices: Optional[List[int]] = None  # If not provided, run all bugs
+    # The agent's fix of each bug to score (bug_indices are taken from them); without
+    # fixes the assessment is a dry run of the unmodified checkouts, kept off the leaderboard
+    fixes: Optional[List[FixSubmission]] = None
 
 class AssessmentResult(BaseModel):
     assessment_id: str
@@ -60,6 +151,7 @@ class AssessmentResult(BaseModel):
     execution_time_seconds: float
     assessment_timestamp: str
     reproducible: bool = True
+    fix_submitted: bool = True  # False in a dry run
 
 @app.get("/")
 async def root():
@@ -75,9 +167,33 @@ async def get_benchmark_info():
     return agent.export_benchmark_info()
 
 @app.get("/bugs/list")
-async def list_bugs():
-    """List all bugs in the benchmark"""
-    return {"bugs": agent.bugs_catalog}
+def list_bugs(language: Optional[str] = None, framework: Optional[str] = None, project: Optional[str] = None,
+              cursor: int = Query(0, ge=0), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+              fmt: Literal["json", "ndjson"] = Query("json", alias="format")):
+    """List the bugs in the benchmark, a page at a time
+    
+    Each bug carries its bug_index. format=ndjson streams every matching
+    bug instead of one page.
+    """
+    def matching(start: int) -> Iterator[Dict]:
+        for bug_index in range(start, len(agent.bugs_catalog)):
+            bug = agent.bugs_catalog[bug_index]
+            if ((language is None or bug['language'] == language)
+                    and (framework is None or bug['framework'] == framework)
+                    and (project is None or bug['project'] == project)):
+                yield dict(bug, bug_index=bug_index)
+    
+    if fmt == "ndjson":
+        return ndjson_response(matching(0))
+    
+    bugs = []
+    next_cursor = None
+    for bug in matching(cursor):
+        if len(bugs) == limit:
+            next_cursor = bug['bug_index']
+            break
+        bugs.append(bug)
+    return {"bugs": bugs, "next_cursor": next_cursor}
 
 @app.get("/bugs/{bug_index}")
 async def get_bug(bug_index: int):
@@ -88,154 +204,371 @@ async def get_bug(bug_index: int):
     return bug
 
 @app.post("/assess")
-async def start_assessment(request: AssessmentRequest, background_tasks: BackgroundTasks):
+async def start_assessment(request: AssessmentRequest):
     """Start assessment of a purple agent - A2A Protocol endpoint"""
     assessment_id = str(uuid.uuid4())
+    fixes = None
+    if request.fixes is not None:
+        if request.bug_indices is not None:
+            raise HTTPException(status_code=422, detail="Pass either fixes or bug_indices")
+        bug_indices = [fix.bug_index for fix in request.fixes]
+        fixes = [fix.model_dump(exclude={"bug_index"}) for fix in request.fixes]
+    else:
+        bug_indices = request.bug_indices or list(range(len(agent.bugs_catalog)))
     
-    # Store assessment info
-    active_assessments[assessment_id] = {
-        "agent_id": request.agent_id,
-        "status": "running",
-        "started_at": datetime.now(timezone.utc).isoformat(),
-        "progress": {"completed": 0, "total": len(request.bug_indices) if request.bug_indices else len(agent.bugs_catalog)}
-    }
-    
-    # Run assessment in background
-    background_tasks.add_task(
-        run_assessment, 
-        assessment_id, 
-        request.agent_id, 
-        request.bug_indices or list(range(len(agent.bugs_catalog)))
+    # Queue the assessment; a runner picks it up, also after a restart
+    await asyncio.to_thread(
+        get_results_store().create_assessment,
+        assessment_id,
+        request.agent_id,
+        bug_indices,
+        datetime.now(timezone.utc).isoformat(),
+        fixes
     )
+    events.publish("assessment_queued", assessment_id=assessment_id, agent_id=request.agent_id,
+                   total=len(bug_indices))
+    assessment_queue.notify()
     
     return {
         "assessment_id": assessment_id,
-        "status": "started",
+        "status": "queued",
         "agent_id": request.agent_id,
-        "estimated_duration_minutes": (len(request.bug_indices) if request.bug_indices else len(agent.bugs_catalog)) * 10
+        "estimated_duration_minutes": len(bug_indices) * 10
     }
 
-async def run_assessment(assessment_id: str, agent_id: str, bug_indices: List[int]):
-    """Run assessment for a purple agent"""
+@app.delete("/assess/{assessment_id}")
+def cancel_assessment(assessment_id: str):
+    """Cancel a queued or running assessment, keeping the results of the bugs already evaluated"""
+    assessment_info = get_results_store().get_assessment(assessment_id)
+    if assessment_info is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    
+    cancelled = get_results_store().finish_assessment(assessment_id, "cancelled", datetime.now(timezone.utc).isoformat())
+    if not cancelled:
+        raise HTTPException(status_code=409, detail=f"Assessment already {get_results_store().get_assessment(assessment_id)['status']}")
+    
+    assessment_queue.stop(assessment_id)
+    events.publish("assessment_cancelled", assessment_id=assessment_id, agent_id=assessment_info["agent_id"])
+    return {"assessment_id": assessment_id, "status": "cancelled"}
+
+def run_assessment(assessment_id: str, agent_id: str, stop: threading.Event):
+    """Run assessment for a purple agent, on a runner thread of assessment_queue
+    
+    Only the bugs without a result are evaluated, so an assessment
+    interrupted by a restart continues where it stopped. Each bug is scored
+    with the fix submitted for it; an assessment without fixes is a dry run
+    whose results are flagged as such. When stop is set
+    (cancelled, or the server is shutting down) it returns without
+    finishing the assessment. Progress is published as bug_started, phase
+    and result events.
+    """
+    assessment_info = get_results_store().get_assessment(assessment_id)
+    total = assessment_info["progress"]["total"]
+    pending = get_results_store().pending_bugs(assessment_id)
+    events.publish("assessment_started", assessment_id=assessment_id, agent_id=agent_id, total=total,
+                   completed=assessment_info["progress"]["completed"])
+    started = set()
+    started_lock = threading.Lock()
+    
+    def bug_started(bug_index: int):
+        # Phases arrive from prefetch threads and the scheduler's relay thread
+        with started_lock:
+            if bug_index in started:
+                return
+            started.add(bug_index)
+        events.publish("bug_started", assessment_id=assessment_id, bug_index=bug_index)
+    
+    def on_phase(bug_index: int, phase: str):
+        bug_started(bug_index)
+        events.publish("phase", assessment_id=assessment_id, bug_index=bug_index, phase=phase)
+    
     try:
-        results = []
+        valid = [bug for bug in pending if agent.get_bug(bug[1])]
+        fix_submitted = {position: fix is not None for position, _, fix in valid}
         
-        for i, bug_index in enumerate(bug_indices):
-            # Update progress
-            active_assessments[assessment_id]["progress"]["completed"] = i
-            
-            # For demo purposes, simulate assessment with placeholder scores
-            # In real implementation, this would:
-            # 1. Deploy the purple agent via Docker
-            # 2. Send bug to purple agent
-            # 3. Receive fix from purple agent  
-            # 4. Evaluate fix using agent.evaluate_fix()
-            
-            bug = agent.get_bug(bug_index)
-            if not bug:
-                continue
-                
-            # Simulate assessment duration
-            time.sleep(2)  # Remove in production
-            
-            # Create mock result (replace with real evaluation)
-            result = AssessmentResult(
-                assessment_id=assessment_id,
-                agent_id=agent_id,
-                bug_index=bug_index,
-                bug_framework=bug['language'],
-                total_score=0.75,  # Would come from agent.evaluate_fix()
-                correctness_score=0.8,
-                code_quality_score=0.7,
-                efficiency_score=0.8,
-                minimal_change_score=0.7,
-                execution_time_seconds=45.0,
-                assessment_timestamp=datetime.now(timezone.utc).isoformat(),
-                reproducible=True
-            )
-            
-            results.append(result)
-            assessment_results.append(result)
+        with cancel_scope(stop):
+            for position, bug_index, score in evaluate_bugs(valid, on_phase, stop):
+                if stop.is_set():
+                    return
+                result = to_assessment_result(assessment_id, agent_id, bug_index, agent.get_bug(bug_index), score,
+                                              fix_submitted[position])
+                # Checkpoint: the bug is not evaluated again after a restart
+                completed = get_results_store().add_result(result.model_dump(), position)
+                # Memoized fixes report no phases
+                bug_started(bug_index)
+                events.publish("result", assessment_id=assessment_id, bug_index=bug_index,
+                               progress={"completed": completed, "total": total}, result=result.model_dump())
+        if stop.is_set():
+            return
         
-        # Mark assessment complete
-        active_assessments[assessment_id]["status"] = "completed"
-        active_assessments[assessment_id]["completed_at"] = datetime.now(timezone.utc).isoformat()
+        # Mark assessment complete, unless it was cancelled meanwhile
+        completed_at = datetime.now(timezone.utc).isoformat()
+        if not get_results_store().finish_assessment(assessment_id, "completed", completed_at):
+            return
         
-        # Save results to file for persistence
-        save_assessment_results(assessment_id, results)
+        # Export the results as JSON next to the store
+        save_assessment_results(assessment_id, get_results_store().results(assessment_id))
+        events.publish("assessment_completed", assessment_id=assessment_id, agent_id=agent_id,
+                       completed_at=completed_at, progress={"completed": total, "total": total})
         
     except Exception as e:
-        active_assessments[assessment_id]["status"] = "failed"
-        active_assessments[assessment_id]["error"] = str(e)
+        # Evaluations interrupted by stop fail with CommandCancelled
+        if stop.is_set():
+            return
+        if get_results_store().finish_assessment(assessment_id, "failed", error=str(e)):
+            events.publish("assessment_failed", assessment_id=assessment_id, agent_id=agent_id, error=str(e))
+
+def evaluate_bugs(bugs: List[Tuple[int, int, Optional[Dict]]], on_phase: Callable[[int, str], None],
+                  stop: threading.Event) -> Iterator[Tuple[int, int, FixScore]]:
+    """Yield (position, bug_index, score) for each (position, bug_index, fix), raising the first evaluation error
+    
+    fix holds the evaluate_fix arguments (fixed_files, patch) of the bug,
+    None to score the unmodified checkout.
+    With the scheduler (scheduler.enabled, the default), bugs are evaluated
+    in parallel worker processes and yielded as they finish. With it
+    disabled they are evaluated in this process one at a time in order,
+    with PrefetchPipeline checking out and building the next bugs while the
+    current one is tested. on_phase is called with (bug_index, phase) as
+    each evaluation step starts. Once stop is set no further bugs are
+    started, and the commands of the bugs being evaluated are stopped (in
+    the worker processes, with the scheduler).
+    """
+    def phases_of(bug_index: int) -> Callable[[str], None]:
+        return lambda phase: on_phase(bug_index, phase)
+    
+    if scheduler is not None:
+        futures = {scheduler.submit(bug_index, on_phase=phases_of(bug_index), **(fix or {})): (position, bug_index)
+                   for position, bug_index, fix in bugs}
+        try:
+            not_done = set(futures)
+            while not_done and not stop.is_set():
+                done, not_done = wait(not_done, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield futures[future] + (future.result(),)
+        finally:
+            # Queued bugs are dropped; running ones are stopped in their workers
+            for future in futures:
+                scheduler.cancel(future)
+        return
+    
+    def prepare(bug_index: int) -> Dict:
+        # Prefetch threads stop their commands along with the runner
+        with cancel_scope(stop):
+            return agent.prepare_bug(bug_index, phases_of(bug_index))
+    
+    lookahead = agent.config['evaluation'].get('prefetch_lookahead', 2)
+    # Checkouts prefetched for bugs that are never evaluated are released when the run ends
+    pipeline = PrefetchPipeline(prepare, lookahead, release=agent.release_prepared)
+    # The pipeline yields the bugs in the order given
+    prepared_bugs = pipeline.run([bug_index for _, bug_index, _ in bugs])
+    try:
+        for (position, _, fix), (bug_index, prepared, error) in zip(bugs, prepared_bugs):
+            if stop.is_set():
+                if prepared is not None:
+                    agent.release_prepared(prepared)
+                return
+            if error is not None:
+                raise error
+            score = agent.evaluate_fix(bug_index, prepared=prepared, on_phase=phases_of(bug_index), **(fix or {}))
+            yield position, bug_index, score
+    finally:
+        prepared_bugs.close()
+
+def to_assessment_result(assessment_id: str, agent_id: str, bug_index: int, bug: Dict,
+                         score: FixScore, fix_submitted: bool) -> AssessmentResult:
+    """Convert the evaluator's FixScore into the A2A result record"""
+    return AssessmentResult(
+        assessment_id=assessment_id,
+        agent_id=agent_id,
+        bug_index=bug_index,
+        bug_framework=bug['language'],
+        total_score=score.total_score,
+        correctness_score=score.correctness,
+        code_quality_score=score.code_quality,
+        efficiency_score=score.efficiency,
+        minimal_change_score=score.minimal_change,
+        execution_time_seconds=score.details['time_taken'],
+        assessment_timestamp=datetime.now(timezone.utc).isoformat(),
+        reproducible=True,
+        fix_submitted=fix_submitted
+    )
 
-def save_assessment_results(assessment_id: str, results: List[AssessmentResult]):
+def save_assessment_results(assessment_id: str, results: List[Dict]):
     """Save assessment results to JSON file"""
-    results_file = f"data/assessment_results/{assessment_id}.json"
+    results_file = f"{RESULTS_DIR}/{assessment_id}.json"
     with open(results_file, 'w') as f:
-        json.dump([result.model_dump() for result in results], f, indent=2)
+        json.dump(results, f, indent=2)
+
+# Store queries are blocking: these endpoints are plain functions so they run in the threadpool
 
 @app.get("/assess/{assessment_id}")
-async def get_assessment_status(assessment_id: str):
+def get_assessment_status(assessment_id: str):
     """Get assessment status and results"""
-    if assessment_id not in active_assessments:
+    assessment_info = get_results_store().get_assessment(assessment_id)
+    if assessment_info is None:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
-    assessment_info = active_assessments[assessment_id]
-    
     # If completed, include results
     if assessment_info["status"] == "completed":
-        results = [r for r in assessment_results if r.assessment_id == assessment_id]
-        assessment_info["results"] = [r.model_dump() for r in results]
+        assessment_info["results"] = get_results_store().results(assessment_id)
     
     return assessment_info
 
-@app.get("/leaderboard")
-async def get_leaderboard():
-    """Get current leaderboard rankings"""
-    # Group results by agent_id and calculate aggregate scores
-    agent_scores = {}
-    
-    for result in assessment_results:
-        agent_id = result.agent_id
-        if agent_id not in agent_scores:
-            agent_scores[agent_id] = {
-                "agent_id": agent_id,
-                "total_assessments": 0,
-                "avg_score": 0.0,
-                "bugs_fixed": 0,
-                "avg_execution_time": 0.0,
-                "last_assessment": result.assessment_timestamp
-            }
-        
-        agent_scores[agent_id]["total_assessments"] += 1
-        agent_scores[agent_id]["avg_score"] = (
-            agent_scores[agent_id]["avg_score"] * (agent_scores[agent_id]["total_assessments"] - 1) + 
-            result.total_score
-        ) / agent_scores[agent_id]["total_assessments"]
+@app.get("/assess/{assessment_id}/events")
+async def stream_assessment_events(assessment_id: str, request: Request):
+    """Server-Sent Events of one assessment, ending after it completes or fails
+    
+    Events: assessment_started, bug_started, phase, result, then
+    assessment_completed, assessment_failed or assessment_cancelled. Reconnecting clients get the events they missed
+    (Last-Event-ID); a finished assessment only sends its final event.
+    """
+    # Subscribe before reading the status, so that no event falls in between
+    subscriber = events.subscribe(assessment_id, _last_event_id(request))
+    assessment_info = await asyncio.to_thread(get_results_store().get_assessment, assessment_id)
+    if assessment_info is None or assessment_info["status"] not in ACTIVE_STATUSES:
+        events.unsubscribe(subscriber)
+        if assessment_info is None:
+            raise HTTPException(status_code=404, detail="Assessment not found")
         
-        if result.correctness_score > 0.8:
-            agent_scores[agent_id]["bugs_fixed"] += 1
+        final = dict(assessment_info, assessment_id=assessment_id)
+        final.pop("status")
+        body = encode({"id": None, "event": f"assessment_{assessment_info['status']}", "data": final})
+        return Response(body, media_type="text/event-stream")
     
-    # Sort by average score
-    leaderboard = sorted(agent_scores.values(), key=lambda x: x["avg_score"], reverse=True)
+    return StreamingResponse(events.stream(subscriber, until_terminal=True), media_type="text/event-stream",
+                             headers=EVENT_STREAM_HEADERS)
+
+@app.get("/events")
+async def stream_events(request: Request):
+    """Server-Sent Events of every assessment, including assessment_queued"""
+    subscriber = events.subscribe(None, _last_event_id(request))
+    return StreamingResponse(events.stream(subscriber), media_type="text/event-stream", headers=EVENT_STREAM_HEADERS)
+
+def _last_event_id(request: Request) -> Optional[int]:
+    try:
+        return int(request.headers["last-event-id"])
+    except (KeyError, ValueError):
+        return None
+
+@app.get("/leaderboard")
+def get_leaderboard(request: Request):
+    """Get current leaderboard rankings
+    
+    Served from the aggregates the store maintains per result. The ETag is
+    the leaderboard version, so clients revalidating an unchanged
+    leaderboard get a 304.
+    """
+    version, updated_at = get_results_store().leaderboard_version()
+    etag = f'"leaderboard-{version}"'
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    if leaderboard_cache["version"] != version:
+        version, updated_at, leaderboard = get_results_store().leaderboard()
+        etag = f'"leaderboard-{version}"'
+        leaderboard_cache.update(version=version, body={
+            "leaderboard": leaderboard,
+            "last_updated": updated_at or datetime.now(timezone.utc).isoformat()
+        })
     
-    return {"leaderboard": leaderboard, "last_updated": datetime.now(timezone.utc).isoformat()}
+    return JSONResponse(leaderboard_cache["body"], headers={"ETag": etag, "Cache-Control": "no-cache"})
 
 @app.get("/results")
-async def get_all_results():
-    """Get all assessment results for analysis"""
-    return {"results": [r.model_dump() for r in assessment_results]}
+def get_all_results(agent_id: Optional[str] = None, language: Optional[str] = None,
+                    assessment_id: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                    cursor: Optional[int] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    order: Literal["asc", "desc"] = "asc",
+                    fmt: Literal["json", "ndjson"] = Query("json", alias="format")):
+    """Get assessment results for analysis, a page at a time
+    
+    Filters combine; since/until bound the result timestamps (ISO 8601).
+    Pass next_cursor back as cursor for the next page. format=ndjson
+    streams every matching result, read from the store page by page.
+    """
+    filters = dict(agent_id=agent_id, language=language, assessment_id=assessment_id, since=since,
+                   until=until, descending=order == "desc")
+    if fmt == "ndjson":
+        return ndjson_response(get_results_store().iter_results(**filters))
+    
+    results, next_cursor = get_results_store().query_results(cursor=cursor, limit=limit, **filters)
+    return {"results": results, "next_cursor": next_cursor}
+
+def ndjson_response(records: Iterable[Dict]) -> StreamingResponse:
+    """Stream records as newline-delimited JSON without holding them all in memory"""
+    return StreamingResponse((json.dumps(record) + "\n" for record in records), media_type="application/x-ndjson")
 
 @app.post("/evaluate")
 async def evaluate_fix(submission: FixSubmission):
-    """Legacy evaluate endpoint for compatibility"""
-    # This would evaluate the submitted fix
-    # For now, just return placeholder
-    return {
-        "bug_index": submission.bug_index,
-        "status": "received", 
-        "message": "Use /assess endpoint for full A2A protocol assessment"
-    }
+    """Evaluate one fix and return its FixScore; /evaluate/batch takes many at once
+    
+    Awaits the evaluation on the event loop instead of holding a threadpool
+    thread for its whole duration.
+    """
+    if not agent.get_bug(submission.bug_index):
+        raise HTTPException(status_code=404, detail="Bug not found")
+    
+    score = await asyncio.wrap_future(submit_fix(submission))
+    return {"bug_index": submission.bug_index, "score": asdict(score)}
+
+@app.post("/evaluate/batch")
+def submit_batch(batch: BatchSubmission):
+    """Evaluate many fixes concurrently; fetch their scores from GET /evaluate/batch/{job_id}"""
+    unknown = [submission.bug_index for submission in batch.submissions if not agent.get_bug(submission.bug_index)]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Bugs not found: {unknown}")
+    
+    job_id = str(uuid.uuid4())
+    job = BatchJob([submission.bug_index for submission in batch.submissions], datetime.now(timezone.utc).isoformat())
+    with batch_jobs_lock:
+        batch_jobs[job_id] = job
+        evict_batch_jobs()
+    
+    for position, submission in enumerate(batch.submissions):
+        future = submit_fix(submission)
+        future.add_done_callback(lambda f, position=position: record_batch_outcome(job, position, f))
+    
+    return {"job_id": job_id, "status": "running", "total": len(job.bug_indices)}
+
+@app.get("/evaluate/batch/{job_id}")
+def get_batch(job_id: str):
+    """Progress of a batch job, and every submission's score (or error) once all are evaluated"""
+    with batch_jobs_lock:
+        job = batch_jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Batch job not found")
+        info = {
+            "job_id": job_id,
+            "status": "completed" if job.done else "running",
+            "created_at": job.created_at,
+            "progress": {"completed": len(job.outcomes), "total": len(job.bug_indices)}
+        }
+        if job.done:
+            # In submission order
+            info["results"] = [job.outcomes[position] for position in range(len(job.bug_indices))]
+    return info
+
+def submit_fix(submission: FixSubmission) -> Future:
+    """Start evaluating a fix; the future resolves to its FixScore"""
+    kwargs = dict(fixed_files=submission.fixed_files, patch=submission.patch)
+    if scheduler is not None:
+        return scheduler.submit(submission.bug_index, **kwargs)
+    return fix_executor.submit(agent.evaluate_fix, submission.bug_index, **kwargs)
+
+def record_batch_outcome(job: BatchJob, position: int, future: Future):
+    bug_index = job.bug_indices[position]
+    try:
+        outcome = {"bug_index": bug_index, "score": asdict(future.result())}
+    except BaseException as e:
+        # Including CancelledError when the server shuts down
+        outcome = {"bug_index": bug_index, "error": str(e) or type(e).__name__}
+    with batch_jobs_lock:
+        job.outcomes[position] = outcome
+
+def evict_batch_jobs():
+    """Drop the oldest finished jobs beyond MAX_BATCH_JOBS (caller holds batch_jobs_lock)"""
+    finished = [job_id for job_id, job in batch_jobs.items() if job.done]
+    for job_id in finished[:max(0, len(finished) - MAX_BATCH_JOBS)]:
+        del batch_jobs[job_id]
 
 @app.get("/dashboard")
 async def dashboard():
@@ -0,0 +1,115 @@
+"""Assessment progress events, pushed to Server-Sent Events subscribers"""
+import asyncio
+import json
+from collections import deque
+from typing import AsyncIterator, Dict, Optional, Set
+
+# Events kept for subscribers that reconnect with Last-Event-ID
+HISTORY_SIZE = 1000
+# Undelivered events a subscriber may fall behind by before it is disconnected
+SUBSCRIBER_BACKLOG = 1000
+# Idle time after which a comment is sent so proxies keep the stream open
+KEEPALIVE_SECONDS = 15
+
+# Events after which an assessment sends nothing more
+TERMINAL_EVENTS = ("assessment_completed", "assessment_failed", "assessment_cancelled")
+
+class _Subscriber:
+    def __init__(self, assessment_id: Optional[str]):
+        self.assessment_id = assessment_id
+        self.queue: asyncio.Queue = asyncio.Queue(SUBSCRIBER_BACKLOG)
+        self.overflowed = False
+
+    def wants(self, event: Dict) -> bool:
+        return self.assessment_id is None or event["data"].get("assessment_id") == self.assessment_id
+
+class EventBroker:
+    """Fans events out to the subscribers of one assessment or of all of them
+
+    publish() may be called from any thread; delivery happens on the event
+    loop passed to bind(). Every event gets an increasing id, and the last
+    HISTORY_SIZE events are replayed to a subscriber that reconnects with
+    the id of the last event it saw. A subscriber that falls
+    SUBSCRIBER_BACKLOG events behind is disconnected instead of buffering
+    without bound; it catches up from the history when it reconnects.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[_Subscriber] = set()
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._next_id = 1
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def publish(self, event_type: str, **data):
+        """Send an event to the interested subscribers; dropped when no loop is bound"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._deliver, event_type, data)
+        except RuntimeError:
+            # Loop closed during shutdown
+            pass
+
+    def subscribe(self, assessment_id: Optional[str] = None, last_event_id: Optional[int] = None) -> _Subscriber:
+        """Register a subscriber, queueing the missed events still in the history (call on the loop)"""
+        subscriber = _Subscriber(assessment_id)
+        if last_event_id is not None:
+            for event in self._history:
+                if event["id"] > last_event_id and subscriber.wants(event):
+                    self._offer(subscriber, event)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        self._subscribers.discard(subscriber)
+
+    async def stream(self, subscriber: _Subscriber, until_terminal: bool = False) -> AsyncIterator[str]:
+        """SSE-encoded events of a subscriber, which is unsubscribed when the stream ends
+
+        With until_terminal the stream ends after the final event of the
+        subscriber's assessment. Must be iterated on the bound loop.
+        """
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield encode(event)
+                if until_terminal and event["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _deliver(self, event_type: str, data: Dict):
+        # Ids are assigned on the loop so that they increase in delivery order
+        event = {"id": self._next_id, "event": event_type, "data": data}
+        self._next_id += 1
+        self._history.append(event)
+        for subscriber in list(self._subscribers):
+            if subscriber.wants(event):
+                self._offer(subscriber, event)
+
+    def _offer(self, subscriber: _Subscriber, event: Dict):
+        if subscriber.overflowed:
+            return
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Make room for the end-of-stream marker; the client reconnects and replays
+            subscriber.overflowed = True
+            subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(None)
+            self._subscribers.discard(subscriber)
+
+def encode(event: Dict) -> str:
+    """One event in text/event-stream framing; events without an id do not move Last-Event-ID"""
+    event_id = f"id: {event['id']}\n" if event.get("id") is not None else ""
+    return f"{event_id}event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
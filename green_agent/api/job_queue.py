@@ -0,0 +1,94 @@
+"""Runners that work through the assessments queued in the results store"""
+import threading
+from typing import Callable, Dict, List
+
+from green_agent.api.results_store import ResultsStore
+
+# run(assessment_id, agent_id, stop): evaluate the assessment's pending bugs until done or stop is set
+AssessmentRun = Callable[[str, str, threading.Event], None]
+
+class AssessmentQueue:
+    """Runs queued assessments on a fixed number of runner threads
+
+    The queue itself lives in the results store, so it survives restarts:
+    start() first requeues the assessments a previous process left running,
+    and they resume with the bugs that have no result yet. The runners only
+    orchestrate; evaluations happen in the scheduler's worker processes.
+
+    Stopping an assessment (cancel, or shutdown) sets the event passed to
+    its run, which is expected to return promptly without finishing it and
+    to stop the evaluations it has running, in this process or in workers.
+    """
+
+    def __init__(self, store: ResultsStore, run: AssessmentRun, runners: int = 1):
+        self.store = store
+        self.run = run
+        self.runners = max(1, runners)
+        self._wake = threading.Condition()
+        self._pending_wakeups = 0
+        self._stopping = False
+        self._running: Dict[str, threading.Event] = {}
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> int:
+        """Start the runners; returns how many interrupted assessments were requeued"""
+        requeued = self.store.requeue_interrupted()
+        for number in range(self.runners):
+            thread = threading.Thread(target=self._work, name=f"assessment-runner-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.notify()
+        return requeued
+
+    def notify(self):
+        """Wake the runners after an assessment was queued"""
+        with self._wake:
+            self._pending_wakeups = self.runners
+            self._wake.notify_all()
+
+    def stop(self, assessment_id: str) -> bool:
+        """Stop a running assessment; False if no runner is working on it"""
+        with self._wake:
+            event = self._running.get(assessment_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    def shutdown(self):
+        """Stop every running assessment, leaving them queued for the next start()"""
+        with self._wake:
+            self._stopping = True
+            events = list(self._running.values())
+            self._wake.notify_all()
+        for event in events:
+            event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self):
+        while True:
+            with self._wake:
+                while not self._stopping and not self._pending_wakeups:
+                    self._wake.wait()
+                if self._stopping:
+                    return
+                self._pending_wakeups -= 1
+
+            # Drain the queue, then sleep until the next notify()
+            while True:
+                with self._wake:
+                    if self._stopping:
+                        return
+                    claimed = self.store.claim_assessment()
+                    if claimed is None:
+                        break
+                    assessment_id, agent_id = claimed
+                    stop = threading.Event()
+                    self._running[assessment_id] = stop
+                try:
+                    self.run(assessment_id, agent_id, stop)
+                finally:
+                    with self._wake:
+                        del self._running[assessment_id]
@@ -0,0 +1,341 @@
+"""SQLite store of assessments and their per-bug results"""
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    assessment_id TEXT PRIMARY KEY,
+    agent_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    completed_at TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS assessments_agent ON assessments (agent_id);
+CREATE INDEX IF NOT EXISTS assessments_started ON assessments (started_at);
+CREATE INDEX IF NOT EXISTS assessments_status ON assessments (status);
+
+CREATE TABLE IF NOT EXISTS assessment_bugs (
+    assessment_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    bug_index INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    fix TEXT,
+    PRIMARY KEY (assessment_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    assessment_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    bug_index INTEGER NOT NULL,
+    bug_framework TEXT NOT NULL,
+    total_score REAL NOT NULL,
+    correctness_score REAL NOT NULL,
+    code_quality_score REAL NOT NULL,
+    efficiency_score REAL NOT NULL,
+    minimal_change_score REAL NOT NULL,
+    execution_time_seconds REAL NOT NULL,
+    assessment_timestamp TEXT NOT NULL,
+    reproducible INTEGER NOT NULL,
+    fix_submitted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_assessment ON results (assessment_id);
+CREATE INDEX IF NOT EXISTS results_agent ON results (agent_id);
+CREATE INDEX IF NOT EXISTS results_timestamp ON results (assessment_timestamp);
+
+CREATE TABLE IF NOT EXISTS agent_stats (
+    agent_id TEXT PRIMARY KEY,
+    total_assessments INTEGER NOT NULL,
+    avg_score REAL NOT NULL,
+    bugs_fixed INTEGER NOT NULL,
+    avg_execution_time REAL NOT NULL,
+    last_assessment TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leaderboard_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    updated_at TEXT
+);
+"""
+
+# Results with a higher correctness count as fixed bugs on the leaderboard
+FIXED_THRESHOLD = 0.8
+
+# Assessments waiting for or being worked on by a runner
+ACTIVE_STATUSES = ("queued", "running")
+
+# Columns of a result row, in AssessmentResult field order
+RESULT_FIELDS = [
+    "assessment_id", "agent_id", "bug_index", "bug_framework", "total_score", "correctness_score",
+    "code_quality_score", "efficiency_score", "minimal_change_score", "execution_time_seconds",
+    "assessment_timestamp", "reproducible", "fix_submitted"
+]
+
+class ResultsStore:
+    """Assessments and their results, persisted across restarts
+
+    Nothing is kept in memory: every read is an indexed query, so memory
+    use and lookup latency do not grow with the history. Per-agent
+    leaderboard aggregates are updated in the transaction that inserts a
+    result, which also bumps the leaderboard version. Only results of
+    submitted fixes count: a dry run, which scores the unmodified
+    checkouts, is stored with fix_submitted unset and kept off the
+    leaderboard.
+
+    The store doubles as the durable queue of assessments: they are
+    created "queued", claimed as "running", and end "completed", "failed"
+    or "cancelled". Each bug of an assessment is checked off in the
+    transaction that stores its result, so an interrupted assessment can
+    resume with the bugs that have none.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            _add_column(conn, "assessment_bugs", "fix", "TEXT")
+            # Results stored before fixes could be submitted scored the unmodified checkouts
+            unflagged = _add_column(conn, "results", "fix_submitted", "INTEGER NOT NULL DEFAULT 0")
+            if unflagged or conn.execute("SELECT 1 FROM leaderboard_version").fetchone() is None:
+                # New database, or one written before the aggregates or the flag existed
+                conn.execute("DELETE FROM agent_stats")
+                conn.execute(
+                    "INSERT INTO agent_stats SELECT agent_id, COUNT(*), AVG(total_score), "
+                    f"SUM(correctness_score > {FIXED_THRESHOLD}), AVG(execution_time_seconds), "
+                    "MAX(assessment_timestamp) FROM results WHERE fix_submitted GROUP BY agent_id"
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO leaderboard_version SELECT 1, "
+                    "(SELECT COALESCE(MAX(version), 0) + 1 FROM leaderboard_version), "
+                    "MAX(assessment_timestamp) FROM results WHERE fix_submitted"
+                )
+
+    def create_assessment(self, assessment_id: str, agent_id: str, bug_indices: List[int], started_at: str,
+                          fixes: Optional[List[Dict]] = None):
+        """Queue an assessment of the given bugs
+
+        Args:
+            fixes: evaluate_fix arguments (fixed_files, patch) of each bug,
+                in bug_indices order; None for a dry run of the unmodified
+                checkouts
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO assessments (assessment_id, agent_id, status, started_at, total) "
+                "VALUES (?, ?, 'queued', ?, ?)",
+                (assessment_id, agent_id, started_at, len(bug_indices))
+            )
+            conn.executemany(
+                "INSERT INTO assessment_bugs (assessment_id, position, bug_index, fix) VALUES (?, ?, ?, ?)",
+                [(assessment_id, position, bug_index, json.dumps(fixes[position]) if fixes else None)
+                 for position, bug_index in enumerate(bug_indices)]
+            )
+
+    def claim_assessment(self) -> Optional[Tuple[str, str]]:
+        """Mark the oldest queued assessment running and return (assessment_id, agent_id), None if none is queued"""
+        with self._connect() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT assessment_id, agent_id FROM assessments WHERE status = 'queued' "
+                    "ORDER BY started_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                claimed = conn.execute(
+                    "UPDATE assessments SET status = 'running' WHERE assessment_id = ? AND status = 'queued'",
+                    (row["assessment_id"],)
+                ).rowcount
+                if claimed:
+                    return row["assessment_id"], row["agent_id"]
+
+    def requeue_interrupted(self) -> int:
+        """Queue again the assessments left running by a previous process; returns how many"""
+        with self._connect() as conn:
+            return conn.execute("UPDATE assessments SET status = 'queued' WHERE status = 'running'").rowcount
+
+    def pending_bugs(self, assessment_id: str) -> List[Tuple[int, int, Optional[Dict]]]:
+        """(position, bug_index, fix) of the bugs of an assessment that have no result yet, in submission order
+
+        fix holds the evaluate_fix arguments stored by create_assessment,
+        None in a dry run.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT position, bug_index, fix FROM assessment_bugs "
+                "WHERE assessment_id = ? AND NOT done ORDER BY position",
+                (assessment_id,)
+            ).fetchall()
+        return [(row["position"], row["bug_index"], json.loads(row["fix"]) if row["fix"] else None) for row in rows]
+
+    def add_result(self, result: Dict, position: int) -> int:
+        """Insert the result of the bug at position, check it off and return the assessment's completed count"""
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO results ({', '.join(RESULT_FIELDS)}) VALUES ({', '.join('?' * len(RESULT_FIELDS))})",
+                [result[name] for name in RESULT_FIELDS]
+            )
+            conn.execute(
+                "UPDATE assessment_bugs SET done = 1 WHERE assessment_id = ? AND position = ?",
+                (result["assessment_id"], position)
+            )
+            conn.execute(
+                "UPDATE assessments SET completed = completed + 1 WHERE assessment_id = ?",
+                (result["assessment_id"],)
+            )
+            if result["fix_submitted"]:
+                # Running means: SET expressions see the row's values before the update
+                conn.execute(
+                    "INSERT INTO agent_stats VALUES (?, 1, ?, ?, ?, ?) "
+                    "ON CONFLICT (agent_id) DO UPDATE SET "
+                    "total_assessments = total_assessments + 1, "
+                    "avg_score = avg_score + (excluded.avg_score - avg_score) / (total_assessments + 1), "
+                    "bugs_fixed = bugs_fixed + excluded.bugs_fixed, "
+                    "avg_execution_time = avg_execution_time "
+                    "+ (excluded.avg_execution_time - avg_execution_time) / (total_assessments + 1), "
+                    "last_assessment = MAX(last_assessment, excluded.last_assessment)",
+                    (result["agent_id"], result["total_score"], int(result["correctness_score"] > FIXED_THRESHOLD),
+                     result["execution_time_seconds"], result["assessment_timestamp"])
+                )
+                conn.execute(
+                    "UPDATE leaderboard_version SET version = version + 1, updated_at = ? WHERE id = 1",
+                    (result["assessment_timestamp"],)
+                )
+            return conn.execute(
+                "SELECT completed FROM assessments WHERE assessment_id = ?",
+                (result["assessment_id"],)
+            ).fetchone()["completed"]
+
+    def finish_assessment(self, assessment_id: str, status: str, completed_at: Optional[str] = None,
+                          error: Optional[str] = None) -> bool:
+        """Move an active assessment to its final status; False if it already had one (e.g. cancelled)"""
+        with self._connect() as conn:
+            if status == "completed":
+                query = "UPDATE assessments SET status = ?, completed_at = ?, completed = total WHERE assessment_id = ?"
+                params = (status, completed_at, assessment_id)
+            else:
+                query = "UPDATE assessments SET status = ?, completed_at = ?, error = ? WHERE assessment_id = ?"
+                params = (status, completed_at, error, assessment_id)
+            return conn.execute(query + " AND status IN ('queued', 'running')", params).rowcount > 0
+
+    def get_assessment(self, assessment_id: str) -> Optional[Dict]:
+        """Status record of an assessment, in the shape of GET /assess/{id}"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT agent_id, status, started_at, completed_at, completed, total, error "
+                "FROM assessments WHERE assessment_id = ?",
+                (assessment_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        info = {
+            "agent_id": row["agent_id"],
+            "status": row["status"],
+            "started_at": row["started_at"],
+            "progress": {"completed": row["completed"], "total": row["total"]}
+        }
+        if row["completed_at"] is not None:
+            info["completed_at"] = row["completed_at"]
+        if row["error"] is not None:
+            info["error"] = row["error"]
+        return info
+
+    def results(self, assessment_id: Optional[str] = None) -> List[Dict]:
+        """Results in insertion order, of one assessment or of all of them"""
+        query = f"SELECT {', '.join(RESULT_FIELDS)} FROM results"
+        params = ()
+        if assessment_id is not None:
+            query += " WHERE assessment_id = ?"
+            params = (assessment_id,)
+        with self._connect() as conn:
+            return [_result(row) for row in conn.execute(query + " ORDER BY id", params)]
+
+    def query_results(self, agent_id: Optional[str] = None, language: Optional[str] = None,
+                      assessment_id: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None, cursor: Optional[int] = None, limit: int = 100,
+                      descending: bool = False) -> Tuple[List[Dict], Optional[int]]:
+        """One page of results matching the filters
+
+        Args:
+            since, until: Range of assessment_timestamp (ISO 8601, until exclusive)
+            cursor: next_cursor of the previous page, None for the first one
+            descending: Newest results first
+
+        Returns:
+            (results, next_cursor), next_cursor None on the last page
+        """
+        filters = [
+            ("agent_id = ?", agent_id),
+            ("bug_framework = ?", language),
+            ("assessment_id = ?", assessment_id),
+            ("assessment_timestamp >= ?", since),
+            ("assessment_timestamp < ?", until),
+            ("id < ?" if descending else "id > ?", cursor)
+        ]
+        clauses = [clause for clause, value in filters if value is not None]
+        params = [value for _, value in filters if value is not None]
+
+        query = f"SELECT id, {', '.join(RESULT_FIELDS)} FROM results"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?"
+        with self._connect() as conn:
+            # One extra row tells whether another page follows
+            rows = conn.execute(query, params + [limit + 1]).fetchall()
+
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return [_result(row) for row in rows[:limit]], next_cursor
+
+    def iter_results(self, page_size: int = 500, **filters) -> Iterator[Dict]:
+        """All results matching the filters of query_results, read one page at a time"""
+        cursor = None
+        while True:
+            page, cursor = self.query_results(cursor=cursor, limit=page_size, **filters)
+            yield from page
+            if cursor is None:
+                return
+
+    def leaderboard_version(self) -> Tuple[int, Optional[str]]:
+        """(version, time of the last result), changing whenever the leaderboard does"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT version, updated_at FROM leaderboard_version WHERE id = 1").fetchone()
+        return row["version"], row["updated_at"]
+
+    def leaderboard(self) -> Tuple[int, Optional[str], List[Dict]]:
+        """Per-agent aggregates by descending average score, with the version they belong to"""
+        with self._connect() as conn:
+            version = conn.execute("SELECT version, updated_at FROM leaderboard_version WHERE id = 1").fetchone()
+            rows = conn.execute("SELECT * FROM agent_stats ORDER BY avg_score DESC").fetchall()
+        return version["version"], version["updated_at"], [dict(row) for row in rows]
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+def _result(row: sqlite3.Row) -> Dict:
+    result = dict(row)
+    result.pop("id", None)
+    result["reproducible"] = bool(result["reproducible"])
+    result["fix_submitted"] = bool(result["fix_submitted"])
+    return result
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> bool:
+    """Add a column that databases created by earlier versions lack; False if it exists"""
+    if any(row["name"] == column for row in conn.execute(f"PRAGMA table_info({table})")):
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
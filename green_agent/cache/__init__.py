@@ -0,0 +1 @@
+"""On-disk caches shared by the bug managers and the evaluator"""
@@ -0,0 +1,192 @@
+"""Content-addressed cache of build outputs"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from green_agent.cache.fsutil import clone_tree, file_lock, remove_tree, tree_size
+from green_agent.cache.lru_index import LRUIndex
+
+# Files below this size inside bin/ dirs are checked for embedded absolute paths
+_RELOCATE_MAX_BYTES = 64 * 1024
+
+class BuildCache:
+    """Stores compiled outputs keyed by checkout identity and the files a fix changed
+
+    An entry is a copy of the artifact paths a manager reports (class output
+    dirs, virtualenvs, build dirs) plus a manifest recording which directory
+    they were built in, so absolute paths in scripts can be rewritten when
+    they are restored into a different working directory.
+    """
+
+    def __init__(self, root: str, max_size_mb: int = 10240, max_entries: int = 500,
+                 clone_mode: str = "auto"):
+        self.root = Path(root)
+        # Compilers rewrite outputs in place (javac does for .class files), which
+        # would change a hardlinked entry too; reflinks and copies are private
+        self.clone_mode = "copy" if clone_mode == "hardlink" else clone_mode
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index = LRUIndex(self.root, max_size_mb, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def source_key(self, bug: Dict, bug_dir: Path, buggy: bool = True, revision: str = "",
+                   changed: Iterable[str] = ()) -> str:
+        """Hash the identity of a pristine checkout together with the files changed in it
+
+        Only the changed files are read, so a key costs as much as the fix is
+        large rather than as the source tree. Every change to the checkout
+        must be listed in changed, otherwise distinct sources share a key.
+
+        Args:
+            bug: Catalog entry of the bug
+            bug_dir: Checked out (and patched) working directory
+            buggy: Whether bug_dir is the buggy or the fixed version
+            revision: Framework revision the checkout was made from
+            changed: Paths relative to bug_dir that differ from the checkout
+        """
+        digest = hashlib.sha256()
+        version = 'buggy' if buggy else 'fixed'
+        digest.update(f"{bug['framework']}/{bug['project']}/{bug['bug_id']}/{version}@{revision}\0".encode())
+
+        for rel_path in sorted({os.path.normpath(p) for p in changed}):
+            digest.update(rel_path.encode() + b"\0")
+            path = bug_dir / rel_path
+            # Deleted files hash differently from empty ones
+            digest.update(_file_digest(str(path)) if path.exists() or path.is_symlink() else b"deleted")
+
+        return digest.hexdigest()
+
+    def restore(self, key: str, bug_dir: Path, artifacts: List[str]) -> bool:
+        """Copy cached build outputs into bug_dir
+
+        Returns:
+            True on a cache hit, False if the outputs have to be built
+        """
+        entry = self._entry_dir(key)
+        restored = []
+        try:
+            with open(entry / "manifest.json", 'r') as f:
+                manifest = json.load(f)
+
+            for rel_path in manifest["artifacts"]:
+                target = bug_dir / rel_path
+                if target.exists() or target.is_symlink():
+                    remove_tree(target)
+                restored.append(target)
+                clone_tree(entry / "files" / rel_path, target, self.clone_mode)
+                _relocate(target, manifest["source_dir"], str(bug_dir))
+        except (OSError, ValueError, shutil.Error):
+            if entry.exists() and restored:
+                raise
+            # Not cached, or evicted by another process while we were reading
+            # it: drop whatever was half restored and build from scratch
+            for target in restored:
+                if target.exists() or target.is_symlink():
+                    remove_tree(target)
+            self._count(hit=False)
+            return False
+
+        self.index.touch(key)
+        self._count(hit=True)
+        return True
+
+    def store(self, key: str, bug_dir: Path, artifacts: List[str]):
+        """Save the build outputs of bug_dir under key"""
+        entry = self._entry_dir(key)
+        if (entry / "manifest.json").exists():
+            return
+
+        lock_path = self._lock_path(key)
+        with file_lock(lock_path):
+            if (entry / "manifest.json").exists():
+                return
+
+            staging = entry.with_name(f".staging-{key}-{os.getpid()}")
+            if staging.exists():
+                shutil.rmtree(staging)
+
+            stored = []
+            for rel_path in artifacts:
+                source = bug_dir / rel_path
+                if not source.exists():
+                    continue
+                clone_tree(source, staging / "files" / rel_path, self.clone_mode)
+                stored.append(rel_path)
+
+            (staging / "files").mkdir(parents=True, exist_ok=True)
+            with open(staging / "manifest.json", 'w') as f:
+                json.dump({"artifacts": stored, "source_dir": str(bug_dir)}, f, indent=2)
+
+            if entry.exists():
+                shutil.rmtree(entry)
+            os.makedirs(entry.parent, exist_ok=True)
+            os.rename(staging, entry)
+            # Processes waiting on the lock find the manifest once they get it,
+            # later ones check the manifest before locking
+            lock_path.unlink()
+
+        for evicted_key in self.index.touch(key, tree_size(entry)):
+            remove_tree(self._entry_dir(evicted_key))
+            # Left behind by a store that failed
+            if self._lock_path(evicted_key).exists():
+                self._lock_path(evicted_key).unlink()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _lock_path(self, key: str) -> Path:
+        return self.root / f".{key}.lock"
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+def _file_digest(path: str) -> bytes:
+    digest = hashlib.sha256()
+    try:
+        if os.path.islink(path):
+            digest.update(os.readlink(path).encode())
+        else:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+    except OSError:
+        pass
+    return digest.digest()
+
+def _relocate(target: Path, old_dir: str, new_dir: str):
+    """Rewrite absolute paths to old_dir in restored scripts and .pth files"""
+    if old_dir == new_dir or not target.is_dir() or target.is_symlink():
+        return
+
+    old, new = old_dir.encode(), new_dir.encode()
+    for root, _, files in os.walk(target):
+        in_bin = os.path.basename(root) in ("bin", "Scripts")
+        for name in files:
+            if not (in_bin or name.endswith((".pth", ".egg-link", ".cfg"))):
+                continue
+            path = os.path.join(root, name)
+            if os.path.islink(path) or os.path.getsize(path) > _RELOCATE_MAX_BYTES:
+                continue
+            with open(path, 'rb') as f:
+                content = f.read()
+            if old not in content:
+                continue
+            # Replace rather than rewrite, the file may be shared with the cache entry
+            tmp_path = f"{path}.relocate"
+            with open(tmp_path, 'wb') as f:
+                f.write(content.replace(old, new))
+            shutil.copymode(path, tmp_path)
+            os.replace(tmp_path, path)
@@ -0,0 +1,86 @@
+"""Pristine checkout cache shared by the bug managers"""
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Optional
+
+from green_agent.cache.fsutil import clone_tree, file_lock, remove_tree, tree_size
+from green_agent.cache.lru_index import LRUIndex
+
+class CheckoutCache:
+    """Materializes each bug version once and hands out writable clones of it
+
+    Pristine trees live under ``root/<framework>/<project>_<bug_id>_<buggy|fixed>``.
+    Their sizes and last-use times are tracked in ``root/index.json`` so the
+    least recently used entries can be evicted once the cache grows past its
+    limits.
+    """
+
+    def __init__(self, root: str, max_size_mb: int = 20480, max_entries: int = 200,
+                 clone_mode: str = "auto"):
+        self.root = Path(root)
+        self.clone_mode = clone_mode
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index = LRUIndex(self.root, max_size_mb, max_entries)
+
+    def checkout(self, framework: str, project: str, bug_id: int, buggy: bool,
+                 dest: Path, materialize: Callable[[Path], None]) -> Path:
+        """Clone the pristine version of a bug into dest
+
+        Args:
+            framework: Bug framework name ("defects4j", "bugsinpy", "bugsjs")
+            project: Project name
+            bug_id: Bug number within the project
+            buggy: True for the buggy version, False for the fixed one
+            dest: Writable working directory to create (replaced if it exists)
+            materialize: Called with a target path to produce the pristine
+                tree when the version is not cached yet
+        """
+        key = f"{framework}/{project}_{bug_id}_{'buggy' if buggy else 'fixed'}"
+        pristine = self._ensure(key, materialize)
+
+        if dest.exists():
+            shutil.rmtree(dest)
+        try:
+            clone_tree(pristine, dest, self.clone_mode)
+        except (OSError, shutil.Error):
+            if pristine.exists():
+                raise
+            # Evicted by another process while we were cloning; rebuild it once
+            shutil.rmtree(dest, ignore_errors=True)
+            pristine = self._ensure(key, materialize)
+            clone_tree(pristine, dest, self.clone_mode)
+
+        self._update_index(key)
+        return dest
+
+    def pristine_path(self, framework: str, project: str, bug_id: int, buggy: bool = True) -> Path:
+        """Path of the cached pristine tree (may not exist yet)"""
+        return self.root / framework / f"{project}_{bug_id}_{'buggy' if buggy else 'fixed'}"
+
+    def _ensure(self, key: str, materialize: Callable[[Path], None]) -> Path:
+        pristine = self.root / key
+        if pristine.exists():
+            return pristine
+
+        # Only one process materializes a given version; the others wait for it
+        with file_lock(self.root / f".{key.replace('/', '_')}.lock"):
+            if pristine.exists():
+                return pristine
+
+            staging = pristine.with_name(f".staging-{pristine.name}-{os.getpid()}")
+            if staging.exists():
+                shutil.rmtree(staging)
+            try:
+                materialize(staging)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            os.rename(staging, pristine)
+
+        self._update_index(key, size=tree_size(pristine))
+        return pristine
+
+    def _update_index(self, key: str, size: Optional[int] = None):
+        for evicted_key in self.index.touch(key, size):
+            remove_tree(self.root / evicted_key)
@@ -0,0 +1,118 @@
+"""Per-bug index of the source lines each relevant test covers"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from green_agent.cache.discovery_cache import git_revision
+from green_agent.cache.fsutil import file_lock
+from green_agent.managers.command import run_command
+
+# Test -> {source file relative to the checkout: covered line numbers}
+TestCoverage = Dict[str, Dict[str, List[int]]]
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+\d+(?:,\d+)? @@")
+
+class CoverageIndex:
+    """Maps the lines of a bug's buggy version to the relevant tests covering them
+
+    Built once per bug from the per-test coverage a manager measures on a
+    pristine checkout, and stored in ``root/<framework>/<project>_<bug_id>.json``
+    together with the framework revision it was built at. A bug whose
+    coverage cannot be measured is recorded as such (``"lines": null``), so
+    the measurement is not retried before the framework revision changes.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def ensure(self, bug: Dict, framework_path: Path, build: Callable[[], Optional[TestCoverage]]):
+        """Build the index of a bug unless it exists
+
+        Args:
+            bug: Catalog entry
+            framework_path: Framework checkout, used to detect new revisions
+            build: Measures per-test coverage, None if it cannot
+        """
+        path = self._path(bug)
+        revision = git_revision(framework_path) or "unversioned"
+        with file_lock(path.with_suffix(".lock")):
+            cached = self._read(path)
+            if cached is not None and cached.get("revision") == revision:
+                return
+
+            coverage = build()
+            lines = None
+            if coverage is not None:
+                lines = {}
+                for test, files in coverage.items():
+                    for source, numbers in files.items():
+                        covered = lines.setdefault(source, {})
+                        for number in numbers:
+                            covered.setdefault(str(number), []).append(test)
+
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({"revision": revision, "tests": list(coverage or []), "lines": lines}, f)
+            os.replace(tmp_path, path)
+
+    def select(self, bug: Dict, framework_path: Path, changed: Dict[str, Set[int]]) -> Optional[List[str]]:
+        """Indexed tests covering any of the changed lines, in index order
+
+        Returns None when the bug has no index (for the framework revision),
+        or its coverage could not be measured.
+        """
+        cached = self._read(self._path(bug))
+        if cached is None or cached.get("revision") != (git_revision(framework_path) or "unversioned"):
+            return None
+        if cached.get("lines") is None:
+            return None
+
+        covering = set()
+        for source, numbers in changed.items():
+            covered = cached["lines"].get(source, {})
+            for number in numbers:
+                covering.update(covered.get(str(number), []))
+        return [test for test in cached["tests"] if test in covering]
+
+    def _path(self, bug: Dict) -> Path:
+        return self.root / bug['framework'] / f"{bug['project']}_{bug['bug_id']}.json"
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+def changed_lines(bug_dir: Path) -> Dict[str, Set[int]]:
+    """Lines of the checked-out version that were modified in the working tree
+
+    Both Defects4J and BugsInPy checkouts are git repositories with the buggy
+    version at HEAD. Line numbers refer to HEAD, which is what the coverage
+    index was measured on; an insertion counts as touching the lines around it.
+    """
+    result = run_command(["git", "diff", "-U0", "--no-color", "--no-ext-diff", "HEAD"], cwd=bug_dir, timeout=60)
+    if result.returncode != 0:
+        return {}
+
+    changed = {}
+    current = None
+    for line in result.stdout.split('\n'):
+        if line.startswith("--- "):
+            path = line[4:].strip()
+            current = changed.setdefault(path[2:], set()) if path.startswith("a/") else None
+            continue
+        match = HUNK_HEADER.match(line)
+        if match and current is not None:
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count:
+                current.update(range(start, start + count))
+            else:
+                current.update((start, start + 1))
+    return {path: lines for path, lines in changed.items() if lines}
@@ -0,0 +1,155 @@
+"""Shared node_modules store for BugsJS projects"""
+import hashlib
+import os
+import shutil
+import stat
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+from green_agent.cache.fsutil import clone_tree, file_lock, remove_tree, tree_size
+from green_agent.cache.lru_index import LRUIndex
+
+# Files that fully determine what npm install puts into node_modules
+MANIFEST_FILES = ["package.json", "package-lock.json", "npm-shrinkwrap.json"]
+
+class DependencyStore:
+    """Installs each distinct set of npm dependencies once and links it into workspaces
+
+    Entries live under ``root/<hash>/node_modules`` where the hash covers the
+    package manifests and the Node.js version. Downloaded tarballs are kept in
+    ``root/_npm``; installs always run with --offline against it, and only
+    reach the registry (to fill it) when fetch_missing is set.
+
+    By default every workspace gets its own clone (copy-on-write where the
+    filesystem supports it) of the stored node_modules. In "symlink" mode
+    workspaces share the entry, which is then kept read-only so that one
+    bug's install scripts or tests cannot change what the others see, and
+    is not evicted while a workspace still links to it.
+    """
+
+    def __init__(self, root: str, link_mode: str = "auto", fetch_missing: bool = False,
+                 max_size_mb: int = 20480, max_entries: int = 100):
+        self.root = Path(root)
+        self.link_mode = link_mode
+        self.fetch_missing = fetch_missing
+        self.npm_cache = self.root / "_npm"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index = LRUIndex(self.root, max_size_mb, max_entries)
+        self._node_version = None
+
+    def manifest_key(self, bug_dir: Path) -> Optional[str]:
+        """Hash of the package manifests in bug_dir, None if there is no package.json"""
+        if not (bug_dir / "package.json").exists():
+            return None
+
+        digest = hashlib.sha256()
+        digest.update(self.node_version().encode() + b"\0")
+        for name in MANIFEST_FILES:
+            manifest = bug_dir / name
+            if manifest.exists():
+                digest.update(name.encode() + b"\0")
+                digest.update(manifest.read_bytes())
+        return digest.hexdigest()
+
+    def link(self, key: str, bug_dir: Path) -> bool:
+        """Attach the stored node_modules for key to bug_dir
+
+        Returns:
+            False if nothing is stored under key yet
+        """
+        stored = self.root / key / "node_modules"
+        if not stored.exists():
+            return False
+
+        target = bug_dir / "node_modules"
+        if target.exists() or target.is_symlink():
+            remove_tree(target)
+
+        if self.link_mode == "symlink":
+            os.symlink(stored, target)
+            self._touch(key, holder=str(target))
+        else:
+            # Entries are read-only; the workspace's clone must not be. Hardlinked
+            # files would share their inodes (and permissions) with the entry, so
+            # those are copied instead
+            mode = "copy" if self.link_mode == "hardlink" else self.link_mode
+            clone_tree(stored, target, mode)
+            _set_writable(target, True)
+            self._touch(key)
+        return True
+
+    def populate(self, key: str, bug_dir: Path):
+        """Add the node_modules installed in bug_dir to the store
+
+        In symlink mode bug_dir is linked to the stored copy; otherwise it
+        keeps the tree it installed.
+        """
+        installed = bug_dir / "node_modules"
+        if not installed.is_dir() or installed.is_symlink():
+            return
+
+        entry = self.root / key
+        moved = False
+        with file_lock(self.root / f".{key}.lock"):
+            if not (entry / "node_modules").exists():
+                staging = self.root / f".staging-{key}-{os.getpid()}"
+                if staging.exists():
+                    shutil.rmtree(staging)
+                staging.mkdir()
+                if self.link_mode == "symlink" and os.stat(installed).st_dev == os.stat(staging).st_dev:
+                    os.rename(installed, staging / "node_modules")
+                    moved = True
+                else:
+                    # Across volumes a move is a copy too; clone and keep the workspace's tree
+                    clone_tree(installed, staging / "node_modules", "auto")
+                _set_writable(staging / "node_modules", False)
+                os.rename(staging, entry)
+
+        self._touch(key, size=tree_size(entry))
+        if self.link_mode == "symlink":
+            if not moved:
+                remove_tree(installed)
+            self.link(key, bug_dir)
+
+    def install_command(self) -> List[str]:
+        """npm install command line that only uses the store's shared download cache"""
+        return ["npm", "install", "--cache", str(self.npm_cache), "--no-audit", "--no-fund", "--offline"]
+
+    def fetch_command(self) -> List[str]:
+        """npm install command line that downloads what the shared cache is missing"""
+        return ["npm", "install", "--cache", str(self.npm_cache), "--no-audit", "--no-fund", "--prefer-offline"]
+
+    def _touch(self, key: str, size: Optional[int] = None, holder: Optional[str] = None):
+        for evicted_key in self.index.touch(key, size, holder):
+            evicted = self.root / evicted_key
+            if evicted.exists():
+                _set_writable(evicted, True)
+                remove_tree(evicted)
+
+    def node_version(self) -> str:
+        if self._node_version is None:
+            try:
+                result = subprocess.run(["node", "--version"], capture_output=True, text=True)
+                self._node_version = result.stdout.strip()
+            except OSError:
+                self._node_version = ""
+        return self._node_version
+
+def _set_writable(root: Path, writable: bool):
+    """Add or remove write permission on everything below root (symlinks are left alone)"""
+    def update(path: str):
+        mode = os.lstat(path).st_mode
+        if stat.S_ISLNK(mode):
+            return
+        bits = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+        os.chmod(path, (mode | stat.S_IWUSR) if writable else (mode & ~bits))
+
+    # Directories are made writable before and read-only after their contents
+    if writable:
+        update(str(root))
+    for dir_path, dirs, files in os.walk(root, topdown=writable):
+        for name in files + (dirs if writable else []):
+            update(os.path.join(dir_path, name))
+        if not writable:
+            update(dir_path)
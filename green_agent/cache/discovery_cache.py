@@ -0,0 +1,76 @@
+"""On-disk memo of bug discovery results per framework"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+class DiscoveryCache:
+    """Remembers each framework's per-project bug lists across restarts
+
+    Entries are stored in ``root/<framework>.json`` together with the git
+    revision of the framework checkout they were discovered from, and are
+    ignored once the checkout moves to another revision. Frameworks that are
+    not git checkouts are never cached.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def load(self, framework: str, framework_path: Path) -> Optional[Dict]:
+        revision = git_revision(framework_path)
+        cache_file = self.root / f"{framework}.json"
+        if revision is None or not cache_file.exists():
+            return None
+
+        try:
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get("revision") != revision:
+            return None
+        return cached["projects"]
+
+    def store(self, framework: str, framework_path: Path, projects: Dict):
+        revision = git_revision(framework_path)
+        if revision is None:
+            return
+
+        cache_file = self.root / f"{framework}.json"
+        tmp_path = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"revision": revision, "projects": projects}, f)
+        os.replace(tmp_path, cache_file)
+
+def git_revision(repo_path: Path) -> Optional[str]:
+    """Commit id checked out in repo_path, read from .git without running git"""
+    git_dir = Path(repo_path) / ".git"
+    if git_dir.is_file():
+        # Worktree or submodule: .git points at the real git dir
+        content = git_dir.read_text().strip()
+        if not content.startswith("gitdir:"):
+            return None
+        git_dir = (Path(repo_path) / content[len("gitdir:"):].strip()).resolve()
+
+    head_file = git_dir / "HEAD"
+    if not head_file.exists():
+        return None
+
+    head = head_file.read_text().strip()
+    if not head.startswith("ref:"):
+        return head
+
+    ref = head[len("ref:"):].strip()
+    ref_file = git_dir / ref
+    if ref_file.exists():
+        return ref_file.read_text().strip()
+
+    packed_refs = git_dir / "packed-refs"
+    if packed_refs.exists():
+        for line in packed_refs.read_text().split('\n'):
+            parts = line.split()
+            if len(parts) == 2 and parts[1] == ref:
+                return parts[0]
+    return None
@@ -0,0 +1,112 @@
+"""Memo of evaluation outcomes keyed by bug and normalized fix"""
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    framework TEXT NOT NULL,
+    project TEXT NOT NULL,
+    bug_id TEXT NOT NULL,
+    fix_hash TEXT NOT NULL,
+    test_suite TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    created_at REAL,
+    PRIMARY KEY (framework, project, bug_id, fix_hash, test_suite)
+);
+"""
+
+class EvaluationMemo:
+    """Outcomes of fixes that were already evaluated, so duplicates skip checkout, build and tests
+
+    Fixes are identified by fix_hash(), which ignores line endings and
+    trailing whitespace. Every outcome records the framework revision it
+    was computed at; lookups at another revision miss and drop the stale
+    entries of that framework.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def get(self, bug: Dict, fix: str, test_suite: str, revision: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM evaluations WHERE framework = ? AND revision != ?",
+                (bug['framework'], revision)
+            )
+            row = conn.execute(
+                "SELECT outcome FROM evaluations "
+                "WHERE framework = ? AND project = ? AND bug_id = ? AND fix_hash = ? AND test_suite = ?",
+                (bug['framework'], bug['project'], str(bug['bug_id']), fix, test_suite)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def store(self, bug: Dict, fix: str, test_suite: str, revision: str, outcome: Dict):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (bug['framework'], bug['project'], str(bug['bug_id']), fix, test_suite, revision,
+                 json.dumps(outcome), time.time())
+            )
+
+    def invalidate(self, framework: Optional[str] = None):
+        """Forget the outcomes of one framework, or of all of them"""
+        with self._connect() as conn:
+            if framework is None:
+                conn.execute("DELETE FROM evaluations")
+            else:
+                conn.execute("DELETE FROM evaluations WHERE framework = ?", (framework,))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+def fix_hash(fixed_files: Dict[str, str], patch: Optional[str]) -> str:
+    """Hash of a fix that is equal for whitespace-equivalent submissions
+
+    Line endings, trailing whitespace and trailing blank lines never count.
+    Leading whitespace always counts: it is significant in Python and
+    inside string literals, text blocks and template strings. Patch headers are
+    reduced to the file paths (diff -u adds timestamps, git adds index lines).
+    """
+    digest = hashlib.sha256()
+    for path in sorted(fixed_files):
+        digest.update(f"file {path}\n".encode())
+        digest.update(_normalize(fixed_files[path]).encode())
+    if patch:
+        digest.update(b"patch\n")
+        digest.update(_normalize_patch(patch).encode())
+    return digest.hexdigest()
+
+def _normalize(text: str) -> str:
+    lines = [line.rstrip() for line in text.splitlines()]
+    while lines and not lines[-1]:
+        lines.pop()
+    return "\n".join(lines) + "\n"
+
+def _normalize_patch(patch: str) -> str:
+    lines = []
+    for line in patch.splitlines():
+        if line.startswith(("diff ", "index ")):
+            continue
+        if line.startswith(("--- ", "+++ ")):
+            lines.append(line.split('\t')[0].rstrip())
+        else:
+            lines.append(line.rstrip())
+    while lines and not lines[-1]:
+        lines.pop()
+    return "\n".join(lines) + "\n"
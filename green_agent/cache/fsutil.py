@@ -0,0 +1,84 @@
+"""Filesystem helpers shared by the on-disk caches"""
+import fcntl
+import os
+import shutil
+import subprocess
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+# Set once `cp --reflink=always` has failed, so later clones go straight to the fallback
+_reflink_supported = True
+
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on lock_path (works across processes)"""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def tree_size(path: Path) -> int:
+    """Total size in bytes of all regular files below path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+def remove_tree(path: Path):
+    """Delete a directory tree, renaming it aside first so the path is free immediately"""
+    if not path.exists() and not path.is_symlink():
+        return
+    if path.is_symlink() or path.is_file():
+        path.unlink()
+        return
+    trash = path.with_name(f".trash-{path.name}-{uuid.uuid4().hex[:8]}")
+    os.rename(path, trash)
+    shutil.rmtree(trash, ignore_errors=True)
+
+def clone_tree(src: Path, dest: Path, mode: str = "auto"):
+    """Create a writable copy of src at dest
+
+    Args:
+        src: Directory to clone
+        dest: Target directory (must not exist)
+        mode: "reflink" for copy-on-write clones, "hardlink" to share file
+            inodes with src, "copy" for a plain copy, or "auto" to try
+            reflinks and fall back to copying
+    """
+    global _reflink_supported
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    if src.is_symlink():
+        os.symlink(os.readlink(src), dest)
+        return
+
+    if mode in ("auto", "reflink") and _reflink_supported:
+        result = subprocess.run(
+            ["cp", "-a", "--reflink=always", str(src), str(dest)],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode == 0:
+            return
+        if dest.exists():
+            shutil.rmtree(dest)
+        if mode == "reflink":
+            raise Exception(f"Reflink clone of {src} failed: {result.stderr}")
+        _reflink_supported = False
+
+    if mode == "hardlink":
+        # Files are shared with src: writers must replace files rather than
+        # rewrite them in place, or the source tree is modified too
+        shutil.copytree(src, dest, symlinks=True, copy_function=os.link)
+        return
+
+    shutil.copytree(src, dest, symlinks=True)
@@ -0,0 +1,102 @@
+"""Size-bounded LRU bookkeeping for on-disk cache entries"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from green_agent.cache.fsutil import file_lock
+
+class LRUIndex:
+    """Tracks entry sizes and last-use times in a JSON file next to the cache
+
+    The index is re-read under a file lock on every update, so several
+    processes can share one cache directory. Entries can be held by
+    directories that use them in place (e.g. through a symlink); an entry
+    is not evicted while one of its holders still exists.
+    """
+
+    def __init__(self, root: Path, max_size_mb: int, max_entries: int):
+        self.root = Path(root)
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self.max_entries = max_entries
+        self.index_path = self.root / "index.json"
+        self.lock_path = self.root / ".index.lock"
+        self._lock = threading.Lock()
+
+    def touch(self, key: str, size: Optional[int] = None, holder: Optional[str] = None) -> List[str]:
+        """Mark key as used (recording its size if given)
+
+        Args:
+            holder: Directory that keeps using the entry until it is deleted
+                or release() is called
+
+        Returns:
+            Keys evicted to bring the cache back under its limits; the caller
+            removes their data
+        """
+        with self._lock, file_lock(self.lock_path):
+            index = self._load()
+            entry = index.setdefault(key, {"size": 0})
+            if size is not None:
+                entry["size"] = size
+            if holder is not None and holder not in entry.setdefault("holders", []):
+                entry["holders"].append(holder)
+            entry["last_used"] = time.time()
+            evicted = self._evict(index, keep=key)
+            self._save(index)
+        return evicted
+
+    def release(self, key: str, holder: str):
+        """Record that holder no longer uses key"""
+        with self._lock, file_lock(self.lock_path):
+            index = self._load()
+            holders = index.get(key, {}).get("holders", [])
+            if holder in holders:
+                holders.remove(holder)
+                self._save(index)
+
+    def remove(self, key: str):
+        with self._lock, file_lock(self.lock_path):
+            index = self._load()
+            if index.pop(key, None) is not None:
+                self._save(index)
+
+    def _load(self) -> Dict:
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, index: Dict):
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _evict(self, index: Dict, keep: str) -> List[str]:
+        """Drop least recently used entries from index until it fits the limits"""
+        evicted = []
+        total = sum(entry.get("size", 0) for entry in index.values())
+        by_age = sorted(index, key=lambda k: index[k].get("last_used", 0))
+
+        for key in by_age:
+            if total <= self.max_bytes and len(index) <= self.max_entries:
+                break
+            if key == keep or self._held(index[key]):
+                continue
+            total -= index[key].get("size", 0)
+            del index[key]
+            evicted.append(key)
+
+        return evicted
+
+    @staticmethod
+    def _held(entry: Dict) -> bool:
+        """Whether a holder of entry still exists, forgetting the ones that are gone"""
+        entry["holders"] = [holder for holder in entry.get("holders", []) if os.path.lexists(holder)]
+        return bool(entry["holders"])
@@ -0,0 +1,289 @@
+"""SQLite index of bug metadata for Defects4J, BugsInPy and BugsJS"""
+import csv
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from green_agent.cache.discovery_cache import git_revision
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bugs (
+    framework TEXT NOT NULL,
+    project TEXT NOT NULL,
+    bug_id INTEGER NOT NULL,
+    info TEXT NOT NULL,
+    trigger_tests TEXT NOT NULL,
+    relevant_tests TEXT NOT NULL,
+    modified_sources TEXT NOT NULL,
+    revision_buggy TEXT,
+    revision_fixed TEXT,
+    PRIMARY KEY (framework, project, bug_id)
+);
+CREATE TABLE IF NOT EXISTS frameworks (
+    framework TEXT PRIMARY KEY,
+    revision TEXT,
+    indexed_at REAL
+);
+"""
+
+# Bumped when the records change shape, so indexes written before are rebuilt
+INDEX_FORMAT = 2
+
+# Per-bug fields of `defects4j info` that are kept, see parse_defects4j_info()
+DEFECTS4J_INFO_FIELDS = ["Revision ID (fixed version)", "Bug report id", "Bug report url",
+                         "Root cause in triggering tests", "List of modified sources"]
+DEFECTS4J_INFO_LIST_FIELDS = ["Root cause in triggering tests", "List of modified sources"]
+
+class BugMetadataStore:
+    """Bug info, test lists and modified sources for every bug of every framework
+
+    Each framework is indexed in bulk from its data files (no CLI calls) the
+    first time it is queried, and re-indexed when its checkout moves to a new
+    git revision. Lookups are primary-key queries.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._checked = set()
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def get(self, framework: str, project: str, bug_id: int) -> Optional[Dict]:
+        """Metadata record of one bug, or None if it is not indexed"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT info, trigger_tests, relevant_tests, modified_sources, revision_buggy, revision_fixed "
+                "FROM bugs WHERE framework = ? AND project = ? AND bug_id = ?",
+                (framework, project, bug_id)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {
+            "info": json.loads(row[0]),
+            "trigger_tests": json.loads(row[1]),
+            "relevant_tests": json.loads(row[2]),
+            "modified_sources": json.loads(row[3]),
+            "revision_buggy": row[4],
+            "revision_fixed": row[5]
+        }
+
+    def ensure_indexed(self, framework: str, framework_path: Path, indexer: Callable[[Path], Iterable[Dict]]):
+        """Index a framework unless it is already indexed at its current revision
+
+        Args:
+            framework: Framework name
+            framework_path: Framework checkout, used to detect new revisions
+            indexer: Yields one record per bug (see index_defects4j & co.)
+        """
+        if framework in self._checked:
+            return
+
+        with self._lock:
+            if framework in self._checked:
+                return
+
+            # Checkouts that are not git repos are indexed once and kept
+            revision = f"{git_revision(framework_path) or 'unversioned'}@{INDEX_FORMAT}"
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT revision FROM frameworks WHERE framework = ?", (framework,)
+                ).fetchone()
+
+            if row is None or row[0] != revision:
+                print(f"Indexing {framework} bug metadata...")
+                records = list(indexer(framework_path))
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM bugs WHERE framework = ?", (framework,))
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO bugs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (framework, r["project"], r["bug_id"], json.dumps(r.get("info", {})),
+                             json.dumps(r.get("trigger_tests", [])), json.dumps(r.get("relevant_tests", [])),
+                             json.dumps(r.get("modified_sources", [])), r.get("revision_buggy"),
+                             r.get("revision_fixed"))
+                            for r in records
+                        ]
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO frameworks VALUES (?, ?, ?)",
+                        (framework, revision, time.time())
+                    )
+
+            self._checked.add(framework)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+def index_defects4j(defects4j_path: Path) -> Iterable[Dict]:
+    """Records for every active Defects4J bug, read from framework/projects/<project>
+
+    "info" holds the fields of ``defects4j info`` that come from these files,
+    in the shape parse_defects4j_info() gives them.
+    """
+    projects_dir = Path(defects4j_path) / "framework" / "projects"
+    if not projects_dir.exists():
+        return
+
+    for project_dir in sorted(projects_dir.iterdir()):
+        active_bugs = project_dir / "active-bugs.csv"
+        if not active_bugs.exists():
+            continue
+
+        with open(active_bugs, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                bug_id = int(row["bug.id"])
+                trigger_causes = _read_trigger_causes(project_dir / "trigger_tests" / str(bug_id))
+                modified_sources = _read_lines(project_dir / "modified_classes" / f"{bug_id}.src")
+                yield {
+                    "project": project_dir.name,
+                    "bug_id": bug_id,
+                    "info": {
+                        "Summary for Bug": f"{project_dir.name}-{bug_id}",
+                        "Revision ID (fixed version)": row.get("revision.id.fixed", ""),
+                        "Bug report id": row.get("report.id", ""),
+                        "Bug report url": row.get("report.url", ""),
+                        "Root cause in triggering tests": [
+                            f"{test} --> {cause}" if cause else test for test, cause in trigger_causes
+                        ],
+                        "List of modified sources": modified_sources
+                    },
+                    "trigger_tests": [test for test, _ in trigger_causes],
+                    "relevant_tests": _read_lines(project_dir / "relevant_tests" / str(bug_id)),
+                    "modified_sources": modified_sources,
+                    "revision_buggy": row.get("revision.id.buggy"),
+                    "revision_fixed": row.get("revision.id.fixed")
+                }
+
+def parse_defects4j_info(output: str) -> Dict:
+    """Bug fields of ``defects4j info -p <project> -b <id>`` output
+
+    Only the per-bug fields that index_defects4j() can read from the
+    framework's data files are kept; the configuration summary and the
+    revision date (which needs the project's VCS) are dropped. List fields
+    ("Root cause in triggering tests", "List of modified sources") become
+    lists of their " - " entries, a "   --> cause" line joining its test.
+    """
+    info = {}
+    field = None
+    for line in output.split('\n'):
+        stripped = line.strip()
+        if not stripped or set(stripped) == {'-'}:
+            continue
+        if stripped.startswith("Summary for Bug:"):
+            info["Summary for Bug"] = stripped.split(':', 1)[1].strip()
+            field = None
+        elif "Summary for Bug" not in info:
+            continue
+        elif stripped.endswith(':') and stripped[:-1] in DEFECTS4J_INFO_FIELDS:
+            field = stripped[:-1]
+            info[field] = [] if field in DEFECTS4J_INFO_LIST_FIELDS else ""
+        elif field is None:
+            continue
+        elif field in DEFECTS4J_INFO_LIST_FIELDS:
+            if stripped.startswith("- "):
+                info[field].append(stripped[2:].strip())
+            elif stripped.startswith("--> ") and info[field]:
+                info[field][-1] += f" {stripped}"
+        elif not info[field]:
+            info[field] = stripped
+    return info
+
+def index_bugsinpy(bugsinpy_path: Path) -> Iterable[Dict]:
+    """Records for every BugsInPy bug, read from projects/<project>/bugs/<id>"""
+    projects_dir = Path(bugsinpy_path) / "projects"
+    if not projects_dir.exists():
+        return
+
+    for project_dir in sorted(projects_dir.iterdir()):
+        bugs_dir = project_dir / "bugs"
+        if not bugs_dir.is_dir():
+            continue
+
+        for bug_dir in bugs_dir.iterdir():
+            if not (bug_dir.is_dir() and bug_dir.name.isdigit()):
+                continue
+
+            info = {}
+            bug_info = bug_dir / "bug.info"
+            if bug_info.exists():
+                for line in bug_info.read_text(errors='replace').split('\n'):
+                    if '=' in line:
+                        key, value = line.split('=', 1)
+                        info[key.strip()] = value.strip().strip('"')
+
+            yield {
+                "project": project_dir.name,
+                "bug_id": int(bug_dir.name),
+                "info": info,
+                # run_test.sh holds one test command per line
+                "trigger_tests": _read_lines(bug_dir / "run_test.sh"),
+                "relevant_tests": [t for t in info.get("test_file", "").split(';') if t],
+                "modified_sources": _patched_files(bug_dir / "bug_patch.txt"),
+                "revision_buggy": info.get("buggy_commit_id"),
+                "revision_fixed": info.get("fixed_commit_id")
+            }
+
+def index_bugsjs(bugsjs_path: Path) -> Iterable[Dict]:
+    """Records for every BugsJS bug, read from Projects/<project>/<project>_bugs.csv"""
+    projects_dir = Path(bugsjs_path) / "Projects"
+    if not projects_dir.exists():
+        return
+
+    for project_dir in sorted(projects_dir.iterdir()):
+        bugs_csv = project_dir / f"{project_dir.name}_bugs.csv"
+        if not bugs_csv.exists():
+            continue
+
+        with open(bugs_csv, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f, delimiter=';'):
+                try:
+                    bug_id = int(row.get('ID', 0))
+                except ValueError:
+                    continue
+                yield {
+                    "project": project_dir.name,
+                    "bug_id": bug_id,
+                    "info": row,
+                    "revision_fixed": row.get('Commit')
+                }
+
+def _read_lines(path: Path) -> List[str]:
+    if not path.exists():
+        return []
+    return [line.strip() for line in path.read_text(errors='replace').split('\n') if line.strip()]
+
+def _read_trigger_causes(path: Path) -> List[Tuple[str, str]]:
+    """(test, first line of its failure) pairs from a Defects4J trigger_tests file
+
+    Every test starts with a "--- Class::method" header, followed by the
+    exception it fails with.
+    """
+    causes = []
+    for line in _read_lines(path):
+        if line.startswith("--- "):
+            causes.append((line[4:].strip(), ""))
+        elif causes and not causes[-1][1]:
+            causes[-1] = (causes[-1][0], line)
+    return causes
+
+def _patched_files(patch_path: Path) -> List[str]:
+    files = []
+    for line in _read_lines(patch_path):
+        if line.startswith("+++ ") and not line.endswith("/dev/null"):
+            name = line[4:].split('\t')[0]
+            files.append(name[2:] if name.startswith("b/") else name)
+    return files
@@ -0,0 +1,123 @@
+"""Per-test outcomes of the buggy and developer-fixed version of each bug"""
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from green_agent.cache.discovery_cache import git_revision
+from green_agent.cache.fsutil import file_lock
+from green_agent.managers.test_output import FAILED, PASSED
+
+class OutcomeCache:
+    """Runs the full test suite of a bug's buggy and fixed versions once
+
+    Outcomes are stored in ``root/<framework>/<project>_<bug_id>.json`` as
+    {"buggy": {test: outcome}, "fixed": {test: outcome}} together with the
+    framework revision they were computed at. Concurrent evaluations of the
+    same bug wait for the first one to compute them. A bug whose runs give
+    no per-test results is stored with ``"outcomes": null``, so its suites
+    are not run again before the framework revision changes.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def get(self, bug: Dict, framework_path: Path,
+            run_version: Callable[[bool], Dict]) -> Optional[Dict[str, Dict[str, str]]]:
+        """Baseline outcomes of a bug, computing them on first use
+
+        Args:
+            bug: Catalog entry
+            framework_path: Framework checkout, used to detect new revisions
+            run_version: Runs the tests of the buggy (True) or fixed (False)
+                version and returns a run_tests result with test_records
+
+        Returns:
+            {"buggy": {...}, "fixed": {...}}, or None if neither version
+            produced per-test results
+        """
+        path = self.root / bug['framework'] / f"{bug['project']}_{bug['bug_id']}.json"
+        revision = git_revision(framework_path) or "unversioned"
+
+        with file_lock(path.with_suffix(".lock")):
+            cached = self._read(path)
+            if cached is not None and cached.get("revision") == revision:
+                return cached["outcomes"]
+
+            outcomes = {}
+            for version, buggy in (("buggy", True), ("fixed", False)):
+                records = run_version(buggy).get("test_records") or []
+                outcomes[version] = {r["name"]: r["outcome"] for r in records}
+            if not outcomes["buggy"] and not outcomes["fixed"]:
+                outcomes = None
+
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({"revision": revision, "outcomes": outcomes}, f)
+            os.replace(tmp_path, path)
+            return outcomes
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+def diff_outcomes(baseline: Dict[str, Dict[str, str]], records: List[Dict]) -> Dict:
+    """Compare a candidate's test records with the buggy and fixed baselines
+
+    Candidate outcomes of whole test classes or files are spread over the
+    baseline tests they contain first, see normalize_outcomes().
+
+    Returns:
+        newly_passing: tests failing on the buggy version that now pass
+        newly_failing: tests passing on the buggy version that now fail
+        regressions: newly failing tests that pass on the fixed version
+            (tests that fail there too are not the candidate's fault)
+        fixes_bug: whether every test the developer fix repaired now
+            passes, None if the candidate did not run all of them
+    """
+    buggy, fixed = baseline.get("buggy", {}), baseline.get("fixed", {})
+    candidate = normalize_outcomes({r["name"]: r["outcome"] for r in records}, set(buggy) | set(fixed))
+
+    newly_passing = [t for t, o in candidate.items() if o == PASSED and buggy.get(t) == FAILED]
+    newly_failing = [t for t, o in candidate.items() if o == FAILED and buggy.get(t) == PASSED]
+    repaired = [t for t, o in fixed.items() if o == PASSED and buggy.get(t) == FAILED]
+
+    if not repaired or any(t not in candidate for t in repaired):
+        fixes_bug = None
+    else:
+        fixes_bug = all(candidate[t] == PASSED for t in repaired)
+
+    return {
+        "newly_passing": newly_passing,
+        "newly_failing": newly_failing,
+        "regressions": [t for t in newly_failing if fixed.get(t) == PASSED],
+        "fixes_bug": fixes_bug
+    }
+
+def normalize_outcomes(candidate: Dict[str, str], known: Set[str]) -> Dict[str, str]:
+    """Candidate outcomes keyed like the baseline tests in known
+
+    Runners given a test class or file (defects4j test -t Class, the warm
+    JVM runner, pytest on a file) report one outcome under its name, while
+    baselines of the full suite list "Class::method". Such a group outcome
+    applies to every known test below it that has no outcome of its own.
+    """
+    members: Dict[str, List[str]] = {}
+    for test in known:
+        parts = test.split("::")
+        for end in range(1, len(parts)):
+            members.setdefault("::".join(parts[:end]), []).append(test)
+
+    normalized = {}
+    for name, outcome in candidate.items():
+        if name not in known:
+            for test in members.get(name, []):
+                normalized.setdefault(test, outcome)
+    normalized.update(candidate)
+    return normalized
@@ -0,0 +1,251 @@
+"""Pool of virtualenvs shared by BugsInPy checkouts"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from green_agent.cache.fsutil import file_lock, remove_tree
+from green_agent.managers.command import run_command
+
+# Installed into every pooled env on top of the bug's requirements: coverage.py
+# measures the per-test coverage of the CoverageIndex
+BASE_REQUIREMENTS = ["coverage"]
+
+class VenvPool:
+    """Reuses virtualenvs across checkouts whose requirements are identical
+
+    Envs are keyed by a fingerprint of the bug's Python version and
+    ``bugsinpy_requirements.txt``, and also get BASE_REQUIREMENTS. A checkout attaches to an env through an
+    ``env`` symlink, which is where bugsinpy-test activates it from.
+
+    Checkouts without a ``bugsinpy_setup.sh`` share one env per fingerprint.
+    Setup scripts usually install the checkout itself into the env, so those
+    checkouts get an env instance to themselves until they are released.
+    An instance is marked dirty once it has been claimed that way, and dirty
+    instances are only handed to later setup-script checkouts, never to
+    checkouts that expect the pristine requirement set.
+
+    Holders of each env instance are recorded in ``refs.json``; once more
+    than max_envs instances exist, the least recently used ones without live
+    holders are deleted.
+    """
+
+    def __init__(self, root: str, max_envs: int = 20, pip_timeout: int = 1800):
+        self.root = Path(root)
+        self.max_envs = max_envs
+        self.pip_timeout = pip_timeout
+        self.refs_path = self.root / "refs.json"
+        self.lock_path = self.root / ".refs.lock"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def fingerprint(self, bug_dir: Path) -> str:
+        """Hash of the Python version and the normalized requirement set of a checkout
+
+        BASE_REQUIREMENTS are part of it, so envs built before a base
+        requirement was added are not reused.
+        """
+        info = read_bug_info(bug_dir)
+        requirements = []
+        requirements_file = bug_dir / "bugsinpy_requirements.txt"
+        if requirements_file.exists():
+            for line in requirements_file.read_text().split('\n'):
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    requirements.append(line)
+
+        digest = hashlib.sha256()
+        digest.update(info.get("python_version", "").encode() + b"\0")
+        digest.update('\n'.join(sorted(requirements)).encode() + b"\0")
+        digest.update('\n'.join(BASE_REQUIREMENTS).encode())
+        return digest.hexdigest()[:16]
+
+    def attach(self, bug_dir: Path) -> bool:
+        """Link a pooled env into bug_dir, building it first if needed
+
+        Returns:
+            False if no env could be provided (no matching interpreter or a
+            failed install); the caller should fall back to bugsinpy-compile
+        """
+        self.release(bug_dir)
+        fingerprint = self.fingerprint(bug_dir)
+        setup_script = bug_dir / "bugsinpy_setup.sh"
+        exclusive = setup_script.exists()
+
+        with file_lock(self.root / f".{fingerprint}.lock"):
+            instance = self._claim(fingerprint, bug_dir, exclusive)
+            env_dir = self.root / instance / "env"
+            if not env_dir.exists() and not self._build(bug_dir, env_dir):
+                self.release(bug_dir)
+                return False
+
+        target = bug_dir / "env"
+        if target.exists() or target.is_symlink():
+            remove_tree(target)
+        os.symlink(env_dir, target)
+
+        if exclusive:
+            result = run_command(
+                ["bash", "-c", "source env/bin/activate && bash bugsinpy_setup.sh"],
+                cwd=bug_dir,
+                timeout=self.pip_timeout
+            )
+            if result.returncode != 0:
+                print(f"WARNING: bugsinpy_setup.sh failed in {bug_dir}: {result.stderr[-500:]}")
+                self.release(bug_dir)
+                target.unlink()
+                return False
+
+        self._evict()
+        return True
+
+    def release(self, bug_dir: Path):
+        """Drop bug_dir's reference to its pooled env"""
+        holder = str(bug_dir)
+        with file_lock(self.lock_path):
+            refs = self._load_refs()
+            for entry in refs.values():
+                entry["holders"] = [h for h in entry["holders"] if h["path"] != holder]
+            self._save_refs(refs)
+
+    def _claim(self, fingerprint: str, bug_dir: Path, exclusive: bool) -> str:
+        """Record bug_dir as a holder of a suitable env instance and return its name"""
+        with file_lock(self.lock_path):
+            refs = self._load_refs()
+            self._prune_holders(refs)
+
+            chosen = None
+            for name, entry in refs.items():
+                if entry["fingerprint"] != fingerprint:
+                    continue
+                holders = entry["holders"]
+                if exclusive and holders:
+                    continue
+                if not exclusive and (entry.get("dirty") or any(h["exclusive"] for h in holders)):
+                    continue
+                chosen = name
+                break
+
+            if chosen is None:
+                n = sum(1 for entry in refs.values() if entry["fingerprint"] == fingerprint)
+                chosen = f"{fingerprint}-{n}"
+                while chosen in refs:
+                    n += 1
+                    chosen = f"{fingerprint}-{n}"
+                refs[chosen] = {"fingerprint": fingerprint, "holders": []}
+
+            refs[chosen]["holders"].append({"path": str(bug_dir), "exclusive": exclusive})
+            if exclusive:
+                # bugsinpy_setup.sh changes the env; it no longer matches its fingerprint alone
+                refs[chosen]["dirty"] = True
+            refs[chosen]["last_used"] = time.time()
+            self._save_refs(refs)
+            return chosen
+
+    def _build(self, bug_dir: Path, env_dir: Path) -> bool:
+        python = find_python(read_bug_info(bug_dir).get("python_version", ""))
+        if python is None:
+            return False
+
+        # venv scripts embed their own path, so the env is built where it will stay
+        result = run_command([python, "-m", "venv", str(env_dir)])
+        if result.returncode == 0 and (bug_dir / "bugsinpy_requirements.txt").exists():
+            result = run_command(
+                [str(env_dir / "bin" / "pip"), "install", "-r", "bugsinpy_requirements.txt"],
+                cwd=bug_dir,
+                timeout=self.pip_timeout
+            )
+        if result.timed_out:
+            error = f"pip install timed out after {self.pip_timeout}s"
+        else:
+            error = result.stderr if result.returncode != 0 else None
+
+        if error is not None:
+            print(f"WARNING: Failed to build pooled env for {bug_dir}: {error[-500:]}")
+            shutil.rmtree(env_dir, ignore_errors=True)
+            return False
+
+        # Optional tools: the env is usable for testing without them
+        result = run_command(
+            [str(env_dir / "bin" / "pip"), "install", "-q"] + BASE_REQUIREMENTS,
+            cwd=bug_dir,
+            timeout=self.pip_timeout
+        )
+        if result.returncode != 0:
+            print(f"WARNING: Failed to install {' '.join(BASE_REQUIREMENTS)} into {env_dir}: {result.stderr[-500:]}")
+        return True
+
+    def _evict(self):
+        with file_lock(self.lock_path):
+            refs = self._load_refs()
+            self._prune_holders(refs)
+
+            idle = sorted(
+                (name for name, entry in refs.items() if not entry["holders"]),
+                key=lambda name: refs[name].get("last_used", 0)
+            )
+            evicted = []
+            while len(refs) > self.max_envs and idle:
+                name = idle.pop(0)
+                del refs[name]
+                evicted.append(name)
+            self._save_refs(refs)
+
+        for name in evicted:
+            remove_tree(self.root / name)
+
+    def _prune_holders(self, refs: Dict):
+        """Forget holders whose checkout is gone or links to a different env"""
+        for name, entry in refs.items():
+            env_dir = str(self.root / name / "env")
+            entry["holders"] = [h for h in entry["holders"] if _still_holds(h["path"], env_dir)]
+
+    def _load_refs(self) -> Dict:
+        if not self.refs_path.exists():
+            return {}
+        try:
+            with open(self.refs_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_refs(self, refs: Dict):
+        tmp_path = self.refs_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(refs, f, indent=2)
+        os.replace(tmp_path, self.refs_path)
+
+def _still_holds(bug_dir: str, env_dir: str) -> bool:
+    link = os.path.join(bug_dir, "env")
+    if os.path.islink(link):
+        return os.readlink(link) == env_dir
+    # Claimed but not linked yet
+    return os.path.isdir(bug_dir) and not os.path.lexists(link)
+
+def read_bug_info(bug_dir: Path) -> Dict:
+    """Parse the bugsinpy_bug.info file written by bugsinpy-checkout"""
+    info = {}
+    info_file = bug_dir / "bugsinpy_bug.info"
+    if info_file.exists():
+        for line in info_file.read_text().split('\n'):
+            if '=' in line:
+                key, value = line.split('=', 1)
+                info[key.strip()] = value.strip().strip('"')
+    return info
+
+def find_python(version: str) -> Optional[str]:
+    """Locate an interpreter for a BugsInPy python_version such as "3.8.3" """
+    if not version:
+        return shutil.which("python3")
+
+    candidates: List[Optional[str]] = []
+    pyenv_root = Path(os.environ.get("PYENV_ROOT", Path.home() / ".pyenv"))
+    candidates.append(str(pyenv_root / "versions" / version / "bin" / "python"))
+    candidates.append(shutil.which(f"python{'.'.join(version.split('.')[:2])}"))
+
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
@@ -0,0 +1,145 @@
+"""Patch size and change metrics of submitted fixes"""
+import difflib
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from green_agent.evaluator.unified_diff import PatchError, parse_patch
+
+@dataclass
+class DiffStats:
+    """Line-level changes of a fix
+
+    A removed line directly replaced by an added one counts as changed,
+    not as one removal plus one addition.
+    """
+    files_touched: int = 0
+    hunks: int = 0
+    lines_added: int = 0
+    lines_removed: int = 0
+    lines_changed: int = 0
+
+    @property
+    def patch_size(self) -> int:
+        """Lines touched, as scored by Scorer"""
+        return self.lines_added + self.lines_removed + self.lines_changed
+
+    def add(self, other: "DiffStats"):
+        self.files_touched += other.files_touched
+        self.hunks += other.hunks
+        self.lines_added += other.lines_added
+        self.lines_removed += other.lines_removed
+        self.lines_changed += other.lines_changed
+
+    def add_block(self, removed: int, added: int):
+        """Count one contiguous block of removed lines replaced by added lines"""
+        changed = min(removed, added)
+        self.lines_changed += changed
+        self.lines_removed += removed - changed
+        self.lines_added += added - changed
+
+class DiffEngine:
+    """Diffs fixes against the pristine sources of a checkout
+
+    Per-file results are memoized by the content hashes of both versions,
+    so resubmitting a fix (or another fix of the same file) does not diff
+    large unchanged files again.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._memo: "OrderedDict[Tuple[str, str], DiffStats]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def diff_files(self, bug_dir: Path, fixed_files: Dict[str, str]) -> DiffStats:
+        """Changes of fixed_files (path relative to bug_dir -> new content) against bug_dir"""
+        total = DiffStats()
+        for rel_path, content in fixed_files.items():
+            original_path = Path(bug_dir) / rel_path
+            try:
+                original = original_path.read_text(errors='replace') if original_path.is_file() else ""
+            except OSError:
+                original = ""
+            total.add(self.diff_text(original, content))
+        return total
+
+    def diff_text(self, original: str, fixed: str) -> DiffStats:
+        """Changes between two versions of one file, memoized by content"""
+        key = (_content_hash(original), _content_hash(fixed))
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return replace(self._memo[key])
+
+        stats = _diff_lines(original.splitlines(), fixed.splitlines())
+
+        with self._lock:
+            self._memo[key] = stats
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return replace(stats)
+
+    def diff_patch(self, patch: str) -> DiffStats:
+        """Changes described by a unified diff
+
+        Counts are read from the hunks, which is exact for any patch that
+        applies to the pristine sources. A malformed patch counts as empty.
+        """
+        stats = DiffStats()
+        try:
+            file_patches = parse_patch(patch)
+        except PatchError:
+            return stats
+
+        for file_patch in file_patches:
+            stats.files_touched += 1
+            for hunk in file_patch.hunks:
+                stats.hunks += 1
+                removed = added = 0
+                for line in hunk.lines:
+                    if line[0] == "-":
+                        if added:
+                            # A removal after additions starts a new block
+                            stats.add_block(removed, added)
+                            removed = added = 0
+                        removed += 1
+                    elif line[0] == "+":
+                        added += 1
+                    else:
+                        stats.add_block(removed, added)
+                        removed = added = 0
+                stats.add_block(removed, added)
+        return stats
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"memoized_files": len(self._memo)}
+
+def _diff_lines(original: List[str], fixed: List[str]) -> DiffStats:
+    stats = DiffStats()
+    # Fixes touch a few lines of large files: match the common ends cheaply
+    start = 0
+    while start < len(original) and start < len(fixed) and original[start] == fixed[start]:
+        start += 1
+    end = 0
+    while (end < len(original) - start and end < len(fixed) - start
+           and original[-1 - end] == fixed[-1 - end]):
+        end += 1
+    original = original[start:len(original) - end]
+    fixed = fixed[start:len(fixed) - end]
+    if not original and not fixed:
+        return stats
+
+    stats.files_touched = 1
+    matcher = difflib.SequenceMatcher(None, original, fixed, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            stats.hunks += 1
+            stats.add_block(i2 - i1, j2 - j1)
+    return stats
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8', errors='replace')).hexdigest()
@@ -0,0 +1,62 @@
+"""Prefetching pipeline for evaluating a sequence of bugs"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+class PrefetchPipeline:
+    """Prepares upcoming bugs in the background while the current one is evaluated
+
+    Checkout and compile (mostly I/O and dependency setup) of the next
+    `lookahead` bugs overlap with the test run of the current bug. Bugs are
+    still yielded in their original order, and a bug index that is already
+    being prepared is not prepared a second time concurrently. When the
+    consumer stops early (the run is closed or raises), bugs prepared ahead
+    but never yielded are handed to `release`.
+    """
+
+    def __init__(self, prepare: Callable[[int], Dict], lookahead: int = 2,
+                 release: Optional[Callable[[Dict], None]] = None):
+        self.prepare = prepare
+        self.lookahead = max(0, lookahead)
+        self.release = release
+
+    def run(self, bug_indices: List[int]) -> Iterator[Tuple[int, Optional[Dict], Optional[Exception]]]:
+        """Yield (bug_index, prepared, error) for each bug in order
+
+        prepared is the return value of `prepare` for the bug, or None with
+        the raised exception in error if preparing failed.
+        """
+        queue = deque(bug_indices)
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=max(1, self.lookahead), thread_name_prefix="prefetch")
+
+        def fill(current: int):
+            while queue and len(pending) < self.lookahead:
+                bug_index = queue[0]
+                if bug_index == current or any(i == bug_index for i, _ in pending):
+                    break
+                queue.popleft()
+                pending.append((bug_index, executor.submit(self.prepare, bug_index)))
+
+        try:
+            while queue or pending:
+                if not pending:
+                    bug_index = queue.popleft()
+                    pending.append((bug_index, executor.submit(self.prepare, bug_index)))
+
+                bug_index, future = pending.popleft()
+                fill(current=bug_index)
+
+                try:
+                    prepared, error = future.result(), None
+                except Exception as e:
+                    prepared, error = None, e
+                yield bug_index, prepared, error
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            # Drain: preparations that finished (or were running) were never yielded
+            for _, future in pending:
+                if self.release is not None and not future.cancelled() and future.exception() is None:
+                    self.release(future.result())
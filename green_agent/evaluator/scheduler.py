@@ -0,0 +1,296 @@
+"""Parallel evaluation of bugs under CPU, memory and per-language budgets"""
+import itertools
+import multiprocessing
+import os
+import threading
+from collections import Counter, deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from green_agent.managers.command import cancel_scope
+
+# Seconds between checks of a running job's cancel flag in its worker
+CANCEL_POLL_SECONDS = 0.5
+
+# Agent of a worker process, created by _init_worker
+_worker_agent = None
+# Queue of (job id, phase) back to the parent process, set by _init_worker
+_worker_phases = None
+
+@dataclass
+class _Job:
+    bug_index: int
+    language: str
+    kwargs: Dict
+    future: Future = field(default_factory=Future)
+    cost: Tuple[int, int] = (1, 0)
+    job_id: int = 0
+    on_phase: Optional[Callable[[str], None]] = None
+    # Shared with the worker once the job starts; set by cancel()
+    cancel_flag: Optional[object] = None
+    cancel_requested: bool = False
+
+class EvaluationScheduler:
+    """Runs evaluate_fix for many bugs at once in a pool of worker processes
+
+    Every job reserves the CPUs and memory configured for its language
+    before it starts. Jobs start in submission order, except that a job
+    which does not fit (its language is at its concurrency cap, or the
+    budget is used up) is skipped so that smaller jobs behind it keep the
+    remaining cores busy. A single job always fits an idle scheduler.
+
+    Each worker process builds its own RAIDGreenAgent from config_path and
+    shares the on-disk caches and workspace with the others. Phase
+    callbacks of evaluate_fix run in the parent, on a relay thread.
+    cancel() drops a queued job, or stops the commands of a running one in
+    its worker through a flag kept by a multiprocessing manager.
+    """
+
+    def __init__(self, config_path: str, bugs_catalog: List[Dict], cpu_cores: int = 0,
+                 memory_mb: int = 0, workers: int = 0, languages: Optional[Dict] = None):
+        """
+        Args:
+            config_path: Agent configuration loaded by every worker
+            bugs_catalog: Catalog the bug indices refer to
+            cpu_cores: CPU budget, 0 for all cores of the machine
+            memory_mb: Memory budget, 0 for none
+            workers: Worker processes, 0 for one per core of the budget
+            languages: Per-language {"max_concurrent", "cpus", "memory_mb"}
+        """
+        self.bugs_catalog = bugs_catalog
+        self.cpu_cores = cpu_cores or os.cpu_count() or 1
+        self.memory_mb = memory_mb
+        self.languages = languages or {}
+        # Workers must not inherit the parent's threads (reaper, command loop)
+        context = multiprocessing.get_context("spawn")
+        self._phases = context.Queue()
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers or self.cpu_cores,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(config_path, bugs_catalog, self._phases)
+        )
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._used_cpus = 0
+        self._used_memory = 0
+        self._running = Counter()
+        self._job_ids = itertools.count(1)
+        self._listeners: Dict[int, Callable[[str], None]] = {}
+        # Jobs started in a worker, by their future
+        self._started: Dict[Future, _Job] = {}
+        # Serves the cancel flags of running jobs; started with the first job
+        self._context = context
+        self._manager = None
+        self._relay = threading.Thread(target=self._relay_phases, name="scheduler-phases", daemon=True)
+        self._relay.start()
+
+    @classmethod
+    def from_config(cls, config: Dict, config_path: str, bugs_catalog: List[Dict]) -> Optional["EvaluationScheduler"]:
+        """Scheduler for the `scheduler` config section, None if it is disabled"""
+        scheduler_config = config.get('scheduler', {})
+        if not scheduler_config.get('enabled', False):
+            return None
+
+        return cls(
+            config_path,
+            bugs_catalog,
+            cpu_cores=scheduler_config.get('cpu_cores', 0),
+            memory_mb=scheduler_config.get('memory_mb', 0),
+            workers=scheduler_config.get('workers', 0),
+            languages=scheduler_config.get('languages', {})
+        )
+
+    def submit(self, bug_index: int, on_phase: Optional[Callable[[str], None]] = None, **kwargs) -> Future:
+        """Queue evaluate_fix(bug_index, **kwargs); the future resolves to its FixScore
+
+        on_phase receives the phases evaluate_fix reports from the worker
+        until the future is done.
+        """
+        language = self.bugs_catalog[bug_index]['language']
+        job = _Job(bug_index, language, kwargs, cost=self._cost(language), job_id=next(self._job_ids),
+                   on_phase=on_phase)
+        with self._lock:
+            if on_phase is not None:
+                self._listeners[job.job_id] = on_phase
+            self._queue.append(job)
+            runnable = self._take_runnable()
+        self._start(runnable)
+        return job.future
+
+    def cancel(self, future: Future) -> bool:
+        """Cancel a job: a queued one is dropped, a running one is stopped in its worker
+
+        A stopped evaluation stops its running command and starts no new
+        one, so its future fails with CommandCancelled shortly after.
+        Returns False if the job has already finished.
+        """
+        if future.cancel():
+            return True
+        with self._lock:
+            job = self._started.get(future)
+            if job is None:
+                return False
+            job.cancel_requested = True
+            flag = job.cancel_flag
+        # Not set yet if the job is still being handed to the pool; _start sets it then
+        if flag is not None:
+            flag.set()
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queued": len(self._queue),
+                "running": dict(self._running),
+                "cpus_in_use": self._used_cpus,
+                "memory_mb_in_use": self._used_memory
+            }
+
+    def shutdown(self):
+        """Cancel queued jobs and wait for running ones (cancel() them first to stop them)"""
+        with self._lock:
+            queued = list(self._queue)
+            self._queue.clear()
+            for job in queued:
+                self._listeners.pop(job.job_id, None)
+        for job in queued:
+            job.future.cancel()
+        self.pool.shutdown(wait=True)
+        self._phases.put(None)
+        self._relay.join()
+        if self._manager is not None:
+            self._manager.shutdown()
+
+    def _cost(self, language: str) -> Tuple[int, int]:
+        limits = self.languages.get(language, {})
+        cpus = min(limits.get('cpus', 1), self.cpu_cores)
+        memory = limits.get('memory_mb', 0)
+        if self.memory_mb:
+            memory = min(memory, self.memory_mb)
+        return cpus, memory
+
+    def _fits(self, job: _Job) -> bool:
+        cap = self.languages.get(job.language, {}).get('max_concurrent', 0)
+        if cap and self._running[job.language] >= cap:
+            return False
+        if not self._running:
+            return True
+
+        cpus, memory = job.cost
+        if self._used_cpus + cpus > self.cpu_cores:
+            return False
+        return not self.memory_mb or self._used_memory + memory <= self.memory_mb
+
+    def _take_runnable(self) -> List[_Job]:
+        """Reserve resources for every queued job that fits now (caller holds the lock)"""
+        runnable = []
+        for job in list(self._queue):
+            if job.future.cancelled():
+                self._queue.remove(job)
+                self._listeners.pop(job.job_id, None)
+                continue
+            if not self._fits(job):
+                continue
+
+            self._queue.remove(job)
+            if not job.future.set_running_or_notify_cancel():
+                self._listeners.pop(job.job_id, None)
+                continue
+            cpus, memory = job.cost
+            self._used_cpus += cpus
+            self._used_memory += memory
+            self._running[job.language] += 1
+            self._started[job.future] = job
+            runnable.append(job)
+        return runnable
+
+    def _relay_phases(self):
+        while True:
+            item = self._phases.get()
+            if item is None:
+                return
+            job_id, phase = item
+            with self._lock:
+                listener = self._listeners.get(job_id)
+            if listener is not None:
+                listener(phase)
+
+    def _start(self, jobs: List[_Job]):
+        for job in jobs:
+            try:
+                flag = self._cancel_flag()
+                with self._lock:
+                    job.cancel_flag = flag
+                    if job.cancel_requested:
+                        flag.set()
+                job_id = job.job_id if job.on_phase is not None else None
+                inner = self.pool.submit(_evaluate_in_worker, job.bug_index, job.kwargs, job_id, flag)
+            except RuntimeError as e:
+                # Pool shut down or broken
+                self._finished(job, None, e)
+                continue
+            inner.add_done_callback(lambda f, job=job: self._finished(job, f, None))
+
+    def _finished(self, job: _Job, inner: Optional[Future], error: Optional[BaseException]):
+        with self._lock:
+            cpus, memory = job.cost
+            self._used_cpus -= cpus
+            self._used_memory -= memory
+            self._running[job.language] -= 1
+            if not self._running[job.language]:
+                del self._running[job.language]
+            self._listeners.pop(job.job_id, None)
+            self._started.pop(job.future, None)
+            runnable = self._take_runnable()
+
+        if error is None:
+            error = CancelledError() if inner.cancelled() else inner.exception()
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(inner.result())
+        self._start(runnable)
+
+    def _cancel_flag(self):
+        """A new Event shared with the workers"""
+        with self._lock:
+            if self._manager is None:
+                self._manager = self._context.Manager()
+            return self._manager.Event()
+
+def _init_worker(config_path: str, bugs_catalog: List[Dict], phases):
+    global _worker_agent, _worker_phases
+    from green_agent.main import RAIDGreenAgent
+
+    _worker_agent = RAIDGreenAgent(config_path)
+    _worker_agent.bugs_catalog = bugs_catalog
+    _worker_phases = phases
+
+def _evaluate_in_worker(bug_index: int, kwargs: Dict, job_id: Optional[int], cancel_flag):
+    if job_id is not None:
+        kwargs = dict(kwargs, on_phase=lambda phase: _worker_phases.put((job_id, phase)))
+
+    stop = threading.Event()
+    done = threading.Event()
+    watcher = threading.Thread(target=_watch_cancel, args=(cancel_flag, stop, done), name="cancel-watch", daemon=True)
+    watcher.start()
+    try:
+        with cancel_scope(stop):
+            return _worker_agent.evaluate_fix(bug_index, **kwargs)
+    finally:
+        done.set()
+        watcher.join()
+
+def _watch_cancel(cancel_flag, stop: threading.Event, done: threading.Event):
+    """Set stop once the parent sets cancel_flag, until done is set"""
+    while not done.wait(CANCEL_POLL_SECONDS):
+        try:
+            cancelled = cancel_flag.is_set()
+        except (EOFError, OSError):
+            # Manager gone: the parent is shutting down
+            cancelled = True
+        if cancelled:
+            stop.set()
+            return
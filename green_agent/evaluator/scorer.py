@@ -44,7 +44,8 @@ class Scorer:
         
         # If tests didn't pass, check partial credit
         if not correctness and 'failing_tests' in fix_result:
-            total_tests = fix_result.get('total_tests', 1)
+            # Parsers report None when the output had no test counts
+            total_tests = fix_result.get('total_tests') or 1
             failing_tests = len(fix_result['failing_tests'])
             passing_tests = total_tests - failing_tests
             correctness = max(0, passing_tests / total_tests) * 0.5  # Max 50% for partial
@@ -0,0 +1,374 @@
+"""In-process parsing and application of unified diffs"""
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# Context lines that may be ignored at each end of a hunk that does not apply as is
+MAX_FUZZ = 2
+
+class PatchError(Exception):
+    """Raised for text that is not a well-formed unified diff"""
+
+@dataclass
+class Hunk:
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    # Hunk body lines with their " ", "-" or "+" prefix and without line ending
+    lines: List[str] = field(default_factory=list)
+    # The last old/new line has no newline ("\ No newline at end of file")
+    old_eof_newline: bool = True
+    new_eof_newline: bool = True
+
+    @property
+    def old_lines(self) -> List[str]:
+        return [line[1:] for line in self.lines if line[0] in " -"]
+
+    @property
+    def new_lines(self) -> List[str]:
+        return [line[1:] for line in self.lines if line[0] in " +"]
+
+@dataclass
+class FilePatch:
+    old_path: Optional[str]  # None for a created file
+    new_path: Optional[str]  # None for a deleted file
+    hunks: List[Hunk] = field(default_factory=list)
+    # "rename" or "copy" from git's extended headers, which apply_patch rejects
+    git_operation: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        return self.new_path if self.new_path is not None else self.old_path
+
+@dataclass
+class HunkFailure:
+    path: str
+    hunk: int  # 1-based index of the hunk within its file
+    old_start: int
+    reason: str
+
+@dataclass
+class PatchResult:
+    """Outcome of applying a fix; nothing is written unless every hunk applies"""
+    success: bool
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    failures: List[HunkFailure] = field(default_factory=list)
+    # (path, hunk, lines it moved from its header position, fuzz used) of hunks not applied exactly
+    offsets: List[Tuple[str, int, int, int]] = field(default_factory=list)
+
+def parse_patch(text: str) -> List[FilePatch]:
+    """Split a unified diff (plain or git style) into per-file hunks
+
+    Git renames and copies become file patches with git_operation set,
+    with or without hunks.
+
+    Raises:
+        PatchError: On truncated hunks or hunks outside a file header
+    """
+    patches = []
+    current = None
+    # Source of a git rename/copy, and the patch its headers created (which ---/+++ lines then belong to)
+    git_source = None
+    git_patch = None
+    lines = _split_lines(text)
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            if git_patch is None:
+                current = FilePatch(_header_path(line[4:]), _header_path(lines[i + 1][4:]))
+                patches.append(current)
+            git_patch = None
+            i += 2
+            continue
+
+        if line.startswith("diff --git "):
+            git_source = git_patch = None
+        elif line.startswith(("rename from ", "copy from ")):
+            git_source = line.split(" ", 2)[2]
+        elif line.startswith(("rename to ", "copy to ")) and git_source is not None:
+            # A pure rename has no ---/+++ lines, so the headers alone make the file patch
+            current = git_patch = FilePatch(git_source, line.split(" ", 2)[2], git_operation=line.split(" ")[0])
+            patches.append(current)
+            git_source = None
+
+        match = HUNK_HEADER.match(line)
+        if not match:
+            # diff --git, index, mode lines and free text between files
+            i += 1
+            continue
+        if current is None:
+            raise PatchError(f"Hunk without file header at line {i + 1}")
+
+        hunk = Hunk(
+            old_start=int(match.group(1)),
+            old_count=int(match.group(2)) if match.group(2) is not None else 1,
+            new_start=int(match.group(3)),
+            new_count=int(match.group(4)) if match.group(4) is not None else 1
+        )
+        old_left, new_left = hunk.old_count, hunk.new_count
+        i += 1
+        while old_left > 0 or new_left > 0:
+            if i >= len(lines):
+                raise PatchError(f"Truncated hunk {len(current.hunks) + 1} of {current.path}")
+            body = lines[i] if lines[i] else " "  # Some tools strip the space of empty context lines
+            kind = body[0]
+            if kind == " ":
+                old_left -= 1
+                new_left -= 1
+            elif kind == "-":
+                old_left -= 1
+            elif kind == "+":
+                new_left -= 1
+            elif kind == "\\":
+                _mark_missing_newline(hunk)
+            else:
+                raise PatchError(f"Unexpected line in hunk {len(current.hunks) + 1} of {current.path}: {lines[i]!r}")
+            if kind != "\\":
+                hunk.lines.append(body)
+            i += 1
+            if old_left < 0 or new_left < 0:
+                raise PatchError(f"Hunk {len(current.hunks) + 1} of {current.path} is longer than its header")
+
+        # The marker of the hunk's last line follows it
+        while i < len(lines) and lines[i].startswith("\\"):
+            _mark_missing_newline(hunk)
+            i += 1
+        current.hunks.append(hunk)
+    return patches
+
+def _mark_missing_newline(hunk: Hunk):
+    """Record a "\\ No newline at end of file" marker, which follows the line it applies to"""
+    last = hunk.lines[-1][0] if hunk.lines else " "
+    if last in " -":
+        hunk.old_eof_newline = False
+    if last in " +":
+        hunk.new_eof_newline = False
+
+def apply_patch(root: Path, text: str, max_fuzz: int = MAX_FUZZ) -> PatchResult:
+    """Apply a unified diff to the files under root, all or nothing"""
+    try:
+        patches = parse_patch(text)
+    except PatchError as e:
+        return PatchResult(False, failures=[HunkFailure("", 0, 0, str(e))])
+    if not patches:
+        return PatchResult(False, failures=[HunkFailure("", 0, 0, "Patch contains no file changes")])
+
+    result = PatchResult(True)
+    contents: Dict[str, Optional[str]] = {}
+    for file_patch in patches:
+        if file_patch.git_operation is not None:
+            result.failures.append(HunkFailure(
+                file_patch.path, 0, 0,
+                f"Git {file_patch.git_operation} of {file_patch.old_path} to {file_patch.new_path} is not supported; "
+                f"send it as a deleted and a new file"
+            ))
+            continue
+
+        rel_path = _resolve(root, file_patch)
+        if rel_path is None:
+            result.failures.append(HunkFailure(file_patch.path, 0, 0, "Path outside the checkout"))
+            continue
+
+        if rel_path in contents:
+            original = contents[rel_path]
+        elif file_patch.old_path is None:
+            original = None
+        else:
+            original = _read(root / rel_path)
+            if original is None:
+                result.failures.append(HunkFailure(rel_path, 0, 0, "File does not exist"))
+                continue
+
+        if file_patch.new_path is None:
+            contents[rel_path] = None
+            continue
+
+        patched = _apply_hunks(rel_path, original or "", file_patch.hunks, max_fuzz, result)
+        if patched is not None:
+            contents[rel_path] = patched
+
+    if result.failures:
+        result.success = False
+        return result
+    return _write_all(root, contents, result)
+
+def apply_contents(root: Path, files: Dict[str, str]) -> PatchResult:
+    """Replace whole files under root, all or nothing, leaving identical files untouched"""
+    result = PatchResult(True)
+    for rel_path in files:
+        if not _inside(root, rel_path):
+            result.failures.append(HunkFailure(rel_path, 0, 0, "Path outside the checkout"))
+    if result.failures:
+        result.success = False
+        return result
+    return _write_all(root, dict(files), result)
+
+def _apply_hunks(path: str, text: str, hunks: List[Hunk], max_fuzz: int,
+                 result: PatchResult) -> Optional[str]:
+    lines = _split_lines(text)
+    newline = "\r\n" if text.count("\r\n") * 2 > text.count("\n") else "\n"
+    eof_newline = text.endswith("\n") or not text
+
+    output = []
+    position = 0  # Next line of `lines` not yet copied to output
+    offset = 0  # Drift of earlier hunks relative to their headers
+    for index, hunk in enumerate(hunks, 1):
+        found = _locate(lines, hunk, position, offset, max_fuzz)
+        if found is None:
+            result.failures.append(HunkFailure(path, index, hunk.old_start, "Context does not match"))
+            continue
+
+        start, fuzz_head, fuzz_tail = found
+        old_lines = hunk.old_lines
+        new_lines = hunk.new_lines
+        offset = start - fuzz_head - _header_line(hunk)
+        if offset or fuzz_head or fuzz_tail:
+            result.offsets.append((path, index, offset, max(fuzz_head, fuzz_tail)))
+
+        output.extend(lines[position:start])
+        # Fuzzed-away context stays as it is in the file
+        matched = len(old_lines) - fuzz_head - fuzz_tail
+        output.extend(new_lines[fuzz_head:len(new_lines) - fuzz_tail])
+        position = start + matched
+        if position >= len(lines) and hunk.lines:
+            eof_newline = hunk.new_eof_newline
+
+    if result.failures:
+        return None
+    output.extend(lines[position:])
+    if not output:
+        return ""
+    return newline.join(output) + (newline if eof_newline else "")
+
+def _locate(lines: List[str], hunk: Hunk, position: int, offset: int,
+            max_fuzz: int) -> Optional[Tuple[int, int, int]]:
+    """Where the old side of a hunk matches: (start line, context dropped at head, at tail)
+
+    Tries the header position (shifted by the drift of earlier hunks)
+    first, then ever larger offsets in both directions, like patch(1).
+    """
+    old_lines = [line.rstrip("\r") for line in hunk.old_lines]
+    expected = _header_line(hunk) + offset
+    leading = _context_run(hunk.lines)
+    trailing = _context_run(reversed(hunk.lines))
+
+    for fuzz in range(0, max_fuzz + 1):
+        head, tail = min(fuzz, leading), min(fuzz, trailing)
+        if fuzz and not head and not tail:
+            break
+        needle = old_lines[head:len(old_lines) - tail]
+        target = expected + head
+        for delta in range(len(lines) + 1):
+            for start in (target + delta, target - delta) if delta else (target,):
+                if start < position or start + len(needle) > len(lines):
+                    continue
+                if all(lines[start + k].rstrip("\r") == needle[k] for k in range(len(needle))):
+                    return start, head, tail
+    return None
+
+def _header_line(hunk: Hunk) -> int:
+    """0-based line the old side of a hunk starts at according to its header"""
+    # A pure insertion's header names the line it goes after
+    return max(hunk.old_start - 1, 0) if hunk.old_count else hunk.old_start
+
+def _split_lines(text: str) -> List[str]:
+    """Lines without their \n or \r\n (unlike str.splitlines, form feeds do not split)"""
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return [line[:-1] if line.endswith("\r") else line for line in lines]
+
+def _context_run(lines) -> int:
+    count = 0
+    for line in lines:
+        if line[0] != " ":
+            break
+        count += 1
+    return count
+
+def _write_all(root: Path, contents: Dict[str, Optional[str]], result: PatchResult) -> PatchResult:
+    """Write the new contents (None deletes), restoring every file if any write fails"""
+    originals: Dict[str, Optional[bytes]] = {}
+    for rel_path, content in contents.items():
+        path = root / rel_path
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            current = path.read_bytes() if path.is_file() else None
+            data = content.encode('utf-8', errors='surrogateescape') if content is not None else None
+            if current == data:
+                result.unchanged.append(rel_path)
+                continue
+
+            originals[rel_path] = current
+            if data is None:
+                path.unlink()
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path.write_bytes(data)
+                if current is not None:
+                    os.chmod(tmp_path, path.stat().st_mode)
+                os.replace(tmp_path, path)
+            result.changed.append(rel_path)
+        except OSError as e:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            result.success = False
+            result.failures.append(HunkFailure(rel_path, 0, 0, f"Write failed: {e}"))
+            result.failures.extend(_restore(root, originals))
+            result.changed = []
+            break
+    return result
+
+def _restore(root: Path, originals: Dict[str, Optional[bytes]]) -> List[HunkFailure]:
+    """Put back the original contents (None: the file did not exist), reporting files that could not be"""
+    failures = []
+    for rel_path, data in originals.items():
+        path = root / rel_path
+        try:
+            if data is None:
+                if path.exists():
+                    path.unlink()
+            else:
+                path.write_bytes(data)
+        except OSError as e:
+            failures.append(HunkFailure(rel_path, 0, 0, f"Restoring the original failed: {e}"))
+    return failures
+
+def _header_path(header: str) -> Optional[str]:
+    path = header.split('\t')[0].strip()
+    if path.startswith('"') and path.endswith('"'):
+        path = path[1:-1]
+    return None if path == "/dev/null" else path
+
+def _resolve(root: Path, file_patch: FilePatch) -> Optional[str]:
+    """Checkout-relative path of a patched file, stripping git's a/ and b/ prefixes"""
+    path = file_patch.path
+    candidates = [path]
+    if path.startswith(("a/", "b/")):
+        candidates.insert(0, path[2:])
+        # A new file only exists under its stripped name once it is created
+        if file_patch.old_path is not None and not (root / path[2:]).exists() and (root / path).exists():
+            candidates.reverse()
+    for candidate in candidates:
+        if _inside(root, candidate):
+            return candidate
+    return None
+
+def _inside(root: Path, rel_path: str) -> bool:
+    if os.path.isabs(rel_path):
+        return False
+    resolved = os.path.realpath(os.path.join(root, rel_path))
+    return resolved == os.path.realpath(root) or resolved.startswith(os.path.realpath(root) + os.sep)
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_bytes().decode('utf-8', errors='surrogateescape')
+    except OSError:
+        return None
@@ -3,13 +3,29 @@ import yaml
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 from green_agent.managers.java_manager import JavaManager
 from green_agent.managers.python_manager import PythonManager
 from green_agent.managers.js_manager import JSManager
+from green_agent.managers.jvm_runner import JVMRunnerPool
+from green_agent.managers.workspace import WorkspaceAllocator
 from green_agent.evaluator.scorer import Scorer, FixScore
+from green_agent.evaluator.diff_engine import DiffEngine, DiffStats
+from green_agent.evaluator.fix_applicator import FixApplicator
+from green_agent.cache.checkout_cache import CheckoutCache
+from green_agent.cache.build_cache import BuildCache
+from green_agent.cache.dependency_store import DependencyStore
+from green_agent.cache.venv_pool import VenvPool
+from green_agent.cache.discovery_cache import DiscoveryCache
+from green_agent.cache.metadata_store import BugMetadataStore
+from green_agent.cache.outcome_cache import OutcomeCache, diff_outcomes
+from green_agent.cache.coverage_index import CoverageIndex, changed_lines
+from green_agent.cache.discovery_cache import git_revision
+from green_agent.cache.evaluation_memo import EvaluationMemo, fix_hash
 
 class RAIDGreenAgent:    
     def __init__(self, config_path: str = None):
@@ -20,23 +36,127 @@ class RAIDGreenAgent:
             else:
                 config_path = "configs/agent_config.yaml"
         # Load configuration
+        self.config_path = config_path
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
         
         # Initialize managers
         paths = self.config['paths']
-        workspace = paths['workspace']
+        workspace_config = self.config.get('workspace', {})
+        self.workspace = WorkspaceAllocator(
+            paths['workspace'],
+            quota_mb=workspace_config.get('quota_mb', 0),
+            reap_interval=workspace_config.get('reap_interval', 30)
+        )
         
-        self.java_manager = JavaManager(paths['defects4j'], workspace)
-        self.python_manager = PythonManager(paths['bugsinpy'], workspace)
-        self.js_manager = JSManager(paths['bugsjs'], workspace)
+        # Initialize caches
+        self.checkout_cache = self._create_checkout_cache()
+        self.build_cache = self._create_build_cache()
+        self.npm_store = self._create_npm_store()
+        self.venv_pool = self._create_venv_pool()
+        
+        self.jvm_runners = self._create_jvm_runners()
+        discovery_dir = self._cache_dir('discovery')
+        self.discovery_cache = DiscoveryCache(discovery_dir) if discovery_dir else None
+        metadata_dir = self._cache_dir('metadata')
+        self.metadata_store = BugMetadataStore(os.path.join(metadata_dir, 'bugs.db')) if metadata_dir else None
+        baselines_dir = self._cache_dir('baselines')
+        self.outcome_cache = OutcomeCache(baselines_dir) if baselines_dir else None
+        coverage_dir = self._cache_dir('coverage')
+        self.coverage_index = CoverageIndex(coverage_dir) if coverage_dir else None
+        evaluations_dir = self._cache_dir('evaluations')
+        self.evaluation_memo = EvaluationMemo(os.path.join(evaluations_dir, 'memo.db')) if evaluations_dir else None
+        
+        java_baselines = self.config.get('cache', {}).get('java_baselines', {})
+        self.java_manager = JavaManager(paths['defects4j'], self.workspace, self.checkout_cache,
+                                        self._cache_dir('java_baselines'), self.jvm_runners,
+                                        self.discovery_cache, self.metadata_store,
+                                        baseline_max_size_mb=java_baselines.get('max_size_mb', 20480),
+                                        baseline_max_entries=java_baselines.get('max_entries', 100))
+        self.python_manager = PythonManager(paths['bugsinpy'], self.workspace, self.checkout_cache, self.venv_pool,
+                                            self.discovery_cache, self.metadata_store)
+        self.js_manager = JSManager(paths['bugsjs'], self.workspace, self.checkout_cache, self.npm_store,
+                                    self.discovery_cache, self.metadata_store)
         
         # Initialize scorer
         self.scorer = Scorer(self.config['evaluation'])
+        self.diff_engine = DiffEngine()
+        self.fix_applicator = FixApplicator()
         
         # Selected bugs catalog
         self.bugs_catalog = []
     
+    def _cache_dir(self, name: str) -> Optional[str]:
+        """Directory of an enabled cache section that only needs a location"""
+        cache_config = self.config.get('cache', {})
+        if not cache_config.get(name, {}).get('enabled', False):
+            return None
+        return os.path.join(cache_config['root'], name.replace('_', '-'))
+    
+    def _create_checkout_cache(self) -> Optional[CheckoutCache]:
+        cache_config = self.config.get('cache', {})
+        checkout_config = cache_config.get('checkouts', {})
+        if not checkout_config.get('enabled', False):
+            return None
+        
+        return CheckoutCache(
+            os.path.join(cache_config['root'], 'checkouts'),
+            max_size_mb=checkout_config.get('max_size_mb', 20480),
+            max_entries=checkout_config.get('max_entries', 200),
+            clone_mode=checkout_config.get('clone_mode', 'auto')
+        )
+    
+    def _create_build_cache(self) -> Optional[BuildCache]:
+        cache_config = self.config.get('cache', {})
+        build_config = cache_config.get('builds', {})
+        if not build_config.get('enabled', False):
+            return None
+        
+        return BuildCache(
+            os.path.join(cache_config['root'], 'builds'),
+            max_size_mb=build_config.get('max_size_mb', 10240),
+            max_entries=build_config.get('max_entries', 500),
+            clone_mode=cache_config.get('checkouts', {}).get('clone_mode', 'auto')
+        )
+    
+    def _create_npm_store(self) -> Optional[DependencyStore]:
+        cache_config = self.config.get('cache', {})
+        npm_config = cache_config.get('npm', {})
+        if not npm_config.get('enabled', False):
+            return None
+        
+        return DependencyStore(
+            os.path.join(cache_config['root'], 'npm'),
+            link_mode=npm_config.get('link_mode', 'auto'),
+            fetch_missing=npm_config.get('fetch_missing', False),
+            max_size_mb=npm_config.get('max_size_mb', 20480),
+            max_entries=npm_config.get('max_entries', 100)
+        )
+    
+    def _create_venv_pool(self) -> Optional[VenvPool]:
+        cache_config = self.config.get('cache', {})
+        venv_config = cache_config.get('venvs', {})
+        if not venv_config.get('enabled', False):
+            return None
+        
+        return VenvPool(
+            os.path.join(cache_config['root'], 'venvs'),
+            max_envs=venv_config.get('max_envs', 20),
+            pip_timeout=venv_config.get('pip_timeout', 1800)
+        )
+    
+    def _create_jvm_runners(self) -> Optional[JVMRunnerPool]:
+        runner_config = self.config.get('jvm_runner', {})
+        if not runner_config.get('enabled', False):
+            return None
+        
+        return JVMRunnerPool(
+            runner_config['work_dir'],
+            java=runner_config.get('java', 'java'),
+            javac=runner_config.get('javac', 'javac'),
+            max_restarts=runner_config.get('max_restarts', 3)
+        )
+    
     def initialize_benchmark(self):
         print("Initializing RAID-AI Benchmark...")
         
@@ -45,16 +165,18 @@ class RAIDGreenAgent:
         python_count = self.config['bugs']['python']['count']
         js_count = self.config['bugs']['javascript']['count']
         
-        print(f"  Selecting {java_count} Java bugs...")
-        java_bugs = self.java_manager.select_bugs(java_count)
-        self.bugs_catalog.extend(java_bugs)
+        # Discover bugs of all three frameworks concurrently
+        print(f"  Selecting {java_count} Java, {python_count} Python and {js_count} JavaScript bugs...")
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            java_future = pool.submit(self.java_manager.select_bugs, java_count)
+            python_future = pool.submit(self.python_manager.select_bugs, python_count)
+            js_future = pool.submit(self.js_manager.select_bugs, js_count)
         
-        print(f"  Selecting {python_count} Python bugs...")
-        python_bugs = self.python_manager.select_bugs(python_count)
+        java_bugs = java_future.result()
+        python_bugs = python_future.result()
+        js_bugs = js_future.result()
+        self.bugs_catalog.extend(java_bugs)
         self.bugs_catalog.extend(python_bugs)
-        
-        print(f"  Selecting {js_count} JavaScript bugs...")
-        js_bugs = self.js_manager.select_bugs(js_count)
         self.bugs_catalog.extend(js_bugs)
         
         print(f"Benchmark initialized with {len(self.bugs_catalog)} bugs")
@@ -80,12 +202,69 @@ class RAIDGreenAgent:
             return self.bugs_catalog[index]
         return None
     
-    def evaluate_fix(self, bug_index: int, fixed_code_path: str) -> FixScore:
+    def prepare_bug(self, bug_index: int, on_phase: Optional[Callable[[str], None]] = None) -> Dict:
+        """Check out and build a bug ahead of evaluating a fix for it
+        
+        Args:
+            bug_index: Index of the bug in catalog
+            on_phase: Called with "checkout" and "build" as each step starts
+        
+        Returns:
+            Dict with the bug_dir, the compile outcome and the time it took,
+            to be passed to evaluate_fix as `prepared`
+        """
+        bug = self.get_bug(bug_index)
+        if not bug:
+            raise ValueError(f"Invalid bug index: {bug_index}")
+        
+        on_phase = on_phase or _ignore_phase
+        start_time = time.time()
+        manager = self._get_manager(bug)
+        
+        # Checkout the bug
+        on_phase("checkout")
+        bug_dir = manager.checkout_bug(bug['project'], bug['bug_id'], buggy=True)
+        prepared = {'bug_index': bug_index, 'bug_dir': bug_dir, 'compiled': None, 'cache_hit': None}
+        
+        on_phase("build")
+        try:
+            if manager is self.java_manager and manager.incremental:
+                # Compiling happens together with the tests; only build the baseline now
+                manager.ensure_baseline(bug_dir)
+            else:
+                # Compile, or restore the outputs of an earlier build of the same sources
+                prepared['compiled'], prepared['cache_hit'] = self._compile(manager, bug, bug_dir)
+        except Exception:
+            manager.release_bug(bug_dir)
+            raise
+        
+        prepared['prepare_time'] = time.time() - start_time
+        
+        # Measured once per bug on the pristine checkout; not charged to the fix
+        if self.coverage_index is not None and hasattr(manager, 'build_coverage'):
+            self.coverage_index.ensure(bug, self._framework_path(bug), lambda: manager.build_coverage(bug_dir))
+        return prepared
+    
+    def release_prepared(self, prepared: Dict):
+        """Release the checkout of a prepare_bug result that will not be evaluated"""
+        bug = self.get_bug(prepared['bug_index'])
+        self._get_manager(bug).release_bug(prepared['bug_dir'])
+    
+    def evaluate_fix(self, bug_index: int, fixed_code_path: Optional[str] = None,
+                     prepared: Optional[Dict] = None, fixed_files: Optional[Dict[str, str]] = None,
+                     patch: Optional[str] = None, on_phase: Optional[Callable[[str], None]] = None) -> FixScore:
         """Evaluate a fix submitted by a purple agent
         
         Args:
             bug_index: Index of the bug in catalog
-            fixed_code_path: Path to the fixed code
+            fixed_code_path: Directory of fixed files, laid out like the checkout
+            prepared: Result of prepare_bug for this bug, if it was already
+                checked out (e.g. prefetched); checked out here otherwise
+            fixed_files: Fixed file contents by path relative to the checkout
+            patch: Unified diff against the checkout, applied after fixed_files
+            on_phase: Called with the name of each step as it starts: "checkout"
+                and "build" (unless prepared), then "apply", "compile" (when the
+                fix is compiled on its own) and "test"; not called for memoized fixes
         
         Returns:
             FixScore object with evaluation results
@@ -96,41 +275,232 @@ class RAIDGreenAgent:
         
         print(f"🧪 Evaluating fix for {bug['language']} bug: {bug['project']} #{bug['bug_id']}")
         
-        start_time = time.time()
+        manager = self._get_manager(bug)
+        if fixed_code_path is not None:
+            fixed_files = dict(_read_fixed_files(Path(fixed_code_path)), **(fixed_files or {}))
+        fixed_files = fixed_files or {}
+        # "tiered" stops at the first failing tier (trigger, relevant, all)
+        test_suite = self.config['evaluation'].get('test_suite', 'tiered')
         
-        # Get appropriate manager
-        if bug['language'] == 'java':
-            manager = self.java_manager
-        elif bug['language'] == 'python':
-            manager = self.python_manager
-        else:
-            manager = self.js_manager
+        # Identical (up to whitespace) fixes of a bug are only evaluated once
+        memo_key = revision = None
+        if self.evaluation_memo is not None:
+            memo_key = fix_hash(fixed_files, patch)
+            revision = git_revision(self._framework_path(bug)) or "unversioned"
+            cached = self.evaluation_memo.get(bug, memo_key, test_suite, revision)
+            if cached is not None:
+                if prepared is not None:
+                    manager.release_bug(prepared['bug_dir'])
+                return self._score_cached(bug, cached)
         
-        # Checkout the bug
-        bug_dir = manager.checkout_bug(bug['project'], bug['bug_id'], buggy=True)
+        if prepared is None:
+            prepared = self.prepare_bug(bug_index, on_phase)
         
-        # Apply the fix (this would be implemented based on how purple agent submits)
-        # For now, placeholder
+        try:
+            score, test_result = self._evaluate_prepared(bug, manager, prepared, fixed_files, patch, test_suite,
+                                                         on_phase or _ignore_phase)
+        finally:
+            # The reaper deletes the checkout in the background
+            manager.release_bug(prepared['bug_dir'])
+        
+        # Timeouts and patches that did not apply may well go differently next time
+        if memo_key is not None and not test_result.get('timeout') and not test_result.get('apply_failed'):
+            self.evaluation_memo.store(bug, memo_key, test_suite, revision, {
+                'test_result': test_result,
+                'time_taken': score.details['time_taken'],
+                'patch_size': score.details['patch_size'],
+                'details': score.details
+            })
+        score.details['cached'] = False
+        return score
+    
+    def _score_cached(self, bug: Dict, cached: Dict) -> FixScore:
+        """Score of a memoized evaluation, rescored in case the scoring config changed"""
+        score = self.scorer.score_fix(bug, cached['test_result'], cached['time_taken'], cached['patch_size'])
+        score.details.update(cached['details'])
+        score.details['cached'] = True
+        print(f"   Score: {score.total_score:.2f} (Correctness: {score.correctness:.2f}, cached)")
+        return score
+    
+    def _evaluate_prepared(self, bug: Dict, manager, prepared: Dict, fixed_files: Dict[str, str],
+                           patch: Optional[str], test_suite: str,
+                           on_phase: Callable[[str], None]) -> Tuple[FixScore, Dict]:
+        """Apply, compile and test a fix on a prepared checkout
+        
+        Returns:
+            (score, raw test result)
+        """
+        # Time spent preparing counts even when it overlapped an earlier evaluation
+        start_time = time.time() - prepared['prepare_time']
+        bug_dir = prepared['bug_dir']
+        
+        # Measure the fix against the pristine checkout, then apply it
+        on_phase("apply")
+        diff = self._diff_fix(bug_dir, fixed_files, patch)
+        changed, apply_errors = self._apply_fix(bug_dir, fixed_files, patch)
+        if apply_errors:
+            test_result = {'success': False, 'apply_failed': True}
+            score = self.scorer.score_fix(bug, test_result, time.time() - start_time, diff.patch_size)
+            score.details['apply_failed'] = True
+            score.details['apply_errors'] = apply_errors
+            score.details['diff'] = asdict(diff)
+            return score, test_result
+        
+        relevant_tests = self._covering_tests(bug, bug_dir)
+        incremental = manager is self.java_manager and manager.incremental
+        if incremental:
+            # Recompile only the patched sources and test in the same run
+            cache_hit = None
+            on_phase("test")
+            test_result = manager.compile_and_test(bug_dir, test_suite, relevant_tests)
+            compile_success = not test_result.get('compile_failed', False)
+        elif changed:
+            # The prepared build is of the pristine sources
+            on_phase("compile")
+            compile_success, cache_hit = self._compile(manager, bug, bug_dir, changed)
+        else:
+            # The fix left every file as it was, so the prepared build is current
+            compile_success, cache_hit = prepared['compiled'], prepared['cache_hit']
         
-        # Compile
-        compile_success = manager.compile_bug(bug_dir)
         if not compile_success:
             elapsed = time.time() - start_time
-            return self.scorer.score_fix(bug, {'success': False}, elapsed, 0)
+            test_result = {'success': False, 'compile_failed': True}
+            score = self.scorer.score_fix(bug, test_result, elapsed, diff.patch_size)
+            self._add_build_cache_details(score, cache_hit)
+            score.details['diff'] = asdict(diff)
+            return score, test_result
         
         # Run tests
-        test_result = manager.run_tests(bug_dir)
+        if not incremental:
+            on_phase("test")
+            test_result = manager.run_tests(bug_dir, test_suite, relevant_tests)
         elapsed = time.time() - start_time
         
-        # Calculate patch size (placeholder - would need diff logic)
-        patch_size = 10  # TODO: Calculate actual diff
-        
         # Score the fix
-        score = self.scorer.score_fix(bug, test_result, elapsed, patch_size)
+        score = self.scorer.score_fix(bug, test_result, elapsed, diff.patch_size)
+        self._add_build_cache_details(score, cache_hit)
+        score.details['diff'] = asdict(diff)
+        self._add_outcome_diff(score, bug, manager, test_result)
+        if relevant_tests is not None:
+            score.details['covering_tests'] = relevant_tests
         
         print(f"   Score: {score.total_score:.2f} (Correctness: {score.correctness:.2f})")
         
-        return score
+        return score, test_result
+    
+    def _get_manager(self, bug: Dict):
+        if bug['language'] == 'java':
+            return self.java_manager
+        elif bug['language'] == 'python':
+            return self.python_manager
+        else:
+            return self.js_manager
+    
+    def _compile(self, manager, bug: Dict, bug_dir: Path, changed: Optional[List[str]] = None,
+                 buggy: bool = True) -> Tuple[bool, Optional[bool]]:
+        """Compile bug_dir through the build cache
+        
+        Args:
+            changed: Files the fix changed in the pristine checkout
+            buggy: Whether bug_dir is a checkout of the buggy version
+        
+        Returns:
+            (compile succeeded, build cache hit or None when the cache is disabled)
+        """
+        if self.build_cache is None:
+            return manager.compile_bug(bug_dir), None
+        
+        revision = git_revision(self._framework_path(bug)) or "unversioned"
+        key = self.build_cache.source_key(bug, bug_dir, buggy, revision, changed or [])
+        if self.build_cache.restore(key, bug_dir, manager.build_artifacts(bug_dir)):
+            # Pooled virtualenvs are not part of the cached outputs
+            if manager is self.python_manager and self.venv_pool is not None:
+                return self.venv_pool.attach(bug_dir) or manager.compile_bug(bug_dir), True
+            # Neither is node_modules, which compile_bug links from the dependency store
+            if manager is self.js_manager:
+                return manager.compile_bug(bug_dir), True
+            return True, True
+        
+        compile_success = manager.compile_bug(bug_dir)
+        if compile_success:
+            self.build_cache.store(key, bug_dir, manager.build_artifacts(bug_dir))
+        return compile_success, False
+    
+    def _add_build_cache_details(self, score: FixScore, cache_hit: Optional[bool]):
+        if self.build_cache is None:
+            return
+        stats = self.build_cache.stats()
+        score.details['compile_cache_hit'] = cache_hit
+        score.details['compile_cache_hits'] = stats['hits']
+        score.details['compile_cache_misses'] = stats['misses']
+    
+    def _diff_fix(self, bug_dir: Path, fixed_files: Dict[str, str], patch: Optional[str]) -> DiffStats:
+        diff = self.diff_engine.diff_files(bug_dir, fixed_files)
+        if patch:
+            diff.add(self.diff_engine.diff_patch(patch))
+        return diff
+    
+    def _apply_fix(self, bug_dir: Path, fixed_files: Dict[str, str],
+                   patch: Optional[str]) -> Tuple[List[str], List[Dict]]:
+        """Apply the fix to the checkout
+        
+        Returns:
+            (files that changed, hunk-level failures; empty if it applied)
+        """
+        changed = []
+        if fixed_files:
+            result = self.fix_applicator.apply_file_changes(bug_dir, fixed_files)
+            if not result.success:
+                return changed, [asdict(f) for f in result.failures]
+            changed.extend(result.changed)
+        if patch:
+            result = self.fix_applicator.apply_patch(bug_dir, patch)
+            if not result.success:
+                return changed, [asdict(f) for f in result.failures]
+            changed.extend(result.changed)
+        return changed, []
+    
+    def _framework_path(self, bug: Dict) -> Path:
+        return Path(self.config['paths'][bug['framework']])
+    
+    def _covering_tests(self, bug: Dict, bug_dir: Path) -> Optional[List[str]]:
+        """Relevant tests covering the lines the fix changed, None to run all of them
+        
+        None when the bug has no coverage index or the checkout is unchanged.
+        """
+        if self.coverage_index is None:
+            return None
+        changed = changed_lines(bug_dir)
+        if not changed:
+            return None
+        return self.coverage_index.select(bug, self._framework_path(bug), changed)
+    
+    def _add_outcome_diff(self, score: FixScore, bug: Dict, manager, test_result: Dict):
+        """Newly passing/failing tests of the candidate relative to the buggy version"""
+        baseline = self.baseline_outcomes(bug, manager)
+        if baseline is not None:
+            score.details.update(diff_outcomes(baseline, test_result.get('test_records') or []))
+    
+    def baseline_outcomes(self, bug: Dict, manager=None) -> Optional[Dict[str, Dict[str, str]]]:
+        """Per-test outcomes of the buggy and fixed version of a bug
+        
+        The full test suite of both versions runs the first time a bug is
+        evaluated; later evaluations read the stored outcomes. None for
+        BugsJS, which ships only the buggy version of each bug.
+        """
+        manager = manager or self._get_manager(bug)
+        if self.outcome_cache is None or manager is self.js_manager:
+            return None
+        
+        def run_version(buggy: bool) -> Dict:
+            bug_dir = manager.checkout_bug(bug['project'], bug['bug_id'], buggy=buggy)
+            try:
+                compiled, _ = self._compile(manager, bug, bug_dir, buggy=buggy)
+                return manager.run_tests(bug_dir, 'all') if compiled else {}
+            finally:
+                manager.release_bug(bug_dir)
+        
+        return self.outcome_cache.get(bug, self._framework_path(bug), run_version)
     
     def get_leaderboard(self, scores: List[FixScore]) -> Dict:
         return self.scorer.aggregate_scores(scores)
@@ -150,6 +520,16 @@ class RAIDGreenAgent:
             }
         }
 
+def _ignore_phase(phase: str):
+    pass
+
+def _read_fixed_files(root: Path) -> Dict[str, str]:
+    """Contents of the files under root, by path relative to it"""
+    return {
+        str(path.relative_to(root)): path.read_text(errors='replace')
+        for path in sorted(root.rglob('*')) if path.is_file()
+    }
+
 if __name__ == "__main__":
     agent = RAIDGreenAgent()
     agent.initialize_benchmark()
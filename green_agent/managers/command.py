@@ -0,0 +1,172 @@
+"""Asynchronous execution of framework commands (defects4j, bugsinpy, npm...)
+
+Commands run as asyncio subprocesses in their own process group, so a
+timeout or cancellation kills everything they spawned (ant forks JVMs,
+npm forks node). Coroutines can await run_command_async directly; the
+synchronous managers call run_command, which runs the command on a shared
+background event loop and only blocks the calling thread.
+"""
+import asyncio
+import os
+import signal
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Seconds between SIGTERM and SIGKILL when a command is stopped
+KILL_GRACE_PERIOD = 5.0
+
+# Longest output line read in one piece (ant prints whole classpaths)
+STREAM_LIMIT = 16 * 1024 * 1024
+
+# Line callback for streamed output: (stream name "stdout"/"stderr", line).
+# Returning True stops the command (e.g. at the first failing test).
+OutputCallback = Callable[[str, str], Optional[bool]]
+
+@dataclass
+class CommandResult:
+    """Outcome of a command, with the attributes of subprocess.CompletedProcess"""
+    args: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool = False
+    stopped: bool = False
+
+class CommandCancelled(Exception):
+    """Raised when a command is stopped through its cancel scope"""
+
+async def run_command_async(args: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                            timeout: Optional[float] = None,
+                            on_output: Optional[OutputCallback] = None) -> CommandResult:
+    """Run a command, streaming its output lines to on_output
+
+    On timeout, or when on_output returns True, the process group is killed
+    and the result has timed_out or stopped set; on cancellation it is
+    killed and CancelledError propagates.
+    """
+    start = time.time()
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        env=env,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+        limit=STREAM_LIMIT
+    )
+    stdout, stderr = [], []
+    stop = asyncio.Event()
+
+    def handle(name: str, line: str):
+        if on_output is not None and on_output(name, line):
+            stop.set()
+
+    readers = asyncio.ensure_future(asyncio.gather(
+        _read_stream(process.stdout, "stdout", stdout, handle),
+        _read_stream(process.stderr, "stderr", stderr, handle),
+        process.wait()
+    ))
+    stop_requested = asyncio.ensure_future(stop.wait())
+
+    timed_out = False
+    try:
+        done, _ = await asyncio.wait({readers, stop_requested}, timeout=timeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if readers not in done:
+            timed_out = not stop.is_set()
+            await _kill_group(process)
+            await readers
+    except asyncio.CancelledError:
+        await _kill_group(process)
+        readers.cancel()
+        raise
+    finally:
+        stop_requested.cancel()
+
+    return CommandResult(
+        args=list(args),
+        returncode=process.returncode,
+        stdout="".join(stdout),
+        stderr="".join(stderr),
+        duration=time.time() - start,
+        timed_out=timed_out,
+        stopped=stop.is_set()
+    )
+
+def run_command(args: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None, on_output: Optional[OutputCallback] = None) -> CommandResult:
+    """Blocking wrapper around run_command_async for use from worker threads
+
+    Raises:
+        CommandCancelled: If the cancel scope of the calling thread is set
+    """
+    cancel = getattr(_scope, "event", None)
+    if cancel is not None and cancel.is_set():
+        raise CommandCancelled(f"Cancelled before running {args[0]}")
+
+    future = asyncio.run_coroutine_threadsafe(
+        run_command_async(args, cwd=cwd, env=env, timeout=timeout, on_output=on_output),
+        _background_loop()
+    )
+    while True:
+        try:
+            return future.result(timeout=0.2)
+        except FutureTimeoutError:
+            if cancel is not None and cancel.is_set():
+                future.cancel()
+                raise CommandCancelled(f"Cancelled while running {args[0]}")
+
+@contextmanager
+def cancel_scope(event: threading.Event) -> Iterator[None]:
+    """Stop run_command calls of this thread (and start no new ones) once event is set"""
+    previous = getattr(_scope, "event", None)
+    _scope.event = event
+    try:
+        yield
+    finally:
+        _scope.event = previous
+
+async def _read_stream(stream: asyncio.StreamReader, name: str, chunks: List[str],
+                       handle: Callable[[str, str], None]):
+    while True:
+        line = await stream.readline()
+        if not line:
+            return
+        text = line.decode('utf-8', errors='replace')
+        chunks.append(text)
+        handle(name, text.rstrip('\n'))
+
+async def _kill_group(process: asyncio.subprocess.Process):
+    """SIGTERM the command's process group, then SIGKILL whatever is left of it"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        await asyncio.wait_for(asyncio.shield(process.wait()), KILL_GRACE_PERIOD)
+    except asyncio.TimeoutError:
+        pass
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await process.wait()
+
+_scope = threading.local()
+_loop = None
+_loop_lock = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop shared by all run_command calls, started on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="command-loop", daemon=True).start()
+        return _loop
@@ -1,146 +1,572 @@
 """Java Bug Manager using Defects4J"""
-import subprocess
+import filecmp
+import json
 import os
+import shlex
 import shutil
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+
+from green_agent.cache.checkout_cache import CheckoutCache
+from green_agent.cache.coverage_index import TestCoverage
+from green_agent.cache.discovery_cache import DiscoveryCache, git_revision
+from green_agent.cache.metadata_store import BugMetadataStore, index_defects4j, parse_defects4j_info
+from green_agent.cache.fsutil import clone_tree, file_lock, remove_tree, tree_size
+from green_agent.cache.lru_index import LRUIndex
+from green_agent.managers.jvm_runner import JVMRunnerPool
+from green_agent.managers.command import CommandResult, run_command
+from green_agent.managers.test_output import FAILED, PASSED, Defects4JParser
+from green_agent.managers.tiered import run_tiered
+from green_agent.managers.workspace import WorkspaceAllocator
+
+# Concurrent `defects4j bids` calls during bug discovery
+DISCOVERY_WORKERS = 8
+
+# Build properties recorded for each compiled baseline, see compile_and_test()
+BASELINE_PROPERTIES = ["dir.src.classes", "dir.src.tests", "dir.bin.classes", "dir.bin.tests", "cp.compile"]
+
+# Build properties the warm JVM runner needs, see _run_tests_in_jvm()
+TEST_PROPERTIES = ["cp.test", "tests.trigger", "tests.relevant", "tests.all"]
+
+# Coverage-selected relevant tests run one `defects4j test -t` each up to this
+# many; above it the whole relevant suite runs in a single invocation instead
+MAX_SELECTED_TEST_RUNS = 2
+
+# Stands in for the checkout path in cached build properties
+BUG_DIR_PLACEHOLDER = "${BUG_DIR}"
+
+# Printed by the fused compile-and-test script when javac rejects the patched sources
+COMPILE_FAILED_MARKER = "RAID_INCREMENTAL_COMPILE_FAILED"
 
 class JavaManager:
-    def __init__(self, defects4j_path: str, workspace: str):
+    def __init__(self, defects4j_path: str, workspace: Union[str, WorkspaceAllocator],
+                 checkout_cache: Optional[CheckoutCache] = None,
+                 baseline_root: Optional[str] = None, jvm_runners: Optional[JVMRunnerPool] = None,
+                 discovery_cache: Optional[DiscoveryCache] = None,
+                 metadata_store: Optional[BugMetadataStore] = None,
+                 baseline_max_size_mb: int = 20480, baseline_max_entries: int = 100):
         self.defects4j_path = Path(defects4j_path)
-        self.workspace = Path(workspace)
+        self.workspace = workspace if isinstance(workspace, WorkspaceAllocator) else WorkspaceAllocator(workspace)
         self.defects4j_bin = self.defects4j_path / "framework" / "bin" / "defects4j"
+        self.checkout_cache = checkout_cache
+        
+        # Compiled pristine versions used by incremental compile_and_test(),
+        # evicted least recently used first like the other caches
+        self.baseline_root = Path(baseline_root) if baseline_root else None
+        self.incremental = self.baseline_root is not None
+        self.baseline_index = None
+        if self.baseline_root is not None:
+            self.baseline_root.mkdir(parents=True, exist_ok=True)
+            self.baseline_index = LRUIndex(self.baseline_root, baseline_max_size_mb, baseline_max_entries)
+        
+        # Warm per-project JVMs for run_tests, None to always use defects4j test
+        self.jvm_runners = jvm_runners
+        self.discovery_cache = discovery_cache
+        self.metadata_store = metadata_store
+        
+        # (project, version) -> compiled output dirs, see build_artifacts()
+        self._artifact_dirs = {}
+        # (project, version) -> TEST_PROPERTIES values with BUG_DIR_PLACEHOLDER
+        self._test_properties = {}
         
     def get_available_projects(self) -> List[str]:
         """Get list of all available Defects4J projects"""
-        result = subprocess.run(
-            [str(self.defects4j_bin), "pids"],
-            capture_output=True,
-            text=True
-        )
+        result = run_command([str(self.defects4j_bin), "pids"])
         return result.stdout.strip().split('\n')
     
     def get_bug_info(self, project: str, bug_id: int) -> Dict:
         """Get information about a specific bug"""
-        result = subprocess.run(
-            [str(self.defects4j_bin), "info", "-p", project, "-b", str(bug_id)],
-            capture_output=True,
-            text=True
-        )
-        # Parse the output into a dict
-        info = {}
-        for line in result.stdout.split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                info[key.strip()] = value.strip()
-        return info
+        record = self._get_metadata(project, bug_id)
+        if record is not None:
+            return record["info"]
+        
+        result = run_command([str(self.defects4j_bin), "info", "-p", project, "-b", str(bug_id)])
+        # Same fields as the indexed record
+        return parse_defects4j_info(result.stdout)
     
-    def checkout_bug(self, project: str, bug_id: int, buggy: bool = True) -> Path:
-        """Checkout a bug to workspace"""
-        version = f"{bug_id}b" if buggy else f"{bug_id}f"
-        bug_dir = self.workspace / f"{project}_{bug_id}_{'buggy' if buggy else 'fixed'}"
+    def get_test_lists(self, project: str, bug_id: int) -> Dict[str, List[str]]:
+        """Trigger and relevant tests of a bug from the metadata index
         
-        # Clean up if exists
-        if bug_dir.exists():
-            shutil.rmtree(bug_dir)
+        Returns:
+            {"trigger": [...], "relevant": [...]}, empty lists when the bug
+            is not indexed
+        """
+        record = self._get_metadata(project, bug_id) or {}
+        return {
+            "trigger": record.get("trigger_tests", []),
+            "relevant": record.get("relevant_tests", [])
+        }
+    
+    def _get_metadata(self, project: str, bug_id: int) -> Optional[Dict]:
+        if self.metadata_store is None:
+            return None
+        self.metadata_store.ensure_indexed("defects4j", self.defects4j_path, index_defects4j)
+        return self.metadata_store.get("defects4j", project, bug_id)
+    
+    def checkout_bug(self, project: str, bug_id: int, buggy: bool = True) -> Path:
+        """Checkout a bug to a fresh workspace directory, see release_bug()"""
+        bug_dir = self.workspace.allocate(project, bug_id, buggy)
         
-        # Checkout
-        result = subprocess.run(
-            [str(self.defects4j_bin), "checkout", "-p", project, "-v", version, "-w", str(bug_dir)],
-            capture_output=True,
-            text=True
-        )
+        try:
+            # Clone from the pristine cache when enabled, checking out only on a miss
+            if self.checkout_cache is not None:
+                return self.checkout_cache.checkout(
+                    "defects4j", project, bug_id, buggy, bug_dir,
+                    lambda dest: self._checkout_fresh(project, bug_id, buggy, dest)
+                )
+            
+            self._checkout_fresh(project, bug_id, buggy, bug_dir)
+            return bug_dir
+        except Exception:
+            self.release_bug(bug_dir)
+            raise
+    
+    def release_bug(self, bug_dir: Path):
+        """Give a checkout back to the workspace once its evaluation is done"""
+        self.workspace.release(bug_dir)
+    
+    def _checkout_fresh(self, project: str, bug_id: int, buggy: bool, dest: Path):
+        """Run defects4j checkout into dest"""
+        version = f"{bug_id}b" if buggy else f"{bug_id}f"
+        result = run_command([str(self.defects4j_bin), "checkout", "-p", project, "-v", version, "-w", str(dest)])
         
         if result.returncode != 0:
             raise Exception(f"Failed to checkout {project} bug {bug_id}: {result.stderr}")
-        
-        return bug_dir
     
     def compile_bug(self, bug_dir: Path) -> bool:
         """Compile the checked out bug"""
-        result = subprocess.run(
+        result = run_command(
             [str(self.defects4j_bin), "compile"],
-            cwd=bug_dir,
-            capture_output=True,
-            text=True
+            cwd=bug_dir
         )
         return result.returncode == 0
     
-    def run_tests(self, bug_dir: Path, test_suite: str = "trigger") -> Dict:
+    def build_artifacts(self, bug_dir: Path) -> List[str]:
+        """Compiled output directories of a checkout, relative to bug_dir"""
+        config = self._read_checkout_config(bug_dir)
+        key = (config.get("pid"), config.get("vid"))
+        
+        if key not in self._artifact_dirs:
+            dirs = []
+            for prop in ("dir.bin.classes", "dir.bin.tests"):
+                value = self.export_property(bug_dir, prop)
+                if value:
+                    dirs.append(os.path.relpath(bug_dir / value, bug_dir))
+            self._artifact_dirs[key] = dirs
+        
+        return self._artifact_dirs[key]
+    
+    def export_property(self, bug_dir: Path, prop: str) -> str:
+        """Read a build property of the checkout via defects4j export"""
+        result = run_command(
+            [str(self.defects4j_bin), "export", "-p", prop],
+            cwd=bug_dir
+        )
+        return result.stdout.strip() if result.returncode == 0 else ""
+    
+    def _read_checkout_config(self, bug_dir: Path) -> Dict:
+        """Parse the .defects4j.config file written by defects4j checkout"""
+        config = {}
+        config_file = bug_dir / ".defects4j.config"
+        if config_file.exists():
+            for line in config_file.read_text().split('\n'):
+                if '=' in line:
+                    key, value = line.split('=', 1)
+                    config[key.strip()] = value.strip()
+        return config
+    
+    def run_tests(self, bug_dir: Path, test_suite: str = "trigger",
+                  relevant_tests: Optional[List[str]] = None) -> Dict:
         """Run tests on the bug
         
         Args:
             bug_dir: Directory containing the checked out bug
-            test_suite: "trigger" for triggering tests, "relevant" for relevant tests, "all" for all tests
+            test_suite: "trigger" for triggering tests, "relevant" for relevant tests, "all" for all tests,
+                "tiered" for trigger, relevant and all tests, stopping at the first tier that fails
+            relevant_tests: Relevant test classes to run instead of all of them (e.g. the
+                ones covering the patched lines); an empty list skips the relevant tier.
+                Without the warm JVM runner, a selection of more than
+                MAX_SELECTED_TEST_RUNS classes runs as the whole relevant suite
         """
-        cmd = [str(self.defects4j_bin), "test"]
+        if test_suite == "tiered":
+            return run_tiered(lambda tier: self._run_tier(bug_dir, tier, relevant_tests))
+        
+        selected = relevant_tests if test_suite == "relevant" and relevant_tests else None
+        if self.jvm_runners is not None:
+            jvm_result = self._run_tests_in_jvm(bug_dir, test_suite, selected)
+            if jvm_result is not None:
+                return jvm_result
+        
+        if selected is not None and len(selected) <= MAX_SELECTED_TEST_RUNS:
+            return self._run_single_tests(bug_dir, selected)
         if test_suite == "trigger":
-            cmd.append("-t")  # Only run triggering tests
-        elif test_suite == "relevant":
-            cmd.append("-r")  # Only run relevant tests
+            trigger_tests = self._get_test_list(bug_dir, "trigger")
+            if trigger_tests:
+                return self._run_single_tests(bug_dir, trigger_tests)
+            # Unknown triggering tests: only the full suite can tell
+            test_suite = "all"
         
-        result = subprocess.run(
-            cmd,
+        parser = Defects4JParser()
+        result = run_command(
+            self._test_command(test_suite),
             cwd=bug_dir,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
+            timeout=300,  # 5 minute timeout
+            on_output=parser.feed
+        )
+        parser.finish(bug_dir)
+        return self._test_result(result, parser)
+    
+    def _run_tier(self, bug_dir: Path, tier: str, relevant_tests: Optional[List[str]]) -> Optional[Dict]:
+        if tier == "trigger" and not self._get_test_list(bug_dir, "trigger"):
+            return None
+        if tier == "relevant" and relevant_tests == []:
+            # No relevant test covers the patch
+            return None
+        return self.run_tests(bug_dir, tier, relevant_tests)
+    
+    def _run_single_tests(self, bug_dir: Path, tests: List[str]) -> Dict:
+        """Run tests one at a time with the CLI, stopping at the first failure
+        
+        defects4j test -t takes a single test (Class or Class::method); the
+        warm JVM runner, when enabled, runs the whole list in one batch
+        instead (see run_tests). Only the tests that ran are counted, so the
+        pass ratio covers them alone; the ones skipped after the failure are
+        listed in "tests_not_run".
+        """
+        parser = Defects4JParser()
+        outputs = []
+        ran = 0
+        for test in tests:
+            result = run_command(
+                self._test_command("trigger", test),
+                cwd=bug_dir,
+                timeout=300,
+                on_output=parser.feed
+            )
+            outputs.append(result.stdout)
+            ran += 1
+            if result.returncode != 0 or parser.failing_tests:
+                if not parser.failing_tests:
+                    # Timed out or crashed before defects4j reported anything
+                    parser.record(test, FAILED, result.duration)
+                break
+            parser.record(test, PASSED, result.duration)
+        
+        test_result = self._test_result(result, parser)
+        test_result["output"] = "\n".join(outputs)
+        test_result["tests_not_run"] = tests[ran:]
+        return test_result
+    
+    def _test_result(self, result: CommandResult, parser: Defects4JParser) -> Dict:
+        """run_tests result of a defects4j test run"""
+        return dict(
+            parser.summary(),
+            success=result.returncode == 0 and not parser.failing_tests,
+            output=result.stdout,
+            timeout=result.timed_out
         )
+    
+    def _run_tests_in_jvm(self, bug_dir: Path, test_suite: str,
+                          tests: Optional[List[str]] = None) -> Optional[Dict]:
+        """Run tests on the project's warm JVM, None if the CLI has to be used"""
+        config = self._read_checkout_config(bug_dir)
+        runner = self.jvm_runners.get(config.get("pid", ""))
+        if runner is None:
+            return None
+        
+        tests = tests or self._get_test_list(bug_dir, test_suite)
+        classpath = self._get_test_properties(bug_dir).get("cp.test", "").split(os.pathsep)
+        if not tests or not classpath:
+            return None
+        
+        return runner.run(bug_dir, classpath, tests)
+    
+    def _get_test_list(self, bug_dir: Path, test_suite: str) -> List[str]:
+        """Tests of a suite, from the metadata index when available, else from defects4j export"""
+        config = self._read_checkout_config(bug_dir)
+        vid = config.get("vid", "")
+        if test_suite != "all" and vid[:-1].isdigit():
+            indexed = self.get_test_lists(config.get("pid", ""), int(vid[:-1]))
+            if indexed.get(test_suite):
+                return indexed[test_suite]
+        return self._get_test_properties(bug_dir).get(f"tests.{test_suite}", "").split()
+    
+    def _get_test_properties(self, bug_dir: Path) -> Dict:
+        config = self._read_checkout_config(bug_dir)
+        key = (config.get("pid"), config.get("vid"))
+        
+        if key not in self._test_properties:
+            self._test_properties[key] = {
+                prop: self.export_property(bug_dir, prop).replace(str(bug_dir), BUG_DIR_PLACEHOLDER)
+                for prop in TEST_PROPERTIES
+            }
         
-        # Parse results
-        output = result.stdout
         return {
-            "success": result.returncode == 0,
-            "output": output,
-            "failing_tests": self._parse_failing_tests(output)
+            prop: value.replace(BUG_DIR_PLACEHOLDER, str(bug_dir))
+            for prop, value in self._test_properties[key].items()
         }
     
-    def _parse_failing_tests(self, output: str) -> List[str]:
-        """Parse failing tests from defects4j test output"""
-        failing = []
-        for line in output.split('\n'):
-            if line.startswith('Failing tests:'):
-                # Parse the list of failing tests
-                continue
-            elif line.strip().startswith('-'):
-                test_name = line.strip()[2:].strip()
-                if test_name:
-                    failing.append(test_name)
-        return failing
-    
-    def get_coverage(self, bug_dir: Path) -> Dict:
-        """Get code coverage information"""
-        result = subprocess.run(
-            [str(self.defects4j_bin), "coverage"],
-            cwd=bug_dir,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
+    def _test_command(self, test_suite: str, test: Optional[str] = None) -> List[str]:
+        cmd = [str(self.defects4j_bin), "test"]
+        if test is not None:
+            cmd.extend(["-t", test])  # Only run one test
+        elif test_suite == "relevant":
+            cmd.append("-r")  # Only run relevant tests
+        return cmd
+    
+    def compile_and_test(self, bug_dir: Path, test_suite: str = "trigger",
+                         relevant_tests: Optional[List[str]] = None) -> Dict:
+        """Incrementally compile a patched checkout and run its tests in one invocation
+        
+        The compiled classes of the pristine version are copied in, only the
+        main source files that differ from it are recompiled with javac, and
+        defects4j test then finds every class up to date. Falls back to
+        compile_bug + run_tests when no baseline is available, when anything
+        other than main .java sources changed, or when javac fails.
+        
+        The tests run in the same script as javac only for the "all" suite
+        and an unselected "relevant" suite without the warm JVM runner. The
+        tiered suite (the default), trigger tests and selected relevant tests
+        still compile incrementally, then run their tests through run_tests,
+        one defects4j invocation per tier or test.
+        
+        Returns:
+            Same dict as run_tests, with "compile_failed" set when the
+            checkout does not compile and "recompiled" listing the sources
+            compiled incrementally
+        """
+        baseline = self.ensure_baseline(bug_dir)
+        changed = self._changed_sources(bug_dir, baseline) if baseline else None
+        
+        if changed is not None:
+            # Only single-command suites run in the same script; a warm JVM,
+            # per-test runs and tiers run the tests separately
+            fused = self.jvm_runners is None and (
+                test_suite == "all" or (test_suite == "relevant" and not relevant_tests))
+            self._copy_baseline_classes(bug_dir, baseline)
+            parser = Defects4JParser()
+            result = run_command(
+                ["bash", "-c", self._fused_script(bug_dir, baseline, changed, test_suite if fused else None)],
+                cwd=bug_dir,
+                timeout=300,
+                on_output=parser.feed
+            )
+            if COMPILE_FAILED_MARKER not in result.stdout:
+                if not fused:
+                    test_result = self.run_tests(bug_dir, test_suite, relevant_tests)
+                    test_result["recompiled"] = changed
+                    return test_result
+                
+                parser.finish(bug_dir)
+                test_result = self._test_result(result, parser)
+                test_result["recompiled"] = changed
+                return test_result
+            # javac disagreed with the ant build (encoding, source level...);
+            # let the full build decide whether the patch compiles
+        
+        if not self.compile_bug(bug_dir):
+            return {"success": False, "compile_failed": True, "output": "", "failing_tests": []}
+        return self.run_tests(bug_dir, test_suite, relevant_tests)
+    
+    def ensure_baseline(self, bug_dir: Path) -> Optional[Dict]:
+        """Compile the pristine version of bug_dir once and return its build properties
+        
+        Baselines are rebuilt when the Defects4J revision changes, including
+        ones that did not compile. bug_dir holds its baseline in the LRU
+        index until the checkout is deleted.
+        """
+        config = self._read_checkout_config(bug_dir)
+        pid, vid = config.get("pid"), config.get("vid")
+        if self.baseline_root is None or not pid or not vid:
+            return None
+        
+        key = f"{pid}_{vid}"
+        base = self.baseline_root / key
+        meta_file = base / "baseline.json"
+        revision = git_revision(self.defects4j_path) or "unversioned"
+        
+        with file_lock(self.baseline_root / f".{key}.lock"):
+            meta = self._read_baseline_meta(meta_file)
+            size = None
+            if meta is None or meta.get("revision") != revision:
+                work = base / "work"
+                if work.exists():
+                    shutil.rmtree(work)
+                
+                bug_id, buggy = int(vid[:-1]), vid.endswith("b")
+                if self.checkout_cache is not None:
+                    self.checkout_cache.checkout(
+                        "defects4j", pid, bug_id, buggy, work,
+                        lambda dest: self._checkout_fresh(pid, bug_id, buggy, dest)
+                    )
+                else:
+                    self._checkout_fresh(pid, bug_id, buggy, work)
+                
+                meta = {"work": str(work), "revision": revision, "usable": self.compile_bug(work)}
+                for prop in BASELINE_PROPERTIES:
+                    meta[prop] = self.export_property(work, prop)
+                with open(meta_file, 'w') as f:
+                    json.dump(meta, f, indent=2)
+                size = tree_size(base)
+            
+            # Recorded while locked, so the baseline is not evicted before bug_dir holds it
+            evicted = self.baseline_index.touch(key, size, holder=str(bug_dir))
+        
+        for evicted_key in evicted:
+            remove_tree(self.baseline_root / evicted_key)
+        return meta if meta["usable"] else None
+    
+    def _read_baseline_meta(self, meta_file: Path) -> Optional[Dict]:
+        if not meta_file.exists():
+            return None
+        try:
+            with open(meta_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _changed_sources(self, bug_dir: Path, baseline: Dict) -> Optional[List[str]]:
+        """Main .java files that differ from the baseline, relative to the source dir
+        
+        Returns None if test sources changed or files were added or deleted,
+        which the incremental path does not handle.
+        """
+        work = Path(baseline["work"])
+        
+        for src_prop in ("dir.src.tests", "dir.src.classes"):
+            changed = []
+            base_src, new_src = work / baseline[src_prop], bug_dir / baseline[src_prop]
+            base_files = _relative_files(base_src)
+            new_files = _relative_files(new_src)
+            if base_files != new_files:
+                return None
+            
+            for rel_path in new_files:
+                if not filecmp.cmp(base_src / rel_path, new_src / rel_path, shallow=True):
+                    if src_prop == "dir.src.tests" or not rel_path.endswith(".java"):
+                        return None
+                    changed.append(rel_path)
+        
+        return changed
+    
+    def _copy_baseline_classes(self, bug_dir: Path, baseline: Dict):
+        """Copy the pristine classes into bug_dir and mark them newer than its sources
+        
+        Ant decides what to recompile by comparing .java and .class mtimes,
+        which depend on how bug_dir was created (a checkout cache clone keeps
+        the cached mtimes, a fresh checkout does not). _changed_sources()
+        already compared the sources by content and every changed one is
+        recompiled by javac, so the copied classes are current by
+        construction and are stamped as such.
+        """
+        work = Path(baseline["work"])
+        for prop in ("dir.bin.classes", "dir.bin.tests"):
+            target = bug_dir / baseline[prop]
+            if target.exists():
+                remove_tree(target)
+            clone_tree(work / baseline[prop], target)
+            _touch_files(target)
+    
+    def _fused_script(self, bug_dir: Path, baseline: Dict, changed: List[str], test_suite: Optional[str]) -> str:
+        """Shell script that javac-compiles the changed sources and then runs defects4j test
+        
+        With test_suite None the script only compiles.
+        """
+        classes_dir = bug_dir / baseline["dir.bin.classes"]
+        lines = []
+        
+        if changed:
+            # Drop stale outputs (including inner classes) of the recompiled sources
+            for rel_path in changed:
+                stem = shlex.quote(str(classes_dir / rel_path[:-len(".java")]))
+                lines.append(f"rm -f {stem}.class {stem}\\$*.class")
+            
+            classpath = baseline["cp.compile"].replace(baseline["work"], str(bug_dir))
+            sources = " ".join(shlex.quote(str(bug_dir / baseline["dir.src.classes"] / p)) for p in changed)
+            lines.append(
+                f"javac -nowarn -encoding UTF-8 -d {shlex.quote(str(classes_dir))} "
+                f"-cp {shlex.quote(str(classes_dir) + os.pathsep + classpath)} {sources} "
+                f"|| {{ echo {COMPILE_FAILED_MARKER}; exit 2; }}"
+            )
+        
+        if test_suite is not None:
+            lines.append(" ".join(shlex.quote(part) for part in self._test_command(test_suite)))
+        return "\n".join(lines)
+    
+    def get_coverage(self, bug_dir: Path, test: Optional[str] = None) -> Dict:
+        """Get code coverage information
+        
+        Args:
+            bug_dir: Directory containing the checked out bug
+            test: Only measure this test (Class or Class::method), by default
+                the relevant tests
         
-        # Parse coverage data
+        Returns:
+            "success", "output" and "lines", mapping each source file
+            (relative to bug_dir) to its covered line numbers
+        """
+        cmd = [str(self.defects4j_bin), "coverage"]
+        cmd.extend(["-t", test] if test is not None else ["-r"])
+        result = run_command(cmd, cwd=bug_dir, timeout=300)
+        
+        lines = {}
+        report = bug_dir / "coverage.xml"
+        if result.returncode == 0 and report.exists():
+            src_dir = self.export_property(bug_dir, "dir.src.classes")
+            lines = _parse_cobertura(report, src_dir)
         return {
             "success": result.returncode == 0,
-            "output": result.stdout
+            "output": result.stdout,
+            "lines": lines
         }
     
+    def build_coverage(self, bug_dir: Path) -> Optional[TestCoverage]:
+        """Lines covered by each relevant test class of a pristine checkout, for the CoverageIndex
+        
+        Runs defects4j coverage once per class; None if any run fails.
+        """
+        coverage = {}
+        for test_class in self._get_test_list(bug_dir, "relevant"):
+            result = self.get_coverage(bug_dir, test_class)
+            if not result["success"]:
+                return None
+            coverage[test_class] = result["lines"]
+        return coverage or None
+    
+    def get_bug_ids(self, project: str) -> List[int]:
+        """Active bug IDs of a project"""
+        result = run_command([str(self.defects4j_bin), "bids", "-p", project])
+        return [int(bug_id) for bug_id in result.stdout.split() if bug_id.isdigit()]
+    
+    def discover_bugs(self) -> Dict[str, List[int]]:
+        """Bug IDs of every project, queried concurrently and memoized per Defects4J revision"""
+        if self.discovery_cache is not None:
+            cached = self.discovery_cache.load("defects4j", self.defects4j_path)
+            if cached is not None:
+                return cached
+        
+        projects = [p for p in self.get_available_projects() if p]
+        with ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS) as pool:
+            bug_ids = dict(zip(projects, pool.map(self.get_bug_ids, projects)))
+        
+        if self.discovery_cache is not None:
+            self.discovery_cache.store("defects4j", self.defects4j_path, bug_ids)
+        return bug_ids
+    
     def select_bugs(self, count: int = 30) -> List[Dict]:
         """Select a diverse set of bugs for the benchmark"""
-        projects = self.get_available_projects()
+        bugs_by_project = self.discover_bugs()
         selected_bugs = []
         
+        if not bugs_by_project:
+            return []
+        
         # Distribute bugs across projects
-        bugs_per_project = max(1, count // len(projects))
-        
-        for project in projects:
-            # Get bug count for this project
-            result = subprocess.run(
-                [str(self.defects4j_bin), "bids", "-p", project],
-                capture_output=True,
-                text=True
-            )
-            bug_ids = result.stdout.strip().split('\n')
-            
+        bugs_per_project = max(1, count // len(bugs_by_project))
+        
+        for project, bug_ids in bugs_by_project.items():
             # Select first N bugs from this project
             for bug_id in bug_ids[:bugs_per_project]:
                 if len(selected_bugs) >= count:
@@ -156,3 +582,34 @@ class JavaManager:
                 break
         
         return selected_bugs[:count]
+
+def _parse_cobertura(report: Path, src_dir: str) -> Dict[str, List[int]]:
+    """Covered lines per source file of a Cobertura coverage.xml
+    
+    Cobertura names files relative to the source dir, e.g. org/foo/Bar.java.
+    """
+    lines = {}
+    for _, element in ET.iterparse(str(report)):
+        if element.tag != "class":
+            continue
+        filename = os.path.join(src_dir, element.get("filename", "")) if src_dir else element.get("filename", "")
+        covered = lines.setdefault(filename, set())
+        for line in element.iter("line"):
+            if int(line.get("hits", "0")) > 0:
+                covered.add(int(line.get("number")))
+        element.clear()
+    return {filename: sorted(covered) for filename, covered in lines.items() if covered}
+
+def _touch_files(root: Path):
+    """Set the mtime of every file below root to now"""
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            os.utime(os.path.join(dirpath, name))
+
+def _relative_files(root: Path) -> List[str]:
+    """Sorted paths of all files below root, relative to it"""
+    files = []
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return sorted(files)
@@ -1,15 +1,36 @@
 """JavaScript Bug Manager using BugsJS"""
-import subprocess
 import csv
+import json
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+
+from green_agent.cache.checkout_cache import CheckoutCache
+from green_agent.cache.dependency_store import DependencyStore
+from green_agent.cache.discovery_cache import DiscoveryCache
+from green_agent.cache.metadata_store import BugMetadataStore, index_bugsjs
+from green_agent.managers.command import run_command
+from green_agent.managers.test_output import MochaParser
+from green_agent.managers.tiered import run_tiered
+from green_agent.managers.workspace import WorkspaceAllocator
+
+# Concurrent CSV parses during bug discovery
+DISCOVERY_WORKERS = 8
 
 class JSManager:
-    def __init__(self, bugsjs_path: str, workspace: str):
+    def __init__(self, bugsjs_path: str, workspace: Union[str, WorkspaceAllocator],
+                 checkout_cache: Optional[CheckoutCache] = None,
+                 dependency_store: Optional[DependencyStore] = None,
+                 discovery_cache: Optional[DiscoveryCache] = None,
+                 metadata_store: Optional[BugMetadataStore] = None):
         self.bugsjs_path = Path(bugsjs_path)
-        self.workspace = Path(workspace)
+        self.workspace = workspace if isinstance(workspace, WorkspaceAllocator) else WorkspaceAllocator(workspace)
         self.projects_dir = self.bugsjs_path / "Projects"
+        self.checkout_cache = checkout_cache
+        self.dependency_store = dependency_store
+        self.discovery_cache = discovery_cache
+        self.metadata_store = metadata_store
     
     def get_available_projects(self) -> List[str]:
         if not self.projects_dir.exists():
@@ -17,6 +38,12 @@ class JSManager:
         return [d.name for d in self.projects_dir.iterdir() if d.is_dir()]
     
     def get_bug_info(self, project: str, bug_id: int) -> Dict:
+        if self.metadata_store is not None:
+            self.metadata_store.ensure_indexed("bugsjs", self.bugsjs_path, index_bugsjs)
+            record = self.metadata_store.get("bugsjs", project, bug_id)
+            if record is not None:
+                return record["info"]
+        
         bugs_csv = self.projects_dir / project / f"{project}_bugs.csv"
         
         if not bugs_csv.exists():
@@ -48,13 +75,32 @@ class JSManager:
         """Extract bug ZIP file to workspace
         
         BugsJS stores bugs as ZIP files: Eslint-1.zip, Eslint-2.zip, etc.
+        Each call extracts into a fresh workspace directory, see release_bug().
+        The ZIPs only hold the buggy version, so buggy=False is rejected.
         """
-        bug_dir = self.workspace / f"{project}_{bug_id}_{'buggy' if buggy else 'fixed'}"
-        
-        # Clean up if exists
-        if bug_dir.exists():
-            shutil.rmtree(bug_dir)
-        
+        if not buggy:
+            raise ValueError(f"BugsJS has no fixed version of {project} #{bug_id}")
+        bug_dir = self.workspace.allocate(project, bug_id, buggy)
+        
+        try:
+            if self.checkout_cache is not None:
+                return self.checkout_cache.checkout(
+                    "bugsjs", project, bug_id, buggy, bug_dir,
+                    lambda dest: self._extract_fresh(project, bug_id, dest)
+                )
+            
+            self._extract_fresh(project, bug_id, bug_dir)
+            return bug_dir
+        except Exception:
+            self.release_bug(bug_dir)
+            raise
+    
+    def release_bug(self, bug_dir: Path):
+        """Give a checkout back to the workspace once its evaluation is done"""
+        self.workspace.release(bug_dir)
+    
+    def _extract_fresh(self, project: str, bug_id: int, dest: Path):
+        """Extract the bug ZIP into dest"""
         # Find the ZIP file
         zip_file = self.projects_dir / project / f"{project}-{bug_id}.zip"
         
@@ -62,49 +108,121 @@ class JSManager:
             raise Exception(f"Bug ZIP not found: {zip_file}")
         
         # Extract the ZIP
-        shutil.unpack_archive(zip_file, bug_dir)
-        
-        return bug_dir
+        shutil.unpack_archive(zip_file, dest)
     
     def compile_bug(self, bug_dir: Path) -> bool:
-        """Install npm dependencies"""
-        result = subprocess.run(
-            ["npm", "install"],
-            cwd=bug_dir,
-            capture_output=True,
-            text=True
+        """Install npm dependencies
+        
+        With a dependency store, node_modules is linked from the store when the
+        same package manifests were installed before, so no npm run is needed.
+        Otherwise npm installs offline from the store's download cache.
+        """
+        if self.dependency_store is None:
+            result = run_command(
+                ["npm", "install"],
+                cwd=bug_dir
+            )
+            return result.returncode == 0
+        
+        key = self.dependency_store.manifest_key(bug_dir)
+        if key and self.dependency_store.link(key, bug_dir):
+            return True
+        
+        result = run_command(
+            self.dependency_store.install_command(),
+            cwd=bug_dir
         )
-        return result.returncode == 0
+        if result.returncode != 0 and self.dependency_store.fetch_missing:
+            # Some packages were never downloaded into the shared cache
+            result = run_command(
+                self.dependency_store.fetch_command(),
+                cwd=bug_dir
+            )
+        if result.returncode != 0:
+            return False
+        
+        if key:
+            self.dependency_store.populate(key, bug_dir)
+        return True
     
-    def run_tests(self, bug_dir: Path) -> Dict:
-        """Run tests using npm test"""
-        result = subprocess.run(
-            ["npm", "test"],
+    def build_artifacts(self, bug_dir: Path) -> List[str]:
+        """Outputs of npm install, relative to bug_dir
+
+        node_modules is not cached by the build cache: it comes from the
+        dependency store, which tracks which workspaces link to an entry.
+        """
+        return []
+    
+    def run_tests(self, bug_dir: Path, test_suite: str = "all",
+                  relevant_tests: Optional[List[str]] = None) -> Dict:
+        """Run tests using npm test
+        
+        BugsJS has no per-bug trigger or relevant test lists, so every suite
+        runs the whole npm test script (and relevant_tests is ignored).
+        "tiered" (like "trigger" and "relevant") stops at the first failing test.
+        """
+        if test_suite == "tiered":
+            return run_tiered(lambda tier: self._npm_test(bug_dir, bail=True) if tier == "all" else None)
+        return self._npm_test(bug_dir, bail=test_suite != "all")
+    
+    def _npm_test(self, bug_dir: Path, bail: bool) -> Dict:
+        command = ["npm", "test"]
+        if bail and self._uses_mocha(bug_dir):
+            command.extend(["--", "--bail"])
+        
+        # Without mocha's --bail, the parser stops the run at the first failing test it sees
+        parser = MochaParser(fail_fast=bail)
+        result = run_command(
+            command,
             cwd=bug_dir,
-            capture_output=True,
-            text=True,
-            timeout=300
+            timeout=300,
+            on_output=parser.feed
         )
         
-        return {
-            "success": result.returncode == 0,
-            "output": result.stdout,
-            "stderr": result.stderr
-        }
+        return dict(
+            parser.summary(),
+            success=result.returncode == 0,
+            output=result.stdout,
+            stderr=result.stderr,
+            timeout=result.timed_out,
+            aborted=result.stopped
+        )
+    
+    def _uses_mocha(self, bug_dir: Path) -> bool:
+        package_json = bug_dir / "package.json"
+        try:
+            with open(package_json, 'r') as f:
+                test_script = json.load(f).get("scripts", {}).get("test", "")
+        except (OSError, ValueError):
+            return False
+        return "mocha" in test_script
+    
+    def discover_bugs(self) -> Dict[str, List[Dict]]:
+        """CSV rows of every project, parsed concurrently and memoized per BugsJS revision"""
+        if self.discovery_cache is not None:
+            cached = self.discovery_cache.load("bugsjs", self.bugsjs_path)
+            if cached is not None:
+                return cached
+        
+        projects = self.get_available_projects()
+        with ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS) as pool:
+            bugs = dict(zip(projects, pool.map(self.get_all_bugs, projects)))
+        
+        if self.discovery_cache is not None:
+            self.discovery_cache.store("bugsjs", self.bugsjs_path, bugs)
+        return bugs
     
     def select_bugs(self, count: int = 30) -> List[Dict]:
         """Select a diverse set of bugs for the benchmark"""
-        projects = self.get_available_projects()
+        bugs_by_project = self.discover_bugs()
         selected_bugs = []
         
-        if not projects:
+        if not bugs_by_project:
             return []
         
-        bugs_per_project = max(1, count // len(projects))
+        bugs_per_project = max(1, count // len(bugs_by_project))
         
-        for project in projects:
-            bugs = self.get_all_bugs(project)
-            
+        for project, bugs in bugs_by_project.items():
             # Select first N bugs from this project
             for bug in bugs[:bugs_per_project]:
                 if len(selected_bugs) >= count:
@@ -0,0 +1,231 @@
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.InputStreamReader;
+import java.io.OutputStreamWriter;
+import java.io.PrintStream;
+import java.io.PrintWriter;
+import java.lang.reflect.Method;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.Locale;
+import java.util.Properties;
+import java.util.TimeZone;
+
+/**
+ * Warm JUnit runner used by green_agent.managers.jvm_runner.
+ *
+ * Listens on a loopback port (written to the file given as the first argument)
+ * and serves one request per connection:
+ *
+ *   PING                 -> PONG
+ *   RUN <timeout_ms>
+ *   CP <classpath entry>    (repeated)
+ *   TEST <class>[::<method>] (repeated)
+ *   END                  -> RESULT/FAIL lines, then DONE <run> <failed>
+ *
+ * Every RUN gets a fresh class loader (parented to the platform loader, so
+ * nothing from an earlier run is visible), and the JDK-wide state tests
+ * commonly change (system properties, standard streams, default Locale and
+ * TimeZone, SecurityManager, default uncaught exception handler) is
+ * snapshotted before and restored after it. A run that exceeds its timeout
+ * is reported as TIMEOUT and the JVM exits, since the stuck thread cannot
+ * be reclaimed safely; so does a run whose state cannot be restored.
+ */
+public class RaidTestRunner {
+
+    public static void main(String[] args) throws Exception {
+        ServerSocket server = new ServerSocket(0, 50, InetAddress.getLoopbackAddress());
+        File portFile = new File(args[0]);
+        File tmp = new File(args[0] + ".tmp");
+        Files.write(tmp.toPath(), String.valueOf(server.getLocalPort()).getBytes(StandardCharsets.UTF_8));
+        tmp.renameTo(portFile);
+
+        while (true) {
+            try (Socket socket = server.accept()) {
+                handle(socket);
+            } catch (Throwable t) {
+                t.printStackTrace();
+            }
+        }
+    }
+
+    private static void handle(Socket socket) throws Exception {
+        BufferedReader in = new BufferedReader(new InputStreamReader(socket.getInputStream(), StandardCharsets.UTF_8));
+        PrintWriter out = new PrintWriter(new OutputStreamWriter(socket.getOutputStream(), StandardCharsets.UTF_8), true);
+
+        String line = in.readLine();
+        if (line == null) {
+            return;
+        }
+        if (line.equals("PING")) {
+            out.println("PONG");
+            return;
+        }
+        if (!line.startsWith("RUN ")) {
+            out.println("ERROR unknown command " + line);
+            return;
+        }
+
+        long timeoutMs = Long.parseLong(line.substring(4).trim());
+        List<URL> urls = new ArrayList<>();
+        List<String> tests = new ArrayList<>();
+        while ((line = in.readLine()) != null && !line.equals("END")) {
+            if (line.startsWith("CP ")) {
+                urls.add(new File(line.substring(3)).toURI().toURL());
+            } else if (line.startsWith("TEST ")) {
+                tests.add(line.substring(5));
+            }
+        }
+
+        JdkState saved = JdkState.capture();
+        URLClassLoader loader = new URLClassLoader(urls.toArray(new URL[0]), platformLoader());
+
+        Thread worker = new Thread(() -> runTests(loader, tests, out), "raid-test-run");
+        worker.setContextClassLoader(loader);
+        worker.setDaemon(true);
+        worker.start();
+        worker.join(timeoutMs);
+
+        if (worker.isAlive()) {
+            out.println("TIMEOUT");
+            out.flush();
+            System.exit(3);
+        }
+
+        try {
+            saved.restore();
+        } catch (Throwable t) {
+            // e.g. a SecurityManager installed by a test that forbids replacing it
+            t.printStackTrace();
+            System.exit(4);
+        }
+        loader.close();
+    }
+
+    /** JDK-wide defaults a test can change and that would leak into the next run */
+    private static final class JdkState {
+        private final Properties properties;
+        private final PrintStream out;
+        private final PrintStream err;
+        private final Locale locale;
+        private final Locale displayLocale;
+        private final Locale formatLocale;
+        private final TimeZone timeZone;
+        private final SecurityManager securityManager;
+        private final Thread.UncaughtExceptionHandler uncaughtHandler;
+
+        private JdkState() {
+            properties = (Properties) System.getProperties().clone();
+            out = System.out;
+            err = System.err;
+            locale = Locale.getDefault();
+            displayLocale = Locale.getDefault(Locale.Category.DISPLAY);
+            formatLocale = Locale.getDefault(Locale.Category.FORMAT);
+            timeZone = TimeZone.getDefault();
+            securityManager = System.getSecurityManager();
+            uncaughtHandler = Thread.getDefaultUncaughtExceptionHandler();
+        }
+
+        static JdkState capture() {
+            return new JdkState();
+        }
+
+        void restore() {
+            // First, since the SecurityManager may be what forbids the other resets
+            if (System.getSecurityManager() != securityManager) {
+                System.setSecurityManager(securityManager);
+            }
+            System.setOut(out);
+            System.setErr(err);
+            System.setProperties(properties);
+            Locale.setDefault(locale);
+            Locale.setDefault(Locale.Category.DISPLAY, displayLocale);
+            Locale.setDefault(Locale.Category.FORMAT, formatLocale);
+            TimeZone.setDefault(timeZone);
+            Thread.setDefaultUncaughtExceptionHandler(uncaughtHandler);
+        }
+    }
+
+    private static void runTests(ClassLoader loader, List<String> tests, PrintWriter out) {
+        int totalRun = 0;
+        int totalFailed = 0;
+        try {
+            Class<?> coreClass = Class.forName("org.junit.runner.JUnitCore", true, loader);
+            Class<?> requestClass = Class.forName("org.junit.runner.Request", true, loader);
+            Object core = coreClass.getConstructor().newInstance();
+            Method run = coreClass.getMethod("run", requestClass);
+
+            for (String test : tests) {
+                String className = test;
+                String methodName = null;
+                int sep = test.indexOf("::");
+                if (sep >= 0) {
+                    className = test.substring(0, sep);
+                    methodName = test.substring(sep + 2);
+                }
+
+                long start = System.nanoTime();
+                Object request;
+                try {
+                    Class<?> testClass = Class.forName(className, false, loader);
+                    request = methodName == null
+                        ? requestClass.getMethod("aClass", Class.class).invoke(null, testClass)
+                        : requestClass.getMethod("method", Class.class, String.class).invoke(null, testClass, methodName);
+                } catch (Throwable t) {
+                    out.println("FAIL " + test + " 0 " + escape("cannot load test: " + t));
+                    totalRun++;
+                    totalFailed++;
+                    continue;
+                }
+
+                Object result = run.invoke(core, request);
+                long elapsedMs = (System.nanoTime() - start) / 1000000;
+                int runCount = (Integer) result.getClass().getMethod("getRunCount").invoke(result);
+                List<?> failures = (List<?>) result.getClass().getMethod("getFailures").invoke(result);
+
+                for (Object failure : failures) {
+                    Object description = failure.getClass().getMethod("getDescription").invoke(failure);
+                    String name = (String) description.getClass().getMethod("getDisplayName").invoke(description);
+                    String message = String.valueOf(failure.getClass().getMethod("getMessage").invoke(failure));
+                    out.println("FAIL " + toTestId(name, className) + " " + elapsedMs + " " + escape(message));
+                }
+                out.println("RESULT " + test + " " + runCount + " " + failures.size() + " " + elapsedMs);
+                totalRun += runCount;
+                totalFailed += failures.size();
+            }
+            out.println("DONE " + totalRun + " " + totalFailed);
+        } catch (Throwable t) {
+            out.println("ERROR " + escape(t.toString()));
+        }
+        out.flush();
+    }
+
+    /** "testFoo(org.x.BarTest)" -> "org.x.BarTest::testFoo", matching defects4j output */
+    private static String toTestId(String displayName, String fallbackClass) {
+        int open = displayName.lastIndexOf('(');
+        if (open > 0 && displayName.endsWith(")")) {
+            return displayName.substring(open + 1, displayName.length() - 1) + "::" + displayName.substring(0, open);
+        }
+        return fallbackClass + "::" + displayName;
+    }
+
+    private static String escape(String text) {
+        return text.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "");
+    }
+
+    private static ClassLoader platformLoader() {
+        try {
+            return (ClassLoader) ClassLoader.class.getMethod("getPlatformClassLoader").invoke(null);
+        } catch (Exception e) {
+            // Java 8: the bootstrap loader has all JDK classes
+            return null;
+        }
+    }
+}
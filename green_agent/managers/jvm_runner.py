@@ -0,0 +1,217 @@
+"""Warm JVM test runners for Defects4J projects"""
+import os
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from green_agent.cache.fsutil import file_lock
+from green_agent.managers.command import run_command
+from green_agent.managers.test_output import FAILED, PASSED
+
+RUNNER_SOURCE = Path(__file__).parent / "jvm" / "RaidTestRunner.java"
+
+class JVMTestRunner:
+    """One long-lived JVM that runs JUnit tests of a single project in-process
+
+    The JVM (jvm/RaidTestRunner.java) loads each run's classes in a fresh
+    class loader. Defects4J tests open resources relative to the checkout, so
+    the JVM's working directory is a scratch dir whose entries are re-pointed
+    at the checkout under test before every run; runs are serialized.
+    """
+
+    def __init__(self, project: str, work_dir: Path, classes_dir: Path,
+                 java: str = "java", startup_timeout: float = 30.0):
+        self.project = project
+        self.work_dir = work_dir
+        self.classes_dir = classes_dir
+        self.java = java
+        self.startup_timeout = startup_timeout
+        self.cwd = work_dir / "cwd"
+        self.port_file = work_dir / "port"
+        self.process = None
+        self.port = None
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        self.stop()
+        self.cwd.mkdir(parents=True, exist_ok=True)
+        if self.port_file.exists():
+            self.port_file.unlink()
+
+        with open(self.work_dir / "runner.log", 'ab') as log:
+            self.process = subprocess.Popen(
+                [self.java, "-cp", str(self.classes_dir), "RaidTestRunner", str(self.port_file)],
+                cwd=self.cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True
+            )
+
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                return False
+            if self.port_file.exists():
+                self.port = int(self.port_file.read_text().strip())
+                return self.healthy()
+            time.sleep(0.05)
+
+        self.stop()
+        return False
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        self.port = None
+
+    def healthy(self) -> bool:
+        if self.process is None or self.process.poll() is not None or self.port is None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=2) as conn:
+                conn.sendall(b"PING\n")
+                return conn.makefile('r').readline().strip() == "PONG"
+        except OSError:
+            return False
+
+    def run(self, bug_dir: Path, classpath: List[str], tests: List[str], timeout: int = 300) -> Optional[Dict]:
+        """Run tests ("Class" or "Class::method") against classpath
+
+        Returns:
+            Result dict in the shape of JavaManager.run_tests, or None if the
+            runner failed and the caller should use the CLI instead
+        """
+        with self._lock:
+            self._point_cwd_at(bug_dir)
+            request = [f"RUN {timeout * 1000}"]
+            request.extend(f"CP {entry}" for entry in classpath if entry)
+            request.extend(f"TEST {test}" for test in tests)
+            request.append("END")
+
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=timeout + 30) as conn:
+                    conn.sendall(("\n".join(request) + "\n").encode())
+                    lines = conn.makefile('r', encoding='utf-8').read().splitlines()
+            except OSError:
+                self.stop()
+                return None
+
+        failing = []
+        records = []
+        total = None
+        output = []
+        for line in lines:
+            output.append(line)
+            if line.startswith("FAIL "):
+                # FAIL <test> <elapsed ms> <message>
+                parts = line.split(" ", 3)
+                failing.append(parts[1])
+                records.append({"name": parts[1], "outcome": FAILED, "duration": int(parts[2]) / 1000})
+            elif line.startswith("RESULT "):
+                # RESULT <requested test> <run> <failed> <elapsed ms>
+                _, test, run, failed, elapsed = line.split()
+                if int(failed) == 0:
+                    records.append({"name": test, "outcome": PASSED, "duration": int(elapsed) / 1000})
+            elif line.startswith("DONE "):
+                total = int(line.split()[1])
+            elif line == "TIMEOUT":
+                # The runner exits after a timeout; report it like the CLI would
+                self.stop()
+                return {"success": False, "output": "\n".join(output), "failing_tests": tests,
+                        "timeout": True, "runner": "jvm"}
+            elif line.startswith("ERROR "):
+                return None
+
+        if total is None:
+            self.stop()
+            return None
+
+        return {
+            "success": not failing,
+            "output": "\n".join(output),
+            "failing_tests": failing,
+            "total_tests": total,
+            "test_records": records,
+            "runner": "jvm"
+        }
+
+    def _point_cwd_at(self, bug_dir: Path):
+        """Make the runner's working dir mirror bug_dir's top-level entries"""
+        for entry in os.listdir(self.cwd):
+            path = self.cwd / entry
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        for entry in os.listdir(bug_dir):
+            target = self.cwd / entry
+            if not os.path.lexists(target):
+                os.symlink(bug_dir / entry, target)
+
+class JVMRunnerPool:
+    """Starts and restarts one JVMTestRunner per Defects4J project on demand"""
+
+    def __init__(self, work_dir: str, java: str = "java", javac: str = "javac", max_restarts: int = 3):
+        self.work_dir = Path(work_dir)
+        self.java = java
+        self.javac = javac
+        self.max_restarts = max_restarts
+        self.classes_dir = self.work_dir / "classes"
+        self._runners = {}
+        self._restarts = {}
+        self._lock = threading.Lock()
+
+    def get(self, project: str) -> Optional[JVMTestRunner]:
+        """Healthy runner for project, or None if it cannot be (re)started"""
+        with self._lock:
+            runner = self._runners.get(project)
+            if runner is not None and runner.healthy():
+                return runner
+
+            # Give up on a project whose runner keeps dying
+            if self._restarts.get(project, 0) >= self.max_restarts or not self._compile_runner():
+                return None
+
+            if runner is None:
+                # Per process, several evaluation workers may each run their own
+                work_dir = self.work_dir / f"{project}-{os.getpid()}"
+                runner = JVMTestRunner(project, work_dir, self.classes_dir, self.java)
+                self._runners[project] = runner
+            else:
+                self._restarts[project] = self._restarts.get(project, 0) + 1
+
+            if not runner.start():
+                print(f"WARNING: JVM test runner for {project} failed to start, using defects4j test")
+                self._restarts[project] = self._restarts.get(project, 0) + 1
+                return None
+            return runner
+
+    def shutdown(self):
+        with self._lock:
+            for runner in self._runners.values():
+                runner.stop()
+            self._runners.clear()
+
+    def _compile_runner(self) -> bool:
+        compiled = self.classes_dir / "RaidTestRunner.class"
+        if compiled.exists() and compiled.stat().st_mtime >= RUNNER_SOURCE.stat().st_mtime:
+            return True
+
+        with file_lock(self.work_dir / ".compile.lock"):
+            self.classes_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                result = run_command([self.javac, "-d", str(self.classes_dir), str(RUNNER_SOURCE)], timeout=120)
+            except OSError as e:
+                print(f"WARNING: Cannot compile JVM test runner: {e}")
+                return False
+            if result.returncode != 0:
+                print(f"WARNING: Cannot compile JVM test runner: {result.stderr}")
+                return False
+        return True
@@ -1,15 +1,36 @@
 """Python Bug Manager using BugsInPy"""
-import subprocess
+import json
 import os
-import shutil
+import shlex
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+
+from green_agent.cache.checkout_cache import CheckoutCache
+from green_agent.cache.coverage_index import TestCoverage
+from green_agent.cache.discovery_cache import DiscoveryCache
+from green_agent.cache.metadata_store import BugMetadataStore, index_bugsinpy
+from green_agent.cache.venv_pool import VenvPool, read_bug_info
+from green_agent.managers.command import run_command
+from green_agent.managers.test_output import PytestParser
+from green_agent.managers.tiered import run_tiered
+from green_agent.managers.workspace import WorkspaceAllocator
+
+# Concurrent project scans during bug discovery
+DISCOVERY_WORKERS = 8
 
 class PythonManager:
-    def __init__(self, bugsinpy_path: str, workspace: str):
+    def __init__(self, bugsinpy_path: str, workspace: Union[str, WorkspaceAllocator],
+                 checkout_cache: Optional[CheckoutCache] = None,
+                 venv_pool: Optional[VenvPool] = None, discovery_cache: Optional[DiscoveryCache] = None,
+                 metadata_store: Optional[BugMetadataStore] = None):
         self.bugsinpy_path = Path(bugsinpy_path)
-        self.workspace = Path(workspace)
+        self.workspace = workspace if isinstance(workspace, WorkspaceAllocator) else WorkspaceAllocator(workspace)
         self.bugsinpy_bin = self.bugsinpy_path / "framework" / "bin"
+        self.checkout_cache = checkout_cache
+        self.venv_pool = venv_pool
+        self.discovery_cache = discovery_cache
+        self.metadata_store = metadata_store
         
         self.env = os.environ.copy()
         self.env['PATH'] = f"{self.bugsinpy_bin}:{self.env['PATH']}"
@@ -19,10 +40,12 @@ class PythonManager:
         return [d.name for d in projects_dir.iterdir() if d.is_dir()]
     
     def get_bug_info(self, project: str, bug_id: int) -> Dict:
-        result = subprocess.run(
+        record = self._get_metadata(project, bug_id)
+        if record is not None:
+            return record["info"]
+        
+        result = run_command(
             ["bugsinpy-info", "-p", project, "-i", str(bug_id)],
-            capture_output=True,
-            text=True,
             env=self.env
         )
         
@@ -33,74 +56,256 @@ class PythonManager:
                 info[key.strip()] = value.strip()
         return info
     
-    def checkout_bug(self, project: str, bug_id: int, buggy: bool = True) -> Path:
-        """Checkout a bug to workspace"""
-        version = "0" if buggy else "1"
-        bug_dir = self.workspace / f"{project}_{bug_id}_{'buggy' if buggy else 'fixed'}"
+    def get_test_lists(self, project: str, bug_id: int) -> Dict[str, List[str]]:
+        """Trigger test commands (run_test.sh) and relevant test files of a bug
         
-        if bug_dir.exists():
-            shutil.rmtree(bug_dir)
+        Returns:
+            {"trigger": [...], "relevant": [...]}, empty lists when the bug
+            is not indexed
+        """
+        record = self._get_metadata(project, bug_id) or {}
+        return {
+            "trigger": record.get("trigger_tests", []),
+            "relevant": record.get("relevant_tests", [])
+        }
+    
+    def _get_metadata(self, project: str, bug_id: int) -> Optional[Dict]:
+        if self.metadata_store is None:
+            return None
+        self.metadata_store.ensure_indexed("bugsinpy", self.bugsinpy_path, index_bugsinpy)
+        return self.metadata_store.get("bugsinpy", project, bug_id)
+    
+    def checkout_bug(self, project: str, bug_id: int, buggy: bool = True) -> Path:
+        """Checkout a bug to a fresh workspace directory, see release_bug()"""
+        bug_dir = self.workspace.allocate(project, bug_id, buggy)
         
-        result = subprocess.run(
-            ["bugsinpy-checkout", "-p", project, "-v", version, "-i", str(bug_id), "-w", str(bug_dir)],
-            capture_output=True,
-            text=True,
+        try:
+            if self.checkout_cache is not None:
+                return self.checkout_cache.checkout(
+                    "bugsinpy", project, bug_id, buggy, bug_dir,
+                    lambda dest: self._checkout_fresh(project, bug_id, buggy, dest)
+                )
+            
+            self._checkout_fresh(project, bug_id, buggy, bug_dir)
+            return bug_dir
+        except Exception:
+            self.release_bug(bug_dir)
+            raise
+    
+    def release_bug(self, bug_dir: Path):
+        """Give a checkout back to the workspace once its evaluation is done"""
+        if self.venv_pool is not None:
+            self.venv_pool.release(bug_dir)
+        self.workspace.release(bug_dir)
+    
+    def _checkout_fresh(self, project: str, bug_id: int, buggy: bool, dest: Path):
+        """Run bugsinpy-checkout into dest"""
+        version = "0" if buggy else "1"
+        result = run_command(
+            ["bugsinpy-checkout", "-p", project, "-v", version, "-i", str(bug_id), "-w", str(dest)],
             env=self.env
         )
         
         if result.returncode != 0:
             raise Exception(f"Failed to checkout {project} bug {bug_id}: {result.stderr}")
-        
-        return bug_dir
     
     def compile_bug(self, bug_dir: Path) -> bool:
-        """Compile/setup the checked out bug"""
-        result = subprocess.run(
+        """Compile/setup the checked out bug
+        
+        With a venv pool the checkout attaches to a shared virtualenv for its
+        requirement set; bugsinpy-compile only runs if that is not possible.
+        """
+        if self.venv_pool is not None and self.venv_pool.attach(bug_dir):
+            return True
+        
+        result = run_command(
             ["bugsinpy-compile"],
             cwd=bug_dir,
-            capture_output=True,
-            text=True,
             env=self.env
         )
         return result.returncode == 0
     
-    def run_tests(self, bug_dir: Path) -> Dict:
-        result = subprocess.run(
-            ["bugsinpy-test"],
+    def build_artifacts(self, bug_dir: Path) -> List[str]:
+        """Outputs of bugsinpy-compile (virtualenv, build dirs), relative to bug_dir"""
+        # Pooled envs are reference counted by the pool, not copied around
+        artifacts = ["build"] if self.venv_pool is not None else ["env", "build"]
+        if bug_dir.exists():
+            artifacts.extend(p.name for p in bug_dir.iterdir() if p.name.endswith(".egg-info"))
+        return artifacts
+    
+    def run_tests(self, bug_dir: Path, test_suite: str = "trigger",
+                  relevant_tests: Optional[List[str]] = None) -> Dict:
+        """Run tests on the bug
+        
+        Args:
+            bug_dir: Directory containing the checked out bug
+            test_suite: "trigger" for the failing tests of bugsinpy_run_test.sh, "relevant" for the
+                bug's test files (stopping at the first failure), "all" for all tests, "tiered"
+                for trigger, relevant and all tests, stopping at the first tier that fails
+            relevant_tests: Test files to run instead of the bug's (e.g. the ones covering
+                the patched lines); an empty list skips the relevant tier
+        """
+        if test_suite == "tiered":
+            return run_tiered(lambda tier: self._run_tier(bug_dir, tier, relevant_tests))
+        return self._run_suite(bug_dir, test_suite, fail_fast=False, relevant_tests=relevant_tests)
+    
+    def _run_tier(self, bug_dir: Path, tier: str, relevant_tests: Optional[List[str]]) -> Optional[Dict]:
+        if tier == "trigger" and not (bug_dir / "bugsinpy_run_test.sh").exists():
+            return None
+        if tier == "relevant" and (relevant_tests == [] or self._relevant_test_command(bug_dir) is None):
+            return None
+        return self._run_suite(bug_dir, tier, fail_fast=True, relevant_tests=relevant_tests)
+    
+    def _run_suite(self, bug_dir: Path, test_suite: str, fail_fast: bool,
+                   relevant_tests: Optional[List[str]] = None) -> Dict:
+        """Run one suite, with fail_fast stopping the run at the first failing test in its output"""
+        command = self._relevant_test_command(bug_dir, relevant_tests) if test_suite == "relevant" else None
+        if command is None:
+            # Bugs without known test files fall back from "relevant" to all tests
+            command = ["bugsinpy-test"] if test_suite == "trigger" else ["bugsinpy-test", "-a"]
+        
+        parser = PytestParser(fail_fast)
+        result = run_command(
+            command,
             cwd=bug_dir,
-            capture_output=True,
-            text=True,
             env=self.env,
-            timeout=300
+            timeout=300,
+            on_output=parser.feed
         )
         
-        return {
-            "success": result.returncode == 0,
-            "output": result.stdout,
-            "stderr": result.stderr
-        }
+        return dict(
+            parser.summary(),
+            success=result.returncode == 0,
+            output=result.stdout,
+            stderr=result.stderr,
+            timeout=result.timed_out,
+            aborted=result.stopped
+        )
+    
+    def _relevant_test_command(self, bug_dir: Path, test_files: Optional[List[str]] = None) -> Optional[List[str]]:
+        """Fail-fast run of the bug's test files (test_file in bug.info) in its env
+        
+        Uses the runner of bugsinpy_run_test.sh: pytest -x or unittest -f, verbose
+        so that every test that ran is named before the run stops.
+        """
+        test_files = test_files or self._test_files(bug_dir)
+        run_test = bug_dir / "bugsinpy_run_test.sh"
+        if not test_files or not run_test.exists():
+            return None
+        return self._in_env(bug_dir, self._test_runner(bug_dir, test_files, ["-x", "-v"], ["-f", "-v"]))
+    
+    def _test_files(self, bug_dir: Path) -> List[str]:
+        return [f for f in read_bug_info(bug_dir).get("test_file", "").split(';') if f]
+    
+    def _test_runner(self, bug_dir: Path, test_files: List[str], pytest_args: List[str],
+                     unittest_args: List[str]) -> List[str]:
+        """Module invocation of the runner bugsinpy_run_test.sh uses, for test_files"""
+        if "pytest" in (bug_dir / "bugsinpy_run_test.sh").read_text(errors='replace'):
+            return ["-m", "pytest"] + pytest_args + test_files
+        modules = [f[:-len(".py")].replace('/', '.') for f in test_files if f.endswith(".py")]
+        return ["-m", "unittest"] + unittest_args + modules
+    
+    def _in_env(self, bug_dir: Path, python_args: List[str]) -> List[str]:
+        """Command running `python python_args...` with the checkout's env activated"""
+        activate = "source env/bin/activate && " if (bug_dir / "env").exists() else ""
+        return ["bash", "-c", activate + " ".join(shlex.quote(part) for part in ["python"] + python_args)]
+    
+    def build_coverage(self, bug_dir: Path) -> Optional[TestCoverage]:
+        """Lines covered by each test file of a pristine checkout, for the CoverageIndex
+        
+        Runs each test file under the coverage.py of the checkout's env,
+        which pooled envs get as a base requirement (see VenvPool). Nothing
+        is installed here: the env may be shared with other checkouts. None
+        if the env has no coverage module or a measurement fails.
+        """
+        test_files = self._test_files(bug_dir)
+        if not test_files or not (bug_dir / "bugsinpy_run_test.sh").exists():
+            return None
+        
+        probe = run_command(
+            self._in_env(bug_dir, ["-c", "import coverage"]),
+            cwd=bug_dir,
+            env=self.env,
+            timeout=60
+        )
+        if probe.returncode != 0:
+            return None
+        
+        data_file = bug_dir / ".raid-coverage"
+        report = bug_dir / ".raid-coverage.json"
+        # The test files themselves are not what a patch is expected to change
+        omit = ",".join(["env/*", "*/site-packages/*"] + test_files)
+        coverage = {}
+        try:
+            for test_file in test_files:
+                run_command(
+                    self._in_env(bug_dir, ["-m", "coverage", "run", f"--data-file={data_file}", "--source=.",
+                                           f"--omit={omit}"] + self._test_runner(bug_dir, [test_file], ["-q"], ["-q"])),
+                    cwd=bug_dir,
+                    env=self.env,
+                    timeout=600
+                )
+                # Failing tests still count; only a missing report means nothing was measured
+                result = run_command(
+                    self._in_env(bug_dir, ["-m", "coverage", "json", f"--data-file={data_file}", "-o", str(report)]),
+                    cwd=bug_dir,
+                    env=self.env,
+                    timeout=300
+                )
+                if result.returncode != 0 or not report.exists():
+                    return None
+                
+                with open(report, 'r') as f:
+                    files = json.load(f).get("files", {})
+                coverage[test_file] = {
+                    os.path.relpath(os.path.join(bug_dir, path), bug_dir): data.get("executed_lines", [])
+                    for path, data in files.items() if data.get("executed_lines")
+                }
+        finally:
+            for path in (data_file, report):
+                if path.exists():
+                    path.unlink()
+        return coverage
+    
+    def get_bug_ids(self, project: str) -> List[int]:
+        """Bug IDs of a project, from its numbered bugs/ subdirectories"""
+        bugs_dir = self.bugsinpy_path / "projects" / project / "bugs"
+        if not bugs_dir.exists():
+            return []
+        
+        bug_ids = []
+        for item in bugs_dir.iterdir():
+            if item.is_dir() and item.name.isdigit():
+                bug_ids.append(int(item.name))
+        
+        return sorted(bug_ids)
+    
+    def discover_bugs(self) -> Dict[str, List[int]]:
+        """Bug IDs of every project, scanned concurrently and memoized per BugsInPy revision"""
+        if self.discovery_cache is not None:
+            cached = self.discovery_cache.load("bugsinpy", self.bugsinpy_path)
+            if cached is not None:
+                return cached
+        
+        projects = self.get_available_projects()
+        with ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS) as pool:
+            bug_ids = dict(zip(projects, pool.map(self.get_bug_ids, projects)))
+        
+        if self.discovery_cache is not None:
+            self.discovery_cache.store("bugsinpy", self.bugsinpy_path, bug_ids)
+        return bug_ids
     
     def select_bugs(self, count: int = 30) -> List[Dict]:
         """Select a diverse set of bugs for the benchmark"""
-        projects = self.get_available_projects()
+        bugs_by_project = self.discover_bugs()
         selected_bugs = []
         
-        bugs_per_project = max(1, count // len(projects))
+        if not bugs_by_project:
+            return []
         
-        for project in projects:
-            # Bugs are in bugs/ subdirectory, numbered 1, 2, 3, etc.
-            bugs_dir = self.bugsinpy_path / "projects" / project / "bugs"
-            if not bugs_dir.exists():
-                continue
-            
-            # Get list of bug directories (numbered folders)
-            bug_ids = []
-            for item in bugs_dir.iterdir():
-                if item.is_dir() and item.name.isdigit():
-                    bug_ids.append(int(item.name))
-            
-            bug_ids.sort()
-            
+        bugs_per_project = max(1, count // len(bugs_by_project))
+        
+        for project, bug_ids in bugs_by_project.items():
             # Select first N bugs
             for bug_id in bug_ids[:bugs_per_project]:
                 if len(selected_bugs) >= count:
@@ -0,0 +1,257 @@
+"""Incremental parsers for the test output of Defects4J, BugsInPy and BugsJS
+
+A parser is fed the output one line at a time while the command runs (it
+is a run_command on_output callback) and turns it into per-test records.
+With fail_fast, feed() returns True at the first failing test, which makes
+run_command stop the test run there.
+"""
+import abc
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PASSED = "passed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+@dataclass
+class TestRecord:
+    """Outcome of one test; duration in seconds when the runner reports it"""
+    name: str
+    outcome: str
+    duration: Optional[float] = None
+
+class TestOutputParser(abc.ABC):
+    """Per-test records built from a runner's output; subclasses parse one runner's format"""
+
+    def __init__(self, fail_fast: bool = False):
+        self.fail_fast = fail_fast
+        self.records: Dict[str, TestRecord] = {}
+        # Test count printed by the runner, when it prints one
+        self.reported_total: Optional[int] = None
+        self._failures = 0
+
+    def feed(self, stream: str, line: str) -> bool:
+        """Parse one output line; True asks the caller to stop the run"""
+        failures_before = self._failures
+        self.parse_line(stream, line)
+        return self.fail_fast and self._failures > failures_before
+
+    @abc.abstractmethod
+    def parse_line(self, stream: str, line: str):
+        """Update the records from one line of the stream ("stdout" or "stderr")"""
+
+    def record(self, name: str, outcome: str, duration: Optional[float] = None):
+        existing = self.records.get(name)
+        if existing is None:
+            self.records[name] = TestRecord(name, outcome, duration)
+            self._failures += outcome == FAILED
+            return
+
+        # Summaries repeat tests seen earlier: a failure overrides, durations fill in
+        if outcome == FAILED and existing.outcome != FAILED:
+            existing.outcome = FAILED
+            self._failures += 1
+        if duration is not None:
+            existing.duration = duration
+
+    @property
+    def failing_tests(self) -> List[str]:
+        return [r.name for r in self.records.values() if r.outcome == FAILED]
+
+    def summary(self) -> Dict:
+        """failing_tests, total_tests and test_records for a run_tests result"""
+        executed = sum(1 for r in self.records.values() if r.outcome != SKIPPED)
+        total = max(self.reported_total or 0, executed)
+        return {
+            "failing_tests": self.failing_tests,
+            "total_tests": total or None,
+            "test_records": [asdict(r) for r in self.records.values()]
+        }
+
+class Defects4JParser(TestOutputParser):
+    """`defects4j test` output: a "Failing tests: N" header and "  - Class::method" lines
+
+    defects4j only prints failures; passing tests are read afterwards from
+    the all_tests file it writes into the checkout (see finish()).
+    """
+
+    def __init__(self, fail_fast: bool = False):
+        super().__init__(fail_fast)
+        self._in_failures = False
+
+    def parse_line(self, stream: str, line: str):
+        if stream != "stdout":
+            return
+        if line.startswith("Failing tests:"):
+            self._in_failures = True
+        elif self._in_failures and line.strip().startswith("- "):
+            self.record(line.strip()[2:].strip(), FAILED)
+        elif line.strip():
+            self._in_failures = False
+
+    def finish(self, bug_dir: Path):
+        """Add the passing tests listed in bug_dir/all_tests ("method(Class)" lines)"""
+        all_tests = bug_dir / "all_tests"
+        if not all_tests.exists():
+            return
+        for line in all_tests.read_text(errors='replace').split('\n'):
+            match = re.match(r"^([\w$]+)\(([\w.$]+)\)$", line.strip())
+            if match:
+                name = f"{match.group(2)}::{match.group(1)}"
+                if name not in self.records:
+                    self.record(name, PASSED)
+
+class PytestParser(TestOutputParser):
+    """pytest and unittest output, as printed by the commands of bugsinpy_run_test.sh
+
+    Understands verbose per-test lines, pytest's short summary (FAILED/ERROR),
+    --durations lines, unittest FAIL:/ERROR: headers and both runners' totals.
+    Totals of several commands in one run add up. Progress lines ("..F.s")
+    are counted as they stream, so a run stopped before its totals (by
+    fail_fast, or by -x/-f) still reports how many tests ran.
+    """
+
+    PYTEST_VERBOSE = re.compile(r"^(\S+::\S+?)\s+(PASSED|FAILED|ERROR|SKIPPED|XFAIL|XPASS)\b")
+    PYTEST_SUMMARY = re.compile(r"^(FAILED|ERROR) (\S+::\S+)")
+    PYTEST_DURATION = re.compile(r"^([\d.]+)s (call|setup|teardown)\s+(\S+::\S+)")
+    # "=== 1 failed, 2 passed in 0.1s ===", or without the rules under -q
+    PYTEST_TOTALS = re.compile(r"^(?:=+ )?(.*\d+ (?:passed|failed|errors?|skipped).*) in [\d.]+s")
+    # pytest's "tests/test_a.py ..F  [ 50%]" (just the characters under -q) and unittest's dots
+    PROGRESS = re.compile(r"^(?:\S+\.py )?([.FEsxXu]+)\s*(?:\[\s*\d+%\])?$")
+    UNITTEST_VERBOSE = re.compile(r"^(\w+) \(([\w.]+)\) \.\.\. (ok|FAIL|ERROR|skipped|expected failure)")
+    UNITTEST_FAILURE = re.compile(r"^(FAIL|ERROR): (\w+) \(([\w.]+)\)")
+    UNITTEST_TOTAL = re.compile(r"^Ran (\d+) tests? in [\d.]+s")
+
+    OUTCOMES = {
+        "PASSED": PASSED, "XFAIL": PASSED, "XPASS": PASSED, "ok": PASSED, "expected failure": PASSED,
+        "FAILED": FAILED, "ERROR": FAILED, "FAIL": FAILED,
+        "SKIPPED": SKIPPED, "skipped": SKIPPED
+    }
+
+    def __init__(self, fail_fast: bool = False):
+        super().__init__(fail_fast)
+        # Tests run according to the progress lines, skips excluded
+        self._progress_total = 0
+
+    def parse_line(self, stream: str, line: str):
+        match = self.PYTEST_VERBOSE.match(line)
+        if match:
+            self.record(match.group(1), self.OUTCOMES[match.group(2)])
+            return
+        match = self.PYTEST_SUMMARY.match(line)
+        if match:
+            self.record(match.group(2), FAILED)
+            return
+        match = self.PYTEST_DURATION.match(line)
+        if match:
+            if match.group(2) == "call" and match.group(3) in self.records:
+                self.records[match.group(3)].duration = float(match.group(1))
+            return
+        match = self.PYTEST_TOTALS.match(line)
+        if match:
+            counts = re.findall(r"(\d+) (passed|failed|errors?)", match.group(1))
+            self._add_total(sum(int(n) for n, _ in counts))
+            return
+        match = self.UNITTEST_VERBOSE.match(line)
+        if match:
+            self.record(self._unittest_name(match.group(1), match.group(2)), self.OUTCOMES[match.group(3)])
+            return
+        match = self.UNITTEST_FAILURE.match(line)
+        if match:
+            self.record(self._unittest_name(match.group(2), match.group(3)), FAILED)
+            return
+        match = self.UNITTEST_TOTAL.match(line)
+        if match:
+            self._add_total(int(match.group(1)))
+            return
+        match = self.PROGRESS.match(line.strip())
+        if match:
+            self._progress_total += len(match.group(1)) - match.group(1).count("s")
+
+    def summary(self) -> Dict:
+        summary = super().summary()
+        if self._progress_total > (summary["total_tests"] or 0):
+            summary["total_tests"] = self._progress_total
+        return summary
+
+    @staticmethod
+    def _unittest_name(method: str, qualifier: str) -> str:
+        # Python 3.11+ prints the full test id in the parentheses
+        return qualifier if qualifier.endswith(f".{method}") else f"{qualifier}.{method}"
+
+    def _add_total(self, count: int):
+        self.reported_total = (self.reported_total or 0) + count
+
+class MochaParser(TestOutputParser):
+    """mocha spec reporter and TAP output of `npm test`
+
+    Spec: "✓ title (12ms)" and "1) title" lines under suite headings,
+    then "N passing"/"N failing" totals. TAP: "ok 1 - title", "not ok 2 -
+    title", "# SKIP" directives and a "1..N" plan.
+    """
+
+    SPEC_PASSED = re.compile(r"^\s+[✓✔√]\s+(.+?)(?: \((\d+)ms\))?$")
+    SPEC_FAILED = re.compile(r"^\s+\d+\) (.+)$")
+    SPEC_PENDING = re.compile(r"^\s+- (.+)$")
+    SPEC_TOTAL = re.compile(r"^\s+(\d+) (passing|failing|pending)")
+    TAP_RESULT = re.compile(r"^(not ok|ok) \d+(?: -)? (.*?)(?: # (SKIP|TODO).*)?$")
+    TAP_DURATION = re.compile(r"# time=([\d.]+)ms")
+    TAP_PLAN = re.compile(r"^1\.\.(\d+)$")
+
+    def __init__(self, fail_fast: bool = False):
+        super().__init__(fail_fast)
+        self._after_totals = False
+        self._suites: List[str] = []
+
+    def parse_line(self, stream: str, line: str):
+        if stream != "stdout":
+            return
+
+        match = self.TAP_RESULT.match(line)
+        if match:
+            name = self.TAP_DURATION.sub("", match.group(2)).strip()
+            duration = self.TAP_DURATION.search(line)
+            outcome = SKIPPED if match.group(3) else (PASSED if match.group(1) == "ok" else FAILED)
+            self.record(name, outcome, float(duration.group(1)) / 1000 if duration else None)
+            return
+        match = self.TAP_PLAN.match(line.strip())
+        if match:
+            self.reported_total = int(match.group(1))
+            return
+
+        match = self.SPEC_PASSED.match(line)
+        if match:
+            # Passing tests only appear in a (next) test run, not in failure details
+            self._after_totals = False
+            duration = int(match.group(2)) / 1000 if match.group(2) else None
+            self.record(self._qualified(line, match.group(1)), PASSED, duration)
+            return
+        match = self.SPEC_TOTAL.match(line)
+        if match:
+            self._after_totals = True
+            if match.group(2) != "pending":
+                self.reported_total = (self.reported_total or 0) + int(match.group(1))
+            return
+        if self._after_totals:
+            # Failure details repeat the "1) title" lines
+            return
+
+        match = self.SPEC_FAILED.match(line)
+        if match:
+            self.record(self._qualified(line, match.group(1)), FAILED)
+            return
+        match = self.SPEC_PENDING.match(line)
+        if match:
+            self.record(self._qualified(line, match.group(1)), SKIPPED)
+            return
+        level = (len(line) - len(line.lstrip())) // 2
+        if line.strip() and level >= 1:
+            # Suite heading: its indentation gives its nesting level
+            self._suites = self._suites[:level - 1] + [line.strip()]
+
+    def _qualified(self, line: str, title: str) -> str:
+        """Test title prefixed with its enclosing suites"""
+        level = (len(line) - len(line.lstrip())) // 2
+        return " ".join(self._suites[:max(0, level - 1)] + [title])
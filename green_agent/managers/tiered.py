@@ -0,0 +1,44 @@
+"""Tiered fail-fast test execution shared by the bug managers"""
+from typing import Callable, Dict, Optional
+
+from green_agent.managers.test_output import FAILED
+
+# Test tiers in the order run_tiered runs them: cheapest and most telling first
+TIERS = ("trigger", "relevant", "all")
+
+def run_tiered(run_tier: Callable[[str], Optional[Dict]]) -> Dict:
+    """Run the test tiers in order and stop at the first one that fails
+
+    Args:
+        run_tier: Runs one tier and returns a run_tests result dict, or None
+            when the bug has no tests for that tier (the tier is skipped)
+
+    Returns:
+        The result of the last tier that ran, with the output and the
+        test_records of all tiers, "tier" naming the last tier and "tiers"
+        mapping each tier run to whether it passed
+    """
+    result = None
+    outputs = []
+    tiers = {}
+    # A test run by several tiers keeps its failure, if any tier saw one
+    records: Dict[str, Dict] = {}
+    for tier in TIERS:
+        tier_result = run_tier(tier)
+        if tier_result is None:
+            continue
+
+        result = tier_result
+        tiers[tier] = tier_result["success"]
+        outputs.append(f"=== {tier} tests ===\n{tier_result.get('output', '')}")
+        for record in tier_result.get("test_records") or []:
+            if records.get(record["name"], {}).get("outcome") != FAILED:
+                records[record["name"]] = record
+        if not tier_result["success"]:
+            break
+
+    if result is None:
+        return {"success": False, "output": "", "failing_tests": [], "tier": None, "tiers": {}}
+
+    return dict(result, output="\n".join(outputs), tier=list(tiers)[-1], tiers=tiers,
+                test_records=list(records.values()))
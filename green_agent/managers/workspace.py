@@ -0,0 +1,97 @@
+"""Per-evaluation workspace directories with a disk quota and background cleanup"""
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+from green_agent.cache.fsutil import tree_size
+
+# Released checkouts wait here until the reaper deletes them
+TRASH_DIR = ".trash"
+
+class WorkspaceAllocator:
+    """Hands out a fresh checkout directory for every evaluation
+
+    Directories are named <project>_<bug_id>_<buggy|fixed>-<token>, so the
+    same bug can be evaluated several times at once. Released directories
+    are renamed into .trash/, which is instant, and deleted by a background
+    reaper thread, keeping large deletes off the evaluation path.
+
+    With a quota, allocate() waits while the workspace (including trash not
+    yet deleted) is over it. Usage is measured by the reaper, so the quota
+    is enforced approximately, not to the byte.
+    """
+
+    def __init__(self, root: str, quota_mb: int = 0, reap_interval: float = 30.0, quota_wait: float = 600.0):
+        self.root = Path(root)
+        self.trash = self.root / TRASH_DIR
+        self.trash.mkdir(parents=True, exist_ok=True)
+        self.quota = quota_mb * 1024 * 1024
+        self.reap_interval = reap_interval
+        self.quota_wait = quota_wait
+        self._usage = 0
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._stopped = False
+        # Also deletes trash left behind by an earlier run
+        self._reaper = threading.Thread(target=self._reap_loop, name="workspace-reaper", daemon=True)
+        self._reaper.start()
+
+    def allocate(self, project: str, bug_id: int, buggy: bool = True) -> Path:
+        """Reserve a new, not yet existing directory for a checkout
+
+        Raises:
+            Exception: If the workspace stays over its quota for quota_wait seconds
+        """
+        if self.quota:
+            self._wait_for_quota()
+        name = f"{project}_{bug_id}_{'buggy' if buggy else 'fixed'}-{uuid.uuid4().hex[:8]}"
+        return self.root / name
+
+    def release(self, bug_dir: Path):
+        """Move a checkout out of the way; the reaper deletes it later"""
+        bug_dir = Path(bug_dir)
+        if os.path.lexists(bug_dir):
+            os.rename(bug_dir, self.trash / f"{bug_dir.name}-{uuid.uuid4().hex[:8]}")
+            self._wake.set()
+
+    def reap(self):
+        """Delete released checkouts and re-measure the workspace"""
+        for entry in os.listdir(self.trash):
+            path = self.trash / entry
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+        if self.quota:
+            usage = tree_size(self.root)
+            with self._cond:
+                self._usage = usage
+                self._cond.notify_all()
+
+    def shutdown(self):
+        self._stopped = True
+        self._wake.set()
+        self._reaper.join()
+
+    def _wait_for_quota(self):
+        with self._cond:
+            if self._usage < self.quota:
+                return
+            self._wake.set()
+            if not self._cond.wait_for(lambda: self._usage < self.quota, timeout=self.quota_wait):
+                raise Exception(
+                    f"Workspace {self.root} over its quota "
+                    f"({self._usage // (1024 * 1024)} of {self.quota // (1024 * 1024)} MB)"
+                )
+
+    def _reap_loop(self):
+        while not self._stopped:
+            self._wake.clear()
+            try:
+                self.reap()
+            except OSError as e:
+                print(f"WARNING: Workspace cleanup failed: {e}")
+            self._wake.wait(self.reap_interval)
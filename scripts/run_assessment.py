@@ -9,7 +9,10 @@ import time
 import json
 import sys
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Consecutive failed connections to an event stream before giving up
+MAX_RECONNECTS = 5
 
 class AssessmentRunner:
     def __init__(self, base_url: str = "http://localhost:8000"):
@@ -47,23 +50,72 @@ class AssessmentRunner:
     def wait_for_assessment(self, assessment_id: str) -> Dict:
         print(f"⏳ Waiting for assessment {assessment_id} to complete...")
         
-        while True:
-            response = self.session.get(f"{self.base_url}/assess/{assessment_id}")
-            status_info = response.json()
-            
-            status = status_info["status"]
-            if status == "completed":
-                print(f"✅ Assessment {assessment_id} completed!")
-                return status_info
-            elif status == "failed":
-                print(f"❌ Assessment {assessment_id} failed: {status_info.get('error', 'Unknown error')}")
-                return status_info
-            else:
-                progress = status_info.get("progress", {})
-                completed = progress.get("completed", 0)
-                total = progress.get("total", 0)
-                print(f"   Progress: {completed}/{total} bugs processed...")
-                time.sleep(5)  # Wait 5 seconds before checking again
+        # Follow the assessment's event stream, resuming where it broke off
+        last_event_id = None
+        finished = False
+        failures = 0
+        while not finished:
+            try:
+                received = False
+                for event_id, event, data in self.stream_events(f"/assess/{assessment_id}/events", last_event_id):
+                    last_event_id = event_id or last_event_id
+                    received = True
+                    failures = 0
+                    if event == "bug_started":
+                        print(f"   Bug {data['bug_index']} started")
+                    elif event == "phase":
+                        print(f"   Bug {data['bug_index']}: {data['phase']}")
+                    elif event == "result":
+                        progress = data["progress"]
+                        print(f"   Progress: {progress['completed']}/{progress['total']} bugs processed "
+                              f"(bug {data['bug_index']} scored {data['result']['total_score']:.3f})")
+                    elif event in ("assessment_completed", "assessment_failed", "assessment_cancelled"):
+                        finished = True
+                if not finished and not received:
+                    raise requests.ConnectionError("event stream closed without sending an event")
+            except requests.RequestException as e:
+                # A client error (unknown assessment, bad request) will not go away on retry
+                response = getattr(e, "response", None)
+                if response is not None and 400 <= response.status_code < 500:
+                    raise
+                failures += 1
+                if failures > MAX_RECONNECTS:
+                    raise
+                print(f"   Event stream interrupted ({e}), reconnecting ({failures}/{MAX_RECONNECTS})...")
+                time.sleep(1)
+        
+        status_info = self.session.get(f"{self.base_url}/assess/{assessment_id}").json()
+        if status_info["status"] == "completed":
+            print(f"✅ Assessment {assessment_id} completed!")
+        elif status_info["status"] == "cancelled":
+            print(f"❌ Assessment {assessment_id} was cancelled")
+        else:
+            print(f"❌ Assessment {assessment_id} failed: {status_info.get('error', 'Unknown error')}")
+        return status_info
+    
+    def stream_events(self, path: str, last_event_id: Optional[str] = None) -> Iterator[Tuple[Optional[str], str, Dict]]:
+        """Yield (id, event, data) from a Server-Sent Events endpoint until the server closes it"""
+        headers = {"Accept": "text/event-stream"}
+        if last_event_id is not None:
+            headers["Last-Event-ID"] = last_event_id
+        with self.session.get(f"{self.base_url}{path}", headers=headers, stream=True, timeout=(10, 60)) as response:
+            response.raise_for_status()
+            event_id, event, data = None, "message", []
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(":")
+                    value = value[1:] if value.startswith(" ") else value
+                    if field == "id":
+                        event_id = value
+                    elif field == "event":
+                        event = value
+                    elif field == "data":
+                        data.append(value)
+                    continue
+                # A blank line ends an event; comment-only blocks (keepalives) carry no data
+                if data:
+                    yield event_id, event, json.loads("\n".join(data))
+                event_id, event, data = None, "message", []
     
     def get_leaderboard(self) -> Dict:
         response = self.session.get(f"{self.base_url}/leaderboard")
@@ -11,5 +11,5 @@ setup(
         "pyyaml",
         "requests",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.9",
 )
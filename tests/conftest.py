@@ -0,0 +1,4 @@
+"""Shared pytest configuration"""
+
+# Manual scripts that need the bug frameworks installed; run them directly
+collect_ignore = ["test_managers.py", "test_individual.py", "mock_purple_agent.py"]
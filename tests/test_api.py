@@ -0,0 +1,148 @@
+"""Tests for the HTTP caching, paging and fix evaluation of the A2A API"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from green_agent.api import a2a_interface
+from green_agent.evaluator.scorer import FixScore
+from test_results_store import make_result
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(a2a_interface, "RESULTS_DIR", str(tmp_path))
+    monkeypatch.setattr(a2a_interface, "_results_store", None)
+    store = a2a_interface.get_results_store()
+    monkeypatch.setitem(a2a_interface.leaderboard_cache, "version", None)
+    # Without entering the client, the lifespan (catalog, scheduler, queue) does not run
+    return TestClient(a2a_interface.app), store
+
+def test_results_store_is_opened_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.setattr(a2a_interface, "RESULTS_DIR", str(tmp_path / "results"))
+    monkeypatch.setattr(a2a_interface, "_results_store", None)
+    assert not (tmp_path / "results").exists()
+
+    store = a2a_interface.get_results_store()
+    assert (tmp_path / "results" / "results.db").exists()
+    assert a2a_interface.get_results_store() is store
+
+def test_leaderboard_is_revalidated_by_etag(client):
+    client, store = client
+    store.create_assessment("a1", "alice", [0, 1], "2026-01-01")
+    store.add_result(make_result("a1", "alice", 0), 0)
+
+    first = client.get("/leaderboard")
+    etag = first.headers["etag"]
+    assert first.json()["leaderboard"][0]["agent_id"] == "alice"
+
+    assert client.get("/leaderboard", headers={"If-None-Match": etag}).status_code == 304
+
+    store.add_result(make_result("a1", "alice", 1), 1)
+    changed = client.get("/leaderboard", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["leaderboard"][0]["total_assessments"] == 2
+
+def test_bug_list_pages_by_cursor(client, monkeypatch):
+    client, _ = client
+    catalog = [{"language": "java" if n % 3 else "python", "framework": "x", "project": "p", "bug_id": n}
+               for n in range(10)]
+    monkeypatch.setattr(a2a_interface.agent, "bugs_catalog", catalog)
+
+    first = client.get("/bugs/list", params={"language": "java", "limit": 4}).json()
+    assert [bug["bug_index"] for bug in first["bugs"]] == [1, 2, 4, 5]
+    second = client.get("/bugs/list", params={"language": "java", "limit": 4, "cursor": first["next_cursor"]}).json()
+    assert [bug["bug_index"] for bug in second["bugs"]] == [7, 8]
+    assert second["next_cursor"] is None
+
+def test_results_stream_as_ndjson(client):
+    client, store = client
+    store.create_assessment("a1", "alice", [0, 1], "2026-01-01")
+    store.add_result(make_result("a1", "alice", 0), 0)
+    store.add_result(make_result("a1", "alice", 1), 1)
+
+    response = client.get("/results", params={"format": "ndjson", "limit": 1})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert len(response.text.splitlines()) == 2
+
+@pytest.fixture
+def fake_evaluator(monkeypatch):
+    """Scores every fix by the number of fixed files, without a scheduler; bug 9 fails"""
+    def evaluate_fix(bug_index, fixed_files=None, patch=None):
+        if bug_index == 9:
+            raise RuntimeError("checkout failed")
+        return FixScore(str(bug_index), "python", 1.0, 1.0, 1.0, 1.0, float(len(fixed_files)), {})
+
+    executor = ThreadPoolExecutor(2)
+    monkeypatch.setattr(a2a_interface, "scheduler", None)
+    monkeypatch.setattr(a2a_interface, "fix_executor", executor)
+    monkeypatch.setattr(a2a_interface.agent, "get_bug", lambda bug_index: {"bug_id": bug_index} if bug_index < 10 else None)
+    monkeypatch.setattr(a2a_interface.agent, "evaluate_fix", evaluate_fix)
+    yield
+    executor.shutdown()
+
+def test_single_fix_is_scored(client, fake_evaluator):
+    client, _ = client
+
+    response = client.post("/evaluate", json={"bug_index": 1, "fixed_files": {"a.py": "", "b.py": ""}})
+    assert response.json()["score"]["total_score"] == 2.0
+    assert client.post("/evaluate", json={"bug_index": 10, "fixed_files": {}}).status_code == 404
+
+def test_batch_results_come_back_in_submission_order(client, fake_evaluator):
+    client, _ = client
+    submissions = [{"bug_index": 3, "fixed_files": {"a.py": ""}}, {"bug_index": 9, "fixed_files": {}},
+                   {"bug_index": 1, "fixed_files": {}}]
+
+    job = client.post("/evaluate/batch", json={"submissions": submissions}).json()
+    assert job["total"] == 3
+    deadline = time.time() + 5
+    while (info := client.get(f"/evaluate/batch/{job['job_id']}").json())["status"] != "completed":
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    assert [r["bug_index"] for r in info["results"]] == [3, 9, 1]
+    assert info["results"][0]["score"]["total_score"] == 1.0
+    assert info["results"][1]["error"] == "checkout failed"
+
+def test_batch_with_an_unknown_bug_is_rejected(client, fake_evaluator):
+    client, _ = client
+
+    response = client.post("/evaluate/batch", json={"submissions": [{"bug_index": 12, "fixed_files": {}}]})
+    assert response.status_code == 404
+    assert client.get("/evaluate/batch/missing").status_code == 404
+
+def test_prefetched_checkouts_are_released_when_an_assessment_stops(monkeypatch):
+    prepared, evaluated, released = [], [], []
+    lock = threading.Lock()
+
+    def prepare_bug(bug_index, on_phase=None):
+        with lock:
+            prepared.append(bug_index)
+        return {"bug_index": bug_index, "bug_dir": f"/work/{bug_index}"}
+
+    def evaluate_fix(bug_index, prepared=None, on_phase=None, **fix):
+        # evaluate_fix releases the checkout it was given
+        evaluated.append(prepared["bug_index"])
+        return FixScore(str(bug_index), "python", 1.0, 1.0, 1.0, 1.0, 1.0, {})
+
+    monkeypatch.setattr(a2a_interface, "scheduler", None)
+    monkeypatch.setattr(a2a_interface.agent, "prepare_bug", prepare_bug)
+    monkeypatch.setattr(a2a_interface.agent, "evaluate_fix", evaluate_fix)
+    monkeypatch.setattr(a2a_interface.agent, "release_prepared", lambda p: released.append(p["bug_index"]))
+    monkeypatch.setitem(a2a_interface.agent.config["evaluation"], "prefetch_lookahead", 2)
+    stop = threading.Event()
+
+    bugs = [(position, 10 + position, None) for position in range(6)]
+    for position, bug_index, _ in a2a_interface.evaluate_bugs(bugs, lambda bug_index, phase: None, stop):
+        if position == 1:
+            stop.set()
+
+    assert evaluated == [10, 11]
+    # Every other checkout that was made is released exactly once
+    assert sorted(released) == sorted(set(prepared) - {10, 11})
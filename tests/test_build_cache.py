@@ -0,0 +1,104 @@
+"""Tests for the build output cache"""
+import shutil
+
+from green_agent.cache import build_cache
+from green_agent.cache.build_cache import BuildCache
+
+BUG = {'framework': 'defects4j', 'project': 'Lang', 'bug_id': 1}
+
+def make_checkout(path):
+    (path / "src").mkdir(parents=True)
+    (path / "src" / "A.java").write_text("class A {}\n")
+    return path
+
+def test_key_depends_on_changed_files_only(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    bug_dir = make_checkout(tmp_path / "w")
+    pristine = cache.source_key(BUG, bug_dir, revision="r1")
+    # Unlisted files are not read
+    (bug_dir / "src" / "B.java").write_text("class B {}\n")
+    assert cache.source_key(BUG, bug_dir, revision="r1") == pristine
+
+    fixed = cache.source_key(BUG, bug_dir, revision="r1", changed=["src/A.java"])
+    assert fixed != pristine
+    (bug_dir / "src" / "A.java").write_text("class A { int x; }\n")
+    assert cache.source_key(BUG, bug_dir, revision="r1", changed=["src/A.java"]) != fixed
+    (bug_dir / "src" / "A.java").unlink()
+    assert cache.source_key(BUG, bug_dir, revision="r1", changed=["src/A.java"]) != fixed
+
+def test_key_depends_on_version_and_revision(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    bug_dir = make_checkout(tmp_path / "w")
+    keys = {
+        cache.source_key(BUG, bug_dir, buggy=True, revision="r1"),
+        cache.source_key(BUG, bug_dir, buggy=False, revision="r1"),
+        cache.source_key(BUG, bug_dir, buggy=True, revision="r2"),
+    }
+    assert len(keys) == 3
+
+def test_store_and_restore_into_another_checkout(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), clone_mode="copy")
+    first = make_checkout(tmp_path / "first")
+    (first / "build").mkdir()
+    (first / "build" / "A.class").write_bytes(b"\xca\xfe")
+    key = cache.source_key(BUG, first)
+    cache.store(key, first, ["build"])
+    assert not (tmp_path / "cache" / f".{key}.lock").exists()
+
+    second = make_checkout(tmp_path / "second")
+    assert cache.restore(key, second, ["build"])
+    assert (second / "build" / "A.class").read_bytes() == b"\xca\xfe"
+    assert cache.stats() == {"hits": 1, "misses": 0}
+
+def test_restore_of_missing_or_evicted_entry_is_a_miss(tmp_path, monkeypatch):
+    cache = BuildCache(str(tmp_path / "cache"), clone_mode="copy")
+    bug_dir = make_checkout(tmp_path / "w")
+    assert not cache.restore("0" * 64, bug_dir, ["build"])
+
+    (bug_dir / "build").mkdir()
+    (bug_dir / "build" / "A.class").write_bytes(b"x")
+    key = cache.source_key(BUG, bug_dir)
+    cache.store(key, bug_dir, ["build"])
+    # Evicted by another process after the manifest was read
+    def evicted_clone(src, dest, mode):
+        dest.mkdir(parents=True)
+        shutil.rmtree(cache._entry_dir(key))
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(build_cache, "clone_tree", evicted_clone)
+    target = make_checkout(tmp_path / "target")
+    assert not cache.restore(key, target, ["build"])
+    assert not (target / "build").exists()
+    assert cache.stats() == {"hits": 0, "misses": 2}
+
+def test_restored_scripts_point_at_the_new_checkout(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), clone_mode="copy")
+    first = make_checkout(tmp_path / "first")
+    (first / "env" / "bin").mkdir(parents=True)
+    (first / "env" / "bin" / "pytest").write_text(f"#!{first}/env/bin/python\n")
+    key = cache.source_key(BUG, first)
+    cache.store(key, first, ["env"])
+
+    second = make_checkout(tmp_path / "second")
+    assert cache.restore(key, second, ["env"])
+    assert (second / "env" / "bin" / "pytest").read_text() == f"#!{second}/env/bin/python\n"
+
+def test_outputs_rewritten_in_place_leave_the_entry_intact(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"), clone_mode="hardlink")
+    first = make_checkout(tmp_path / "first")
+    (first / "build").mkdir()
+    (first / "build" / "A.class").write_bytes(b"\xca\xfe")
+    key = cache.source_key(BUG, first)
+    cache.store(key, first, ["build"])
+
+    second = make_checkout(tmp_path / "second")
+    assert cache.restore(key, second, ["build"])
+    # Like javac, write into the existing file rather than replacing it
+    with open(second / "build" / "A.class", "r+b") as f:
+        f.write(b"\xba\xbe")
+    with open(first / "build" / "A.class", "r+b") as f:
+        f.write(b"\xba\xbe")
+
+    third = make_checkout(tmp_path / "third")
+    assert cache.restore(key, third, ["build"])
+    assert (third / "build" / "A.class").read_bytes() == b"\xca\xfe"
@@ -0,0 +1,51 @@
+"""Tests for the pristine checkout cache"""
+import time
+
+import pytest
+
+from green_agent.cache.checkout_cache import CheckoutCache
+
+def materializer(calls):
+    def materialize(target):
+        calls.append(target.name)
+        target.mkdir(parents=True)
+        (target / "Foo.java").write_text("class Foo {}\n")
+    return materialize
+
+def test_version_is_materialized_once_and_cloned(tmp_path):
+    cache = CheckoutCache(str(tmp_path / "cache"))
+    calls = []
+
+    first = cache.checkout("defects4j", "Lang", 1, True, tmp_path / "w1", materializer(calls))
+    (first / "Foo.java").write_text("changed\n")
+    second = cache.checkout("defects4j", "Lang", 1, True, tmp_path / "w2", materializer(calls))
+
+    assert len(calls) == 1
+    assert (second / "Foo.java").read_text() == "class Foo {}\n"
+    assert (cache.pristine_path("defects4j", "Lang", 1) / "Foo.java").read_text() == "class Foo {}\n"
+
+def test_least_recently_used_version_is_evicted(tmp_path):
+    cache = CheckoutCache(str(tmp_path / "cache"), max_entries=2)
+    calls = []
+    for bug_id in (1, 2):
+        cache.checkout("defects4j", "Lang", bug_id, True, tmp_path / f"w{bug_id}", materializer(calls))
+        time.sleep(0.01)
+    cache.checkout("defects4j", "Lang", 1, True, tmp_path / "w1", materializer(calls))
+    time.sleep(0.01)
+
+    cache.checkout("defects4j", "Lang", 3, True, tmp_path / "w3", materializer(calls))
+
+    assert not cache.pristine_path("defects4j", "Lang", 2).exists()
+    assert cache.pristine_path("defects4j", "Lang", 1).exists()
+
+def test_failed_materialize_leaves_nothing_cached(tmp_path):
+    cache = CheckoutCache(str(tmp_path / "cache"))
+
+    def fail(target):
+        target.mkdir(parents=True)
+        raise RuntimeError("checkout failed")
+
+    with pytest.raises(RuntimeError):
+        cache.checkout("bugsinpy", "black", 1, True, tmp_path / "w", fail)
+    assert not cache.pristine_path("bugsinpy", "black", 1).exists()
+    assert [p.name for p in (tmp_path / "cache" / "bugsinpy").iterdir()] == []
@@ -0,0 +1,85 @@
+"""Tests for the asyncio subprocess layer"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from green_agent.managers import command
+from green_agent.managers.command import CommandCancelled, cancel_scope, run_command
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+def test_output_exit_code_and_streamed_lines(tmp_path):
+    lines = []
+    result = run_command(
+        python("import os, sys; print(os.getcwd()); print('oops', file=sys.stderr); sys.exit(3)"),
+        cwd=str(tmp_path),
+        on_output=lambda stream, line: lines.append((stream, line))
+    )
+
+    assert result.returncode == 3
+    assert result.stdout == f"{tmp_path}\n"
+    assert result.stderr == "oops\n"
+    assert not result.timed_out
+    assert sorted(lines) == [("stderr", "oops"), ("stdout", str(tmp_path))]
+
+def test_timeout_kills_the_whole_process_group(tmp_path, monkeypatch):
+    monkeypatch.setattr(command, "KILL_GRACE_PERIOD", 0.5)
+    pid_file = tmp_path / "child.pid"
+    # The child outlives its parent unless its process group is killed
+    code = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+        f"open({str(pid_file)!r}, 'w').write(str(child.pid))\n"
+        "time.sleep(30)\n"
+    )
+
+    start = time.time()
+    result = run_command(python(code), timeout=1)
+
+    assert result.timed_out
+    assert time.time() - start < 10
+    child = int(pid_file.read_text())
+    deadline = time.time() + 5
+    while _alive(child) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not _alive(child)
+
+def test_cancel_scope_stops_a_running_command():
+    stop = threading.Event()
+    threading.Timer(0.3, stop.set).start()
+
+    start = time.time()
+    with cancel_scope(stop):
+        with pytest.raises(CommandCancelled):
+            run_command(python("import time; time.sleep(30)"))
+    assert time.time() - start < 10
+
+def test_cancel_scope_starts_no_new_command_once_set(tmp_path):
+    stop = threading.Event()
+    stop.set()
+    marker = tmp_path / "ran"
+
+    with cancel_scope(stop):
+        with pytest.raises(CommandCancelled):
+            run_command(python(f"open({str(marker)!r}, 'w')"))
+    assert not marker.exists()
+
+    # Outside the scope commands run again
+    run_command(python(f"open({str(marker)!r}, 'w')"))
+    assert marker.exists()
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A zombie has exited but not been reaped by its (dead) parent's reaper yet
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except OSError:
+        return True
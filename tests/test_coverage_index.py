@@ -0,0 +1,69 @@
+"""Tests for the coverage-based selection of relevant tests"""
+import subprocess
+
+from green_agent.cache.coverage_index import CoverageIndex, changed_lines
+
+BUG = {'framework': 'bugsinpy', 'project': 'black', 'bug_id': 1}
+
+def git(repo, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=repo, check=True,
+                   capture_output=True)
+
+def make_repo(path, files):
+    path.mkdir()
+    for name, content in files.items():
+        (path / name).write_text(content)
+    git(path, "init", "-q")
+    git(path, "add", ".")
+    git(path, "commit", "-q", "-m", "buggy")
+    return path
+
+def test_changed_lines_refer_to_the_checked_out_version(tmp_path):
+    lines = "".join(f"line {n}\n" for n in range(1, 11))
+    repo = make_repo(tmp_path / "bug", {"a.py": lines, "b.py": lines, "c.py": lines})
+    (repo / "a.py").write_text(lines.replace("line 3\n", "three\n").replace("line 7\n", ""))
+    # An insertion touches the lines around it
+    (repo / "b.py").write_text(lines.replace("line 5\n", "line 5\nnew\n"))
+    (repo / "new.py").write_text("x = 1\n")
+
+    assert changed_lines(repo) == {"a.py": {3, 7}, "b.py": {5, 6}}
+
+def test_changed_lines_of_an_unmodified_checkout(tmp_path):
+    assert changed_lines(make_repo(tmp_path / "bug", {"a.py": "x = 1\n"})) == {}
+
+def make_framework(path, revision):
+    (path / ".git" / "refs" / "heads").mkdir(parents=True, exist_ok=True)
+    (path / ".git" / "HEAD").write_text("ref: refs/heads/master\n")
+    (path / ".git" / "refs" / "heads" / "master").write_text(revision + "\n")
+    return path
+
+def test_tests_covering_a_changed_line_are_selected_in_index_order(tmp_path):
+    framework = make_framework(tmp_path / "bugsinpy", "a" * 40)
+    index = CoverageIndex(str(tmp_path / "coverage"))
+    index.ensure(BUG, framework, lambda: {
+        "tests/test_b.py": {"black.py": [1, 2, 3]},
+        "tests/test_a.py": {"black.py": [3, 4], "util.py": [8]},
+        "tests/test_c.py": {"util.py": [9]},
+    })
+
+    assert index.select(BUG, framework, {"black.py": {3}, "util.py": {8}}) == ["tests/test_b.py", "tests/test_a.py"]
+    assert index.select(BUG, framework, {"black.py": {10}}) == []
+    assert index.select({**BUG, 'bug_id': 2}, framework, {"black.py": {3}}) is None
+
+def test_failed_measurement_is_recorded_until_the_revision_moves(tmp_path):
+    framework = make_framework(tmp_path / "bugsinpy", "a" * 40)
+    index = CoverageIndex(str(tmp_path / "coverage"))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return None
+
+    index.ensure(BUG, framework, build)
+    index.ensure(BUG, framework, build)
+    assert len(builds) == 1
+    assert index.select(BUG, framework, {"black.py": {3}}) is None
+
+    make_framework(framework, "b" * 40)
+    index.ensure(BUG, framework, build)
+    assert len(builds) == 2
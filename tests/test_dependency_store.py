@@ -0,0 +1,82 @@
+"""Tests for the shared node_modules store"""
+import os
+import stat
+
+from green_agent.cache.dependency_store import DependencyStore
+
+def install(bug_dir):
+    modules = bug_dir / "node_modules" / "left-pad"
+    modules.mkdir(parents=True)
+    (modules / "index.js").write_text("module.exports = 1\n")
+
+def workspace(tmp_path, name):
+    bug_dir = tmp_path / name
+    bug_dir.mkdir()
+    (bug_dir / "package.json").write_text('{"name": "x"}\n')
+    return bug_dir
+
+def test_installs_run_offline(tmp_path):
+    store = DependencyStore(str(tmp_path / "store"))
+    assert "--offline" in store.install_command()
+    assert "--offline" not in store.fetch_command()
+
+def test_clone_mode_gives_each_workspace_a_writable_copy(tmp_path):
+    store = DependencyStore(str(tmp_path / "store"), link_mode="copy")
+    first = workspace(tmp_path, "first")
+    install(first)
+    key = store.manifest_key(first)
+    store.populate(key, first)
+    # The workspace keeps the tree it installed
+    assert not (first / "node_modules").is_symlink()
+
+    second = workspace(tmp_path, "second")
+    assert store.link(key, second)
+    (second / "node_modules" / "left-pad" / "index.js").write_text("changed\n")
+    stored = tmp_path / "store" / key / "node_modules" / "left-pad" / "index.js"
+    assert stored.read_text() == "module.exports = 1\n"
+
+def test_symlinked_store_is_read_only(tmp_path):
+    store = DependencyStore(str(tmp_path / "store"), link_mode="symlink")
+    bug_dir = workspace(tmp_path, "w")
+    install(bug_dir)
+    key = store.manifest_key(bug_dir)
+    store.populate(key, bug_dir)
+    assert (bug_dir / "node_modules").is_symlink()
+    for path in (bug_dir / "node_modules" / "left-pad", bug_dir / "node_modules" / "left-pad" / "index.js"):
+        assert not os.stat(path).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+def test_symlinked_entry_survives_eviction_while_linked(tmp_path):
+    store = DependencyStore(str(tmp_path / "store"), link_mode="symlink", max_entries=1)
+    first = workspace(tmp_path, "first")
+    install(first)
+    first_key = store.manifest_key(first)
+    store.populate(first_key, first)
+
+    second = workspace(tmp_path, "second")
+    (second / "package.json").write_text('{"name": "y"}\n')
+    install(second)
+    store.populate(store.manifest_key(second), second)
+    assert (tmp_path / "store" / first_key / "node_modules").exists()
+
+    # Once the workspace is gone the entry can be evicted, read-only or not
+    (first / "node_modules").unlink()
+    third = workspace(tmp_path, "third")
+    (third / "package.json").write_text('{"name": "z"}\n')
+    install(third)
+    store.populate(store.manifest_key(third), third)
+    assert not (tmp_path / "store" / first_key).exists()
+
+def test_hardlink_mode_does_not_share_files_with_the_store(tmp_path):
+    store = DependencyStore(str(tmp_path / "store"), link_mode="hardlink")
+    first = workspace(tmp_path, "first")
+    install(first)
+    key = store.manifest_key(first)
+    store.populate(key, first)
+
+    second = workspace(tmp_path, "second")
+    assert store.link(key, second)
+    linked = second / "node_modules" / "left-pad" / "index.js"
+    stored = tmp_path / "store" / key / "node_modules" / "left-pad" / "index.js"
+    assert os.stat(linked).st_ino != os.stat(stored).st_ino
+    # Making the workspace's copy writable leaves the entry read-only
+    assert not os.stat(stored).st_mode & stat.S_IWUSR
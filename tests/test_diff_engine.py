@@ -0,0 +1,61 @@
+"""Tests for the patch size metrics of submitted fixes"""
+import difflib
+
+from green_agent.evaluator.diff_engine import DiffEngine
+
+ORIGINAL = "".join(f"line {n}\n" for n in range(1, 41))
+
+def edit(text, replacements=(), removals=(), insertions=()):
+    lines = text.splitlines(True)
+    for number, new in replacements:
+        lines[number - 1] = new
+    for number in sorted(removals, reverse=True):
+        del lines[number - 1]
+    for number, new in sorted(insertions, reverse=True):
+        lines.insert(number - 1, new)
+    return "".join(lines)
+
+def make_patch(original, fixed, path="src/a.py"):
+    return "".join(difflib.unified_diff(original.splitlines(True), fixed.splitlines(True),
+                                        f"a/{path}", f"b/{path}"))
+
+def counts(stats):
+    return stats.files_touched, stats.lines_added, stats.lines_removed, stats.lines_changed
+
+def test_replacement_counts_as_changed_lines():
+    stats = DiffEngine().diff_text(ORIGINAL, edit(ORIGINAL, replacements=[(5, "five\n"), (6, "six\n")]))
+    assert counts(stats) == (1, 0, 0, 2)
+    assert stats.patch_size == 2
+
+def test_patch_and_text_agree():
+    engine = DiffEngine()
+    fixed = edit(ORIGINAL, replacements=[(3, "three\n")], removals=[20, 21], insertions=[(35, "new\n")])
+
+    assert counts(engine.diff_patch(make_patch(ORIGINAL, fixed))) == counts(engine.diff_text(ORIGINAL, fixed))
+    assert counts(engine.diff_text(ORIGINAL, fixed)) == (1, 1, 2, 1)
+
+def test_patch_over_several_files():
+    engine = DiffEngine()
+    fixed = edit(ORIGINAL, replacements=[(10, "ten\n")])
+    patch = make_patch(ORIGINAL, fixed, "a.py") + make_patch(ORIGINAL, fixed, "b.py")
+
+    assert counts(engine.diff_patch(patch)) == (2, 0, 0, 2)
+
+def test_malformed_patch_counts_as_empty():
+    assert DiffEngine().diff_patch("@@ -1 +1 @@\n-x\n+y\n").patch_size == 0
+
+def test_identical_text_touches_nothing():
+    assert counts(DiffEngine().diff_text(ORIGINAL, ORIGINAL)) == (0, 0, 0, 0)
+
+def test_memoized_results_are_copies():
+    engine = DiffEngine()
+    fixed = edit(ORIGINAL, insertions=[(1, "first\n")])
+    engine.diff_text(ORIGINAL, fixed).lines_added = 100
+
+    assert engine.diff_text(ORIGINAL, fixed).lines_added == 1
+    assert engine.stats() == {"memoized_files": 1}
+
+def test_diff_files_treats_new_files_as_added(tmp_path):
+    (tmp_path / "a.py").write_text(ORIGINAL)
+    stats = DiffEngine().diff_files(tmp_path, {"a.py": edit(ORIGINAL, removals=[1]), "new.py": "x\ny\n"})
+    assert counts(stats) == (2, 2, 1, 0)
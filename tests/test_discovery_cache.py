@@ -0,0 +1,47 @@
+"""Tests for the per-framework bug discovery memo"""
+from green_agent.cache.discovery_cache import DiscoveryCache, git_revision
+
+def make_repo(path, revision="a" * 40):
+    (path / ".git" / "refs" / "heads").mkdir(parents=True)
+    (path / ".git" / "HEAD").write_text("ref: refs/heads/master\n")
+    (path / ".git" / "refs" / "heads" / "master").write_text(revision + "\n")
+    return path
+
+def test_revision_is_read_from_refs_packed_refs_and_detached_heads(tmp_path):
+    repo = make_repo(tmp_path / "repo")
+    assert git_revision(repo) == "a" * 40
+
+    (repo / ".git" / "refs" / "heads" / "master").unlink()
+    (repo / ".git" / "packed-refs").write_text(f"# pack-refs with: peeled\n{'b' * 40} refs/heads/master\n")
+    assert git_revision(repo) == "b" * 40
+
+    (repo / ".git" / "HEAD").write_text("c" * 40 + "\n")
+    assert git_revision(repo) == "c" * 40
+
+def test_revision_through_a_gitdir_file(tmp_path):
+    make_repo(tmp_path / "real")
+    worktree = tmp_path / "worktree"
+    worktree.mkdir()
+    (worktree / ".git").write_text("gitdir: ../real/.git\n")
+    assert git_revision(worktree) == "a" * 40
+
+def test_cached_projects_are_dropped_when_the_revision_moves(tmp_path):
+    repo = make_repo(tmp_path / "defects4j")
+    cache = DiscoveryCache(str(tmp_path / "cache"))
+    projects = {"Lang": [1, 2, 3]}
+
+    assert cache.load("defects4j", repo) is None
+    cache.store("defects4j", repo, projects)
+    assert cache.load("defects4j", repo) == projects
+
+    (repo / ".git" / "refs" / "heads" / "master").write_text("d" * 40 + "\n")
+    assert cache.load("defects4j", repo) is None
+
+def test_frameworks_outside_git_are_not_cached(tmp_path):
+    plain = tmp_path / "bugsjs"
+    plain.mkdir()
+    cache = DiscoveryCache(str(tmp_path / "cache"))
+
+    cache.store("bugsjs", plain, {"express": [1]})
+    assert cache.load("bugsjs", plain) is None
+    assert not (tmp_path / "cache" / "bugsjs.json").exists()
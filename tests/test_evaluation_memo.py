@@ -0,0 +1,64 @@
+"""Tests for memoizing evaluation outcomes by normalized fix"""
+from green_agent import main
+from green_agent.cache.evaluation_memo import EvaluationMemo, fix_hash
+from green_agent.evaluator.scorer import FixScore
+
+BUG = {"framework": "defects4j", "project": "Lang", "bug_id": 1}
+
+def test_line_endings_and_trailing_whitespace_do_not_count():
+    assert (fix_hash({"A.java": "int x = 1;\nreturn x;\n"}, None)
+            == fix_hash({"A.java": "int x = 1;  \r\nreturn x;\r\n\n\n"}, None))
+
+def test_indentation_counts():
+    assert fix_hash({"a.py": "if a:\n    b()\n"}, None) != fix_hash({"a.py": "if a:\nb()\n"}, None)
+    # Inside a Java text block leading whitespace is part of the string
+    block = 'String s = """\n  %s\n""";\n'
+    assert fix_hash({"A.java": block % "x"}, None) != fix_hash({"A.java": block % " x"}, None)
+    assert fix_hash({}, "+++ b/A.java\n+    x\n") != fix_hash({}, "+++ b/A.java\n+  x\n")
+
+def test_content_and_paths_count():
+    assert fix_hash({"A.java": "x = 1;"}, None) != fix_hash({"A.java": "x = 2;"}, None)
+    assert fix_hash({"A.java": "x = 1;"}, None) != fix_hash({"B.java": "x = 1;"}, None)
+
+def test_file_order_does_not_count():
+    assert (fix_hash({"a.js": "1", "b.js": "2"}, None)
+            == fix_hash(dict([("b.js", "2"), ("a.js", "1")]), None))
+
+def test_patch_headers_reduce_to_paths():
+    hunk = "@@ -1 +1 @@\n-x = 1\n+x = 2\n"
+    git = "diff --git a/a.py b/a.py\nindex 1234567..89abcde 100644\n--- a/a.py\n+++ b/a.py\n" + hunk
+    diff_u = "--- a/a.py\t2026-01-01 10:00:00\n+++ b/a.py\t2026-01-02 10:00:00\n" + hunk
+    assert fix_hash({}, git) == fix_hash({}, diff_u)
+    assert fix_hash({}, git) != fix_hash({}, git.replace("x = 2", "x = 3"))
+
+def test_files_and_patch_are_told_apart():
+    assert fix_hash({"a.py": "x"}, None) != fix_hash({"a.py": "x"}, "--- a/a.py\n")
+
+def test_memo_misses_at_another_revision(tmp_path):
+    memo = EvaluationMemo(str(tmp_path / "memo.db"))
+    key = fix_hash({"A.java": "x"}, None)
+    memo.store(BUG, key, "tiered", "rev1", {"score": 1})
+
+    assert memo.get(BUG, key, "tiered", "rev1") == {"score": 1}
+    assert memo.get(BUG, key, "all", "rev1") is None
+    assert memo.get(BUG, key, "tiered", "rev2") is None
+    # The stale entry was dropped
+    assert memo.get(BUG, key, "tiered", "rev1") is None
+
+def test_fixes_that_did_not_apply_are_not_memoized(tmp_path, monkeypatch):
+    agent = main.RAIDGreenAgent.__new__(main.RAIDGreenAgent)
+    agent.evaluation_memo = EvaluationMemo(str(tmp_path / "memo.db"))
+    agent.config = {"evaluation": {"test_suite": "tiered"}}
+    bug = dict(BUG, language="java")
+    manager = type("Manager", (), {"release_bug": lambda self, bug_dir: None})()
+    monkeypatch.setattr(main, "git_revision", lambda path: "rev1")
+    monkeypatch.setattr(agent, "get_bug", lambda bug_index: bug, raising=False)
+    monkeypatch.setattr(agent, "_get_manager", lambda bug: manager, raising=False)
+    monkeypatch.setattr(agent, "_framework_path", lambda bug: tmp_path, raising=False)
+    monkeypatch.setattr(agent, "_evaluate_prepared", lambda *args: (
+        FixScore("1", "java", 0.0, 0.0, 0.0, 0.0, 0.0, {"apply_failed": True, "time_taken": 1.0, "patch_size": 1}),
+        {"success": False, "apply_failed": True}
+    ), raising=False)
+
+    agent.evaluate_fix(0, prepared={"bug_dir": tmp_path / "w"}, patch="--- a/A.java\n")
+    assert agent.evaluation_memo.get(bug, fix_hash({}, "--- a/A.java\n"), "tiered", "rev1") is None
@@ -0,0 +1,74 @@
+"""Tests for the replay and backpressure of the assessment event broker"""
+import asyncio
+
+from green_agent.api import events
+from green_agent.api.events import EventBroker
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+async def published(broker, *event_types, assessment_id="a1"):
+    broker.bind(asyncio.get_running_loop())
+    for event_type in event_types:
+        broker.publish(event_type, assessment_id=assessment_id)
+    # Delivery is scheduled on the loop
+    await asyncio.sleep(0)
+
+def drain(subscriber):
+    queued = []
+    while not subscriber.queue.empty():
+        queued.append(subscriber.queue.get_nowait())
+    return queued
+
+def test_reconnect_replays_only_missed_events_of_its_assessment():
+    async def scenario():
+        broker = EventBroker()
+        await published(broker, "bug_started", "phase")
+        await published(broker, "bug_started", assessment_id="a2")
+        await published(broker, "result")
+
+        subscriber = broker.subscribe("a1", last_event_id=1)
+        return [(event["id"], event["event"]) for event in drain(subscriber)]
+
+    assert run(scenario()) == [(2, "phase"), (4, "result")]
+
+def test_subscriber_without_last_event_id_gets_only_new_events():
+    async def scenario():
+        broker = EventBroker()
+        await published(broker, "bug_started")
+        subscriber = broker.subscribe("a1")
+        await published(broker, "phase")
+        return [event["event"] for event in drain(subscriber)]
+
+    assert run(scenario()) == ["phase"]
+
+def test_slow_subscriber_is_disconnected_with_an_end_marker(monkeypatch):
+    monkeypatch.setattr(events, "SUBSCRIBER_BACKLOG", 2)
+
+    async def scenario():
+        broker = EventBroker()
+        subscriber = broker.subscribe()
+        await published(broker, "phase", "phase", "phase", "phase")
+        return subscriber, broker
+
+    subscriber, broker = run(scenario())
+    queued = drain(subscriber)
+    assert queued[-1] is None
+    assert len(queued) == 2
+    assert subscriber not in broker._subscribers
+
+def test_stream_ends_after_the_terminal_event():
+    async def scenario():
+        broker = EventBroker()
+        subscriber = broker.subscribe("a1")
+        await published(broker, "result", "assessment_completed", "phase")
+        return [chunk async for chunk in broker.stream(subscriber, until_terminal=True)]
+
+    chunks = run(scenario())
+    assert len(chunks) == 2
+    assert chunks[1].startswith("id: 2\nevent: assessment_completed\n")
+
+def test_publish_without_a_bound_loop_is_dropped():
+    broker = EventBroker()
+    broker.publish("phase", assessment_id="a1")
+    assert not broker._history
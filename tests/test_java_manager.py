@@ -0,0 +1,175 @@
+"""Tests for the Defects4J manager"""
+import os
+import shutil
+
+from green_agent.managers import java_manager
+from green_agent.managers.command import CommandResult
+from green_agent.managers.java_manager import JavaManager
+
+BASELINE_DIRS = {"dir.src.classes": "src/main", "dir.src.tests": "src/test",
+                 "dir.bin.classes": "build/classes", "dir.bin.tests": "build/tests"}
+
+def make_tree(root, files):
+    for rel_path, content in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return root
+
+def make_baseline(tmp_path):
+    work = make_tree(tmp_path / "baseline", {
+        "src/main/A.java": "class A {}\n", "src/main/B.java": "class B {}\n",
+        "src/test/ATest.java": "class ATest {}\n", "build/classes/A.class": "a", "build/tests/ATest.class": "t"
+    })
+    return dict(BASELINE_DIRS, work=str(work))
+
+def checkout(tmp_path, **changes):
+    files = {"src/main/A.java": "class A {}\n", "src/main/B.java": "class B {}\n",
+             "src/test/ATest.java": "class ATest {}\n"}
+    files.update(changes)
+    return make_tree(tmp_path / "bug", files)
+
+def test_changed_main_sources_are_listed(tmp_path):
+    manager = JavaManager(str(tmp_path / "d4j"), str(tmp_path / "workspace"))
+    baseline = make_baseline(tmp_path)
+
+    assert manager._changed_sources(checkout(tmp_path), baseline) == []
+    bug_dir = checkout(tmp_path, **{"src/main/B.java": "class B { int x; }\n"})
+    assert manager._changed_sources(bug_dir, baseline) == ["B.java"]
+
+def test_changed_tests_or_added_files_are_not_incremental(tmp_path):
+    manager = JavaManager(str(tmp_path / "d4j"), str(tmp_path / "workspace"))
+    baseline = make_baseline(tmp_path)
+
+    assert manager._changed_sources(checkout(tmp_path, **{"src/test/ATest.java": "changed\n"}), baseline) is None
+    assert manager._changed_sources(checkout(tmp_path, **{"src/main/C.java": "class C {}\n"}), baseline) is None
+
+def test_copied_baseline_classes_are_newer_than_the_sources(tmp_path):
+    manager = JavaManager(str(tmp_path / "d4j"), str(tmp_path / "workspace"))
+    baseline = make_baseline(tmp_path)
+    bug_dir = checkout(tmp_path)
+    # As restored from a checkout cache clone made after the baseline build
+    os.utime(bug_dir / "src/main/A.java", (1.5e9, 1.5e9))
+    os.utime(tmp_path / "baseline/build/classes/A.class", (1e9, 1e9))
+
+    manager._copy_baseline_classes(bug_dir, baseline)
+
+    copied = bug_dir / "build/classes/A.class"
+    assert copied.read_text() == "a"
+    assert copied.stat().st_mtime > (bug_dir / "src/main/A.java").stat().st_mtime
+
+def fake_defects4j(failing):
+    """run_command stand-in for `defects4j test -t <test>`, failing the tests in failing"""
+    calls = []
+
+    def run_command(args, cwd=None, timeout=None, on_output=None):
+        test = args[-1]
+        calls.append(test)
+        lines = ["Failing tests: 1", f"  - {test}"] if test in failing else ["Failing tests: 0"]
+        for line in lines:
+            on_output("stdout", line)
+        return CommandResult(args, 0, "\n".join(lines), "", 0.1)
+
+    return run_command, calls
+
+def test_only_tests_that_ran_are_counted(tmp_path, monkeypatch):
+    run_command, calls = fake_defects4j(failing={"T::b"})
+    monkeypatch.setattr(java_manager, "run_command", run_command)
+    manager = JavaManager(str(tmp_path / "d4j"), str(tmp_path / "workspace"))
+
+    result = manager._run_single_tests(tmp_path, ["T::a", "T::b", "T::c", "T::d"])
+
+    assert calls == ["T::a", "T::b"]
+    assert result["success"] is False
+    assert result["failing_tests"] == ["T::b"]
+    assert result["total_tests"] == 2
+    assert result["tests_not_run"] == ["T::c", "T::d"]
+
+def test_all_passing_tests_are_counted(tmp_path, monkeypatch):
+    run_command, calls = fake_defects4j(failing=set())
+    monkeypatch.setattr(java_manager, "run_command", run_command)
+    manager = JavaManager(str(tmp_path / "d4j"), str(tmp_path / "workspace"))
+
+    result = manager._run_single_tests(tmp_path, ["T::a", "T::b"])
+
+    assert result["success"] is True
+    assert result["total_tests"] == 2
+    assert result["tests_not_run"] == []
+
+def test_few_selected_tests_run_one_at_a_time(tmp_path, monkeypatch):
+    run_command, calls = fake_defects4j(failing=set())
+    monkeypatch.setattr(java_manager, "run_command", run_command)
+    manager = JavaManager(str(tmp_path / "d4j"), str(tmp_path / "workspace"))
+
+    result = manager.run_tests(tmp_path, "relevant", relevant_tests=["ATest", "BTest"])
+
+    assert calls == ["ATest", "BTest"]
+    assert result["success"] is True
+
+def test_larger_selection_runs_the_relevant_suite_once(tmp_path, monkeypatch):
+    commands = []
+
+    def run_command(args, cwd=None, timeout=None, on_output=None):
+        commands.append(args[1:])
+        on_output("stdout", "Failing tests: 0")
+        return CommandResult(args, 0, "Failing tests: 0", "", 0.1)
+
+    monkeypatch.setattr(java_manager, "run_command", run_command)
+    manager = JavaManager(str(tmp_path / "d4j"), str(tmp_path / "workspace"))
+
+    result = manager.run_tests(tmp_path, "relevant", relevant_tests=["ATest", "BTest", "CTest"])
+
+    assert commands == [["test", "-r"]]
+    assert result["success"] is True
+
+def make_defects4j(path, revision):
+    (path / ".git" / "refs" / "heads").mkdir(parents=True, exist_ok=True)
+    (path / ".git" / "HEAD").write_text("ref: refs/heads/master\n")
+    (path / ".git" / "refs" / "heads" / "master").write_text(revision + "\n")
+    return path
+
+def baseline_manager(tmp_path, monkeypatch, usable=True, **limits):
+    """JavaManager whose baseline checkouts and builds are faked and counted"""
+    manager = JavaManager(str(make_defects4j(tmp_path / "d4j", "a" * 40)), str(tmp_path / "workspace"),
+                          baseline_root=str(tmp_path / "baselines"), **limits)
+    builds = []
+
+    def checkout_fresh(pid, bug_id, buggy, dest):
+        make_tree(dest, {"src/main/A.java": "class A {}\n"})
+
+    def compile_bug(work):
+        builds.append(work)
+        return usable
+
+    monkeypatch.setattr(manager, "_checkout_fresh", checkout_fresh)
+    monkeypatch.setattr(manager, "compile_bug", compile_bug)
+    monkeypatch.setattr(manager, "export_property", lambda work, prop: "")
+    return manager, builds
+
+def bug_checkout(tmp_path, name, vid="1b"):
+    return make_tree(tmp_path / name, {".defects4j.config": f"pid=Lang\nvid={vid}\n"})
+
+def test_unusable_baseline_is_rebuilt_when_the_revision_moves(tmp_path, monkeypatch):
+    manager, builds = baseline_manager(tmp_path, monkeypatch, usable=False)
+
+    assert manager.ensure_baseline(bug_checkout(tmp_path, "a")) is None
+    assert manager.ensure_baseline(bug_checkout(tmp_path, "b")) is None
+    assert len(builds) == 1
+
+    make_defects4j(tmp_path / "d4j", "b" * 40)
+    manager.ensure_baseline(bug_checkout(tmp_path, "c"))
+    assert len(builds) == 2
+
+def test_baselines_are_evicted_once_no_checkout_holds_them(tmp_path, monkeypatch):
+    manager, builds = baseline_manager(tmp_path, monkeypatch, baseline_max_entries=1)
+    first = bug_checkout(tmp_path, "a", vid="1b")
+
+    assert manager.ensure_baseline(first)["usable"]
+    # Held by the first checkout: kept over the limit
+    manager.ensure_baseline(bug_checkout(tmp_path, "b", vid="2b"))
+    assert (tmp_path / "baselines" / "Lang_1b").exists()
+
+    shutil.rmtree(first)
+    manager.ensure_baseline(bug_checkout(tmp_path, "c", vid="3b"))
+    assert not (tmp_path / "baselines" / "Lang_1b").exists()
+    assert len(builds) == 3
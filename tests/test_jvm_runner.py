@@ -0,0 +1,71 @@
+"""Tests for the client side of the warm JVM test runner"""
+import socket
+import threading
+
+from green_agent.managers.jvm_runner import JVMRunnerPool, JVMTestRunner
+
+def fake_runner(tmp_path, reply):
+    """JVMTestRunner connected to a loopback server answering one request with reply"""
+    server = socket.create_server(("127.0.0.1", 0))
+    received = []
+
+    def serve():
+        conn, _ = server.accept()
+        with conn, conn.makefile('r') as requests:
+            for line in requests:
+                received.append(line.rstrip("\n"))
+                if line == "END\n":
+                    break
+            conn.sendall("".join(f"{line}\n" for line in reply).encode())
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    runner = JVMTestRunner("Lang", tmp_path / "runner", tmp_path / "classes")
+    runner.cwd.mkdir(parents=True)
+    runner.port = server.getsockname()[1]
+    return runner, received
+
+def make_checkout(tmp_path):
+    bug_dir = tmp_path / "Lang_1_buggy"
+    (bug_dir / "src").mkdir(parents=True)
+    (bug_dir / "build.xml").write_text("<project/>\n")
+    return bug_dir
+
+def test_run_sends_the_request_and_parses_failures(tmp_path):
+    runner, received = fake_runner(tmp_path, [
+        "FAIL org.FooTest::testA 12 expected:<1> but was:<2>",
+        "RESULT org.FooTest 3 1 40",
+        "DONE 3 1"
+    ])
+    bug_dir = make_checkout(tmp_path)
+
+    result = runner.run(bug_dir, ["/cp/classes", "", "/cp/junit.jar"], ["org.FooTest"], timeout=5)
+
+    assert received == ["RUN 5000", "CP /cp/classes", "CP /cp/junit.jar", "TEST org.FooTest", "END"]
+    assert result["success"] is False
+    assert result["failing_tests"] == ["org.FooTest::testA"]
+    assert result["total_tests"] == 3
+    # Tests resolve resources relative to the checkout
+    assert sorted(p.name for p in runner.cwd.iterdir()) == ["build.xml", "src"]
+    assert (runner.cwd / "src").resolve() == (bug_dir / "src").resolve()
+
+def test_timeout_is_reported_like_the_cli(tmp_path):
+    runner, _ = fake_runner(tmp_path, ["TIMEOUT"])
+
+    result = runner.run(make_checkout(tmp_path), [], ["org.FooTest"], timeout=5)
+
+    assert result["timeout"] is True
+    assert result["failing_tests"] == ["org.FooTest"]
+    assert runner.port is None
+
+def test_runner_errors_fall_back_to_the_cli(tmp_path):
+    runner, _ = fake_runner(tmp_path, ["ERROR java.lang.ClassNotFoundException: org.junit.runner.JUnitCore"])
+    assert runner.run(make_checkout(tmp_path), [], ["org.FooTest"], timeout=5) is None
+
+    # Connection closed before DONE
+    runner, _ = fake_runner(tmp_path / "second", [])
+    assert runner.run(make_checkout(tmp_path / "second"), [], ["org.FooTest"], timeout=5) is None
+
+def test_pool_without_javac_gives_no_runner(tmp_path):
+    pool = JVMRunnerPool(str(tmp_path / "jvm"), javac=str(tmp_path / "missing-javac"))
+    assert pool.get("Lang") is None
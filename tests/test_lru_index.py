@@ -0,0 +1,59 @@
+"""Tests for the LRU bookkeeping of on-disk caches"""
+import time
+
+from green_agent.cache.lru_index import LRUIndex
+
+MB = 1024 * 1024
+
+def test_evicts_least_recently_used_over_entry_limit(tmp_path):
+    index = LRUIndex(tmp_path, max_size_mb=100, max_entries=2)
+    assert index.touch("a", MB) == []
+    time.sleep(0.01)
+    assert index.touch("b", MB) == []
+    time.sleep(0.01)
+    index.touch("a")
+    time.sleep(0.01)
+    assert index.touch("c", MB) == ["b"]
+
+def test_evicts_until_under_size_limit(tmp_path):
+    index = LRUIndex(tmp_path, max_size_mb=2, max_entries=10)
+    index.touch("a", MB)
+    time.sleep(0.01)
+    index.touch("b", MB)
+    time.sleep(0.01)
+    assert index.touch("c", MB) == ["a"]
+
+def test_never_evicts_the_key_being_touched(tmp_path):
+    index = LRUIndex(tmp_path, max_size_mb=1, max_entries=10)
+    assert index.touch("big", 5 * MB) == []
+
+def test_index_is_shared_through_the_file(tmp_path):
+    LRUIndex(tmp_path, max_size_mb=100, max_entries=1).touch("a", MB)
+    time.sleep(0.01)
+    assert LRUIndex(tmp_path, max_size_mb=100, max_entries=1).touch("b", MB) == ["a"]
+
+def test_remove_forgets_entry(tmp_path):
+    index = LRUIndex(tmp_path, max_size_mb=100, max_entries=1)
+    index.touch("a", MB)
+    index.remove("a")
+    assert index.touch("b", MB) == []
+
+def test_held_entries_are_not_evicted_until_their_holder_is_gone(tmp_path):
+    holder = tmp_path / "workspace" / "node_modules"
+    holder.mkdir(parents=True)
+    index = LRUIndex(tmp_path / "cache", max_size_mb=100, max_entries=1)
+    index.touch("a", MB, holder=str(holder))
+    time.sleep(0.01)
+    assert index.touch("b", MB) == []
+    holder.rmdir()
+    time.sleep(0.01)
+    assert index.touch("c", MB) == ["a", "b"]
+
+def test_released_entries_can_be_evicted(tmp_path):
+    holder = tmp_path / "workspace"
+    holder.mkdir()
+    index = LRUIndex(tmp_path / "cache", max_size_mb=100, max_entries=1)
+    index.touch("a", MB, holder=str(holder))
+    index.release("a", str(holder))
+    time.sleep(0.01)
+    assert index.touch("b", MB) == ["a"]
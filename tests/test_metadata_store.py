@@ -0,0 +1,122 @@
+"""Tests for the SQLite index of bug metadata"""
+from green_agent.cache.metadata_store import BugMetadataStore, index_bugsinpy, index_bugsjs, index_defects4j
+from green_agent.managers import java_manager
+from green_agent.managers.command import CommandResult
+from green_agent.managers.java_manager import JavaManager
+
+# `defects4j info -p Lang -b 1` for the bug written by make_defects4j()
+DEFECTS4J_INFO = """Summary of configuration for Project: Lang
+--------------------------------------------------------------------------------
+    Script dir: /defects4j/framework
+      Base dir: /defects4j
+--------------------------------------------------------------------------------
+    Project ID: Lang
+       Program: commons-lang
+Number of bugs: 61
+--------------------------------------------------------------------------------
+
+Summary for Bug: Lang-1
+--------------------------------------------------------------------------------
+Revision ID (fixed version):
+def
+--------------------------------------------------------------------------------
+Bug report id:
+LANG-747
+--------------------------------------------------------------------------------
+Bug report url:
+https://issues.apache.org/jira/browse/LANG-747
+--------------------------------------------------------------------------------
+Revision date (fixed version):
+2013-07-26 01:03:52 +0000
+--------------------------------------------------------------------------------
+Root cause in triggering tests:
+ - org.apache.commons.lang3.math.NumberUtilsTest::TestLang747
+   --> junit.framework.AssertionFailedError
+--------------------------------------------------------------------------------
+List of modified sources:
+ - org.apache.commons.lang3.math.NumberUtils
+--------------------------------------------------------------------------------
+"""
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+def make_defects4j(root):
+    project = root / "framework" / "projects" / "Lang"
+    write(project / "active-bugs.csv",
+          "bug.id,revision.id.buggy,revision.id.fixed,report.id,report.url\n"
+          "1,abc,def,LANG-747,https://issues.apache.org/jira/browse/LANG-747\n")
+    write(project / "trigger_tests" / "1",
+          "--- org.apache.commons.lang3.math.NumberUtilsTest::TestLang747\n"
+          "junit.framework.AssertionFailedError\n\tat NumberUtilsTest.java:253\n")
+    write(project / "relevant_tests" / "1", "org.apache.commons.lang3.math.NumberUtilsTest\n")
+    write(project / "modified_classes" / "1.src", "org.apache.commons.lang3.math.NumberUtils\n")
+    return root
+
+def test_defects4j_records_come_from_the_data_files(tmp_path):
+    records = list(index_defects4j(make_defects4j(tmp_path / "defects4j")))
+
+    assert len(records) == 1
+    record = records[0]
+    assert (record["project"], record["bug_id"]) == ("Lang", 1)
+    assert record["trigger_tests"] == ["org.apache.commons.lang3.math.NumberUtilsTest::TestLang747"]
+    assert record["relevant_tests"] == ["org.apache.commons.lang3.math.NumberUtilsTest"]
+    assert record["modified_sources"] == ["org.apache.commons.lang3.math.NumberUtils"]
+    assert (record["revision_buggy"], record["revision_fixed"]) == ("abc", "def")
+
+def test_bugsinpy_and_bugsjs_records(tmp_path):
+    bug = tmp_path / "bugsinpy" / "projects" / "black" / "bugs" / "1"
+    write(bug / "bug.info", 'buggy_commit_id="b1"\nfixed_commit_id="f1"\ntest_file="tests/test_black.py"\n')
+    write(bug / "run_test.sh", "python -m unittest -q tests.test_black.BlackTestCase.test_expression\n")
+    write(bug / "bug_patch.txt", "--- a/black.py\n+++ b/black.py\n@@ -1 +1 @@\n-x\n+y\n")
+    write(tmp_path / "bugsjs" / "Projects" / "express" / "express_bugs.csv", "ID;Commit\n3;c3\n")
+
+    black, = index_bugsinpy(tmp_path / "bugsinpy")
+    assert black["trigger_tests"] == ["python -m unittest -q tests.test_black.BlackTestCase.test_expression"]
+    assert black["relevant_tests"] == ["tests/test_black.py"]
+    assert black["modified_sources"] == ["black.py"]
+    assert black["revision_fixed"] == "f1"
+
+    express, = index_bugsjs(tmp_path / "bugsjs")
+    assert (express["bug_id"], express["revision_fixed"]) == (3, "c3")
+
+def test_framework_is_indexed_once_per_revision(tmp_path):
+    framework = make_defects4j(tmp_path / "defects4j")
+    (framework / ".git" / "refs" / "heads").mkdir(parents=True)
+    (framework / ".git" / "HEAD").write_text("ref: refs/heads/master\n")
+    (framework / ".git" / "refs" / "heads" / "master").write_text("a" * 40)
+    calls = []
+
+    def indexer(path):
+        calls.append(path)
+        return index_defects4j(path)
+
+    store = BugMetadataStore(str(tmp_path / "bugs.db"))
+    store.ensure_indexed("defects4j", framework, indexer)
+    store.ensure_indexed("defects4j", framework, indexer)
+    assert store.get("defects4j", "Lang", 1)["trigger_tests"] == [
+        "org.apache.commons.lang3.math.NumberUtilsTest::TestLang747"]
+    assert store.get("defects4j", "Lang", 2) is None
+
+    # Another process, same revision: the index on disk is reused
+    BugMetadataStore(str(tmp_path / "bugs.db")).ensure_indexed("defects4j", framework, indexer)
+    assert len(calls) == 1
+
+    (framework / ".git" / "refs" / "heads" / "master").write_text("b" * 40)
+    BugMetadataStore(str(tmp_path / "bugs.db")).ensure_indexed("defects4j", framework, indexer)
+    assert len(calls) == 2
+
+def test_indexed_bug_info_matches_the_defects4j_cli(tmp_path, monkeypatch):
+    framework = make_defects4j(tmp_path / "defects4j")
+    monkeypatch.setattr(java_manager, "run_command",
+                        lambda args, **kwargs: CommandResult(args, 0, DEFECTS4J_INFO, "", 0.1))
+
+    from_cli = JavaManager(str(framework), str(tmp_path / "workspace")).get_bug_info("Lang", 1)
+    indexed = JavaManager(str(framework), str(tmp_path / "workspace"),
+                          metadata_store=BugMetadataStore(str(tmp_path / "bugs.db"))).get_bug_info("Lang", 1)
+
+    assert indexed == from_cli
+    assert from_cli["Bug report id"] == "LANG-747"
+    assert from_cli["Root cause in triggering tests"] == [
+        "org.apache.commons.lang3.math.NumberUtilsTest::TestLang747 --> junit.framework.AssertionFailedError"]
@@ -0,0 +1,82 @@
+"""Tests for diffing a candidate's test outcomes against the buggy and fixed baselines"""
+from green_agent.cache.outcome_cache import OutcomeCache, diff_outcomes, normalize_outcomes
+from green_agent.managers.test_output import FAILED, PASSED
+from green_agent.managers.tiered import run_tiered
+
+BASELINE = {
+    "buggy": {"org.x.FooTest::testBug": FAILED, "org.x.FooTest::testOk": PASSED, "org.x.BarTest::testOk": PASSED},
+    "fixed": {"org.x.FooTest::testBug": PASSED, "org.x.FooTest::testOk": PASSED, "org.x.BarTest::testOk": PASSED}
+}
+
+def test_method_level_records():
+    diff = diff_outcomes(BASELINE, [
+        {"name": "org.x.FooTest::testBug", "outcome": PASSED},
+        {"name": "org.x.BarTest::testOk", "outcome": FAILED}
+    ])
+
+    assert diff["newly_passing"] == ["org.x.FooTest::testBug"]
+    assert diff["newly_failing"] == ["org.x.BarTest::testOk"]
+    assert diff["regressions"] == ["org.x.BarTest::testOk"]
+    assert diff["fixes_bug"] is True
+
+def test_class_level_records_cover_their_methods():
+    # The relevant tier reports whole classes, baselines list methods
+    diff = diff_outcomes(BASELINE, [{"name": "org.x.FooTest", "outcome": PASSED}])
+
+    assert diff["newly_passing"] == ["org.x.FooTest::testBug"]
+    assert diff["fixes_bug"] is True
+
+def test_method_records_override_their_class():
+    normalized = normalize_outcomes(
+        {"org.x.FooTest": PASSED, "org.x.FooTest::testBug": FAILED},
+        set(BASELINE["buggy"])
+    )
+
+    assert normalized["org.x.FooTest::testBug"] == FAILED
+    assert normalized["org.x.FooTest::testOk"] == PASSED
+    assert "org.x.BarTest::testOk" not in normalized
+
+def test_repaired_tests_not_run_leave_fixes_bug_unknown():
+    diff = diff_outcomes(BASELINE, [{"name": "org.x.BarTest::testOk", "outcome": PASSED}])
+    assert diff["fixes_bug"] is None
+
+def test_tiered_runs_keep_the_records_of_earlier_tiers():
+    tiers = {
+        "trigger": {"success": True, "failing_tests": [],
+                    "test_records": [{"name": "org.x.FooTest::testBug", "outcome": PASSED}]},
+        "relevant": {"success": False, "failing_tests": ["org.x.BarTest::testOk"],
+                     "test_records": [{"name": "org.x.BarTest::testOk", "outcome": FAILED}]}
+    }
+    result = run_tiered(tiers.get)
+
+    diff = diff_outcomes(BASELINE, result["test_records"])
+    assert diff["fixes_bug"] is True
+    assert diff["regressions"] == ["org.x.BarTest::testOk"]
+
+BUG = {'framework': 'defects4j', 'project': 'Lang', 'bug_id': 1}
+
+def counting_runs(records):
+    runs = []
+
+    def run_version(buggy):
+        runs.append(buggy)
+        return {"test_records": records}
+
+    return run_version, runs
+
+def test_baselines_are_computed_once(tmp_path):
+    cache = OutcomeCache(str(tmp_path / "baselines"))
+    run_version, runs = counting_runs([{"name": "org.x.FooTest::testOk", "outcome": PASSED}])
+
+    first = cache.get(BUG, tmp_path, run_version)
+    assert cache.get(BUG, tmp_path, run_version) == first
+    assert first["buggy"] == {"org.x.FooTest::testOk": PASSED}
+    assert runs == [True, False]
+
+def test_runs_without_per_test_results_are_not_repeated(tmp_path):
+    cache = OutcomeCache(str(tmp_path / "baselines"))
+    run_version, runs = counting_runs(None)
+
+    assert cache.get(BUG, tmp_path, run_version) is None
+    assert cache.get(BUG, tmp_path, run_version) is None
+    assert runs == [True, False]
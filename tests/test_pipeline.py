@@ -0,0 +1,97 @@
+"""Tests for the prefetching pipeline"""
+import threading
+import time
+
+from green_agent.evaluator.pipeline import PrefetchPipeline
+
+def test_bugs_are_yielded_in_order_with_their_errors():
+    def prepare(bug_index):
+        if bug_index == 2:
+            raise RuntimeError("checkout failed")
+        return {"bug_index": bug_index}
+
+    results = list(PrefetchPipeline(prepare, lookahead=2).run([0, 1, 2, 3]))
+
+    assert [bug_index for bug_index, _, _ in results] == [0, 1, 2, 3]
+    assert results[1][1] == {"bug_index": 1}
+    assert results[2][1] is None and isinstance(results[2][2], RuntimeError)
+
+def test_next_bugs_are_prepared_while_the_current_one_is_consumed():
+    started = []
+    lock = threading.Lock()
+
+    def prepare(bug_index):
+        with lock:
+            started.append(bug_index)
+        return bug_index
+
+    run = PrefetchPipeline(prepare, lookahead=2).run([0, 1, 2, 3])
+    assert next(run)[0] == 0
+    # While bug 0 is evaluated, bugs 1 and 2 are (being) prepared
+    assert next(run)[0] == 1
+    with lock:
+        assert {1, 2} <= set(started)
+    assert [bug_index for bug_index, _, _ in run] == [2, 3]
+
+def test_a_repeated_bug_is_not_prepared_twice_at_once():
+    active = set()
+    overlaps = []
+    lock = threading.Lock()
+
+    def prepare(bug_index):
+        with lock:
+            if bug_index in active:
+                overlaps.append(bug_index)
+            active.add(bug_index)
+        time.sleep(0.02)
+        with lock:
+            active.discard(bug_index)
+        return bug_index
+
+    assert [i for i, _, _ in PrefetchPipeline(prepare, lookahead=3).run([5, 5, 5, 6])] == [5, 5, 5, 6]
+    assert overlaps == []
+
+def test_without_lookahead_bugs_are_prepared_one_at_a_time():
+    order = []
+    for bug_index, _, _ in PrefetchPipeline(lambda i: order.append(("prepare", i)), lookahead=0).run([0, 1]):
+        order.append(("evaluate", bug_index))
+
+    assert order == [("prepare", 0), ("evaluate", 0), ("prepare", 1), ("evaluate", 1)]
+
+def test_bugs_prepared_ahead_are_released_when_the_run_stops_early():
+    started = set()
+
+    def prepare(bug_index):
+        started.add(bug_index)
+        return {"bug_index": bug_index}
+
+    released = []
+    run = PrefetchPipeline(prepare, lookahead=2, release=released.append).run([0, 1, 2, 3])
+
+    assert next(run)[0] == 0
+    deadline = time.time() + 5
+    while not {1, 2} <= started and time.time() < deadline:
+        time.sleep(0.01)
+    run.close()
+
+    # Bug 0 was handed out; the ones prefetched behind it were not
+    assert sorted(p["bug_index"] for p in released) == [1, 2]
+
+def test_failed_preparations_are_not_released():
+    done = set()
+
+    def prepare(bug_index):
+        done.add(bug_index)
+        if bug_index in (1, 2):
+            raise RuntimeError("checkout failed")
+        return {"bug_index": bug_index}
+
+    released = []
+    run = PrefetchPipeline(prepare, lookahead=2, release=released.append).run([0, 1, 2])
+    next(run)
+    deadline = time.time() + 5
+    while not {1, 2} <= done and time.time() < deadline:
+        time.sleep(0.01)
+    run.close()
+
+    assert released == []
@@ -0,0 +1,175 @@
+"""Tests for the SQLite store of assessments and results"""
+import sqlite3
+
+import pytest
+
+from green_agent.api.results_store import ResultsStore
+
+def make_result(assessment_id, agent_id, bug_index, total=0.5, correctness=0.5, fix_submitted=True,
+                timestamp="2026-01-01T00:00:00+00:00"):
+    return {
+        "assessment_id": assessment_id, "agent_id": agent_id, "bug_index": bug_index,
+        "bug_framework": "python", "total_score": total, "correctness_score": correctness,
+        "code_quality_score": 0.5, "efficiency_score": 0.5, "minimal_change_score": 0.5,
+        "execution_time_seconds": 10.0, "assessment_timestamp": timestamp, "reproducible": True,
+        "fix_submitted": fix_submitted
+    }
+
+def test_pending_bugs_carry_their_fixes(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    fixes = [{"fixed_files": {"a.py": "x = 1\n"}, "patch": None}, {"fixed_files": {}, "patch": "--- a\n"}]
+    store.create_assessment("a1", "agent", [3, 3], "2026-01-01", fixes)
+
+    assert store.pending_bugs("a1") == [(0, 3, fixes[0]), (1, 3, fixes[1])]
+    assert store.add_result(make_result("a1", "agent", 3), position=1) == 1
+    assert store.pending_bugs("a1") == [(0, 3, fixes[0])]
+
+def test_dry_run_results_stay_off_the_leaderboard(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.create_assessment("dry", "agent", [0], "2026-01-01")
+    assert store.pending_bugs("dry") == [(0, 0, None)]
+
+    version = store.leaderboard_version()[0]
+    store.add_result(make_result("dry", "agent", 0, fix_submitted=False), position=0)
+
+    assert store.leaderboard_version()[0] == version
+    assert store.leaderboard()[2] == []
+    assert store.results("dry")[0]["fix_submitted"] is False
+
+def test_results_from_before_the_flag_are_treated_as_dry_runs(tmp_path):
+    db_path = tmp_path / "results.db"
+    ResultsStore(str(db_path))
+    # Recreate the results table as earlier versions wrote it, with one scored row
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE results")
+    conn.execute(
+        "CREATE TABLE results (id INTEGER PRIMARY KEY AUTOINCREMENT, assessment_id TEXT NOT NULL, "
+        "agent_id TEXT NOT NULL, bug_index INTEGER NOT NULL, bug_framework TEXT NOT NULL, "
+        "total_score REAL NOT NULL, correctness_score REAL NOT NULL, code_quality_score REAL NOT NULL, "
+        "efficiency_score REAL NOT NULL, minimal_change_score REAL NOT NULL, "
+        "execution_time_seconds REAL NOT NULL, assessment_timestamp TEXT NOT NULL, reproducible INTEGER NOT NULL)"
+    )
+    conn.execute("INSERT INTO results VALUES (NULL, 'old', 'agent', 0, 'python', 1, 1, 1, 1, 1, 5, '2025', 1)")
+    conn.execute("INSERT INTO agent_stats VALUES ('agent', 1, 1.0, 1, 5.0, '2025')")
+    conn.commit()
+    conn.close()
+
+    store = ResultsStore(str(db_path))
+    assert store.results("old")[0]["fix_submitted"] is False
+    assert store.leaderboard()[2] == []
+
+def test_assessments_are_claimed_oldest_first_and_requeued_after_a_restart(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.create_assessment("second", "agent", [0], "2026-01-02")
+    store.create_assessment("first", "agent", [0], "2026-01-01")
+
+    assert store.claim_assessment() == ("first", "agent")
+    assert store.get_assessment("first")["status"] == "running"
+
+    # A new process finds it running and queues it again
+    restarted = ResultsStore(str(tmp_path / "results.db"))
+    assert restarted.requeue_interrupted() == 1
+    assert restarted.claim_assessment() == ("first", "agent")
+    assert restarted.claim_assessment() == ("second", "agent")
+    assert restarted.claim_assessment() is None
+
+def test_finished_assessments_keep_their_final_status(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.create_assessment("a1", "agent", [0, 1], "2026-01-01")
+    store.claim_assessment()
+
+    assert store.finish_assessment("a1", "cancelled", "2026-01-01T01:00:00")
+    assert not store.finish_assessment("a1", "completed", "2026-01-01T02:00:00")
+    info = store.get_assessment("a1")
+    assert info["status"] == "cancelled"
+    assert info["completed_at"] == "2026-01-01T01:00:00"
+
+def test_completed_assessment_reports_full_progress(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.create_assessment("a1", "agent", [4, 5], "2026-01-01")
+    store.add_result(make_result("a1", "agent", 4), position=0)
+    assert store.get_assessment("a1")["progress"] == {"completed": 1, "total": 2}
+
+    store.finish_assessment("a1", "completed", "2026-01-01T01:00:00")
+    assert store.get_assessment("a1")["progress"] == {"completed": 2, "total": 2}
+    assert [r["bug_index"] for r in store.results("a1")] == [4]
+
+def test_leaderboard_aggregates_match_the_results(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.create_assessment("a1", "alice", [0, 1, 2], "2026-01-01")
+    store.create_assessment("b1", "bob", [0], "2026-01-01")
+    store.add_result(make_result("a1", "alice", 0, total=0.9, correctness=1.0, timestamp="2026-01-01T01"), 0)
+    store.add_result(make_result("a1", "alice", 1, total=0.3, correctness=0.2, timestamp="2026-01-01T03"), 1)
+    store.add_result(make_result("a1", "alice", 2, total=0.6, correctness=0.9, timestamp="2026-01-01T02"), 2)
+    store.add_result(make_result("b1", "bob", 0, total=0.8, correctness=0.5), 0)
+
+    version, updated_at, rows = store.leaderboard()
+
+    assert version == 5  # One bump per result after the initial version
+    assert updated_at == "2026-01-01T00:00:00+00:00"
+    assert [row["agent_id"] for row in rows] == ["bob", "alice"]
+    alice = rows[1]
+    assert alice["total_assessments"] == 3
+    assert alice["avg_score"] == pytest.approx(0.6)
+    assert alice["bugs_fixed"] == 2
+    assert alice["last_assessment"] == "2026-01-01T03"
+
+def test_aggregates_are_rebuilt_for_databases_without_them(tmp_path):
+    db_path = tmp_path / "results.db"
+    store = ResultsStore(str(db_path))
+    store.create_assessment("a1", "alice", [0, 1], "2026-01-01")
+    store.add_result(make_result("a1", "alice", 0, total=0.2), 0)
+    store.add_result(make_result("a1", "alice", 1, total=0.4), 1)
+    expected = store.leaderboard()[2]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM agent_stats")
+    conn.execute("DELETE FROM leaderboard_version")
+    conn.commit()
+    conn.close()
+
+    assert ResultsStore(str(db_path)).leaderboard()[2] == expected
+
+def fill(store, count):
+    store.create_assessment("a1", "alice", list(range(count)), "2026-01-01")
+    for n in range(count):
+        agent = "alice" if n % 2 == 0 else "bob"
+        store.add_result(make_result("a1", agent, n, timestamp=f"2026-01-{n + 1:02d}"), n)
+
+def test_cursor_pages_cover_every_result_once(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    fill(store, 7)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.query_results(cursor=cursor, limit=3)
+        seen.extend(r["bug_index"] for r in page)
+        if cursor is None:
+            break
+    assert seen == list(range(7))
+
+def test_descending_pages_and_filters(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    fill(store, 7)
+
+    page, cursor = store.query_results(agent_id="alice", limit=2, descending=True)
+    assert [r["bug_index"] for r in page] == [6, 4]
+    page, cursor = store.query_results(agent_id="alice", limit=2, descending=True, cursor=cursor)
+    assert [r["bug_index"] for r in page] == [2, 0]
+    assert cursor is None
+
+    page, _ = store.query_results(since="2026-01-02", until="2026-01-04")
+    assert [r["bug_index"] for r in page] == [1, 2]
+
+def test_last_full_page_has_no_next_cursor(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    fill(store, 4)
+
+    page, cursor = store.query_results(limit=4)
+    assert len(page) == 4 and cursor is None
+
+def test_iter_results_reads_every_page(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    fill(store, 5)
+
+    assert [r["bug_index"] for r in store.iter_results(page_size=2, agent_id="bob")] == [1, 3]
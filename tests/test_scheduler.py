@@ -0,0 +1,90 @@
+"""Tests for the resource budget and cancellation of the evaluation scheduler"""
+import sys
+import threading
+import time
+
+import pytest
+
+from green_agent.evaluator import scheduler as scheduler_module
+from green_agent.evaluator.scheduler import EvaluationScheduler, _Job
+from green_agent.managers.command import CommandCancelled, run_command
+
+LANGUAGES = {
+    "java": {"cpus": 2, "memory_mb": 2048, "max_concurrent": 1},
+    "python": {"cpus": 1, "memory_mb": 512}
+}
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(**kwargs):
+        scheduler = EvaluationScheduler("unused.yaml", [], languages=LANGUAGES, **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    # No job was started, so no worker process exists
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+def queue(scheduler, *languages):
+    jobs = [_Job(bug_index, language, {}, cost=scheduler._cost(language)) for bug_index, language in enumerate(languages)]
+    scheduler._queue.extend(jobs)
+    return jobs
+
+def test_smaller_jobs_fill_the_cores_a_capped_language_leaves(make_scheduler):
+    scheduler = make_scheduler(cpu_cores=4)
+    java, blocked, first, second = queue(scheduler, "java", "java", "python", "python")
+
+    assert scheduler._take_runnable() == [java, first, second]
+    assert list(scheduler._queue) == [blocked]
+    assert scheduler._used_cpus == 4
+
+def test_memory_budget_limits_concurrent_jobs(make_scheduler):
+    scheduler = make_scheduler(cpu_cores=8, memory_mb=1024)
+    jobs = queue(scheduler, "python", "python", "python")
+
+    assert scheduler._take_runnable() == jobs[:2]
+
+def test_job_larger_than_the_budget_fits_an_idle_scheduler(make_scheduler):
+    scheduler = make_scheduler(cpu_cores=1, memory_mb=256)
+    java, python = queue(scheduler, "java", "python")
+
+    assert scheduler._fits(java)
+    assert scheduler._take_runnable() == [java]
+    assert not scheduler._fits(python)
+
+def test_cancel_drops_a_queued_job(make_scheduler):
+    scheduler = make_scheduler(cpu_cores=2)
+    java, queued = queue(scheduler, "java", "java")
+    scheduler._take_runnable()
+
+    assert scheduler.cancel(queued.future)
+    assert scheduler._take_runnable() == []
+    assert not scheduler._queue
+
+def test_cancel_of_a_job_being_started_is_passed_on_to_its_flag(make_scheduler):
+    scheduler = make_scheduler(cpu_cores=2)
+    java, = queue(scheduler, "java")
+    scheduler._take_runnable()
+
+    # Started, but not handed to the pool yet: the flag set when it is
+    assert scheduler.cancel(java.future)
+    assert java.cancel_requested
+    assert not java.future.cancelled()
+
+class SleepingAgent:
+    def evaluate_fix(self, bug_index, **kwargs):
+        run_command([sys.executable, "-c", "import time; time.sleep(30)"])
+
+def test_worker_stops_its_evaluation_once_the_flag_is_set(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "_worker_agent", SleepingAgent())
+    monkeypatch.setattr(scheduler_module, "CANCEL_POLL_SECONDS", 0.05)
+    flag = threading.Event()
+    threading.Timer(0.2, flag.set).start()
+
+    start = time.time()
+    with pytest.raises(CommandCancelled):
+        scheduler_module._evaluate_in_worker(0, {}, None, flag)
+    assert time.time() - start < 5
@@ -0,0 +1,111 @@
+"""Tests for the streaming parsers of test runner output"""
+import pytest
+
+from green_agent.managers.test_output import (
+    FAILED, PASSED, SKIPPED, Defects4JParser, MochaParser, PytestParser, TestOutputParser
+)
+
+def feed(parser, text, stream="stdout"):
+    return [parser.feed(stream, line) for line in text.splitlines()]
+
+def outcomes(parser):
+    return {name: record.outcome for name, record in parser.records.items()}
+
+def test_base_parser_requires_parse_line():
+    with pytest.raises(TypeError):
+        TestOutputParser()
+
+def test_defects4j_failures_and_passing_tests_from_all_tests(tmp_path):
+    parser = Defects4JParser()
+    feed(parser, "Running ant (compile.tests)... OK\nFailing tests: 1\n  - org.x.FooTest::testBar\n")
+    (tmp_path / "all_tests").write_text("testBar(org.x.FooTest)\ntestBaz(org.x.FooTest)\n")
+    parser.finish(tmp_path)
+
+    assert outcomes(parser) == {"org.x.FooTest::testBar": FAILED, "org.x.FooTest::testBaz": PASSED}
+    assert parser.summary()["total_tests"] == 2
+
+def test_defects4j_ignores_dashes_after_the_failure_list():
+    parser = Defects4JParser()
+    feed(parser, "Failing tests: 0\nBUILD SUCCESSFUL\n  - not a test\n")
+    assert parser.records == {}
+
+def test_pytest_verbose_summary_durations_and_totals():
+    parser = PytestParser()
+    feed(parser, "\n".join([
+        "tests/test_a.py::test_one PASSED",
+        "tests/test_a.py::test_two FAILED",
+        "tests/test_a.py::test_three SKIPPED",
+        "0.52s call     tests/test_a.py::test_one",
+        "FAILED tests/test_a.py::test_two - AssertionError",
+        "===== 1 failed, 1 passed, 1 skipped in 0.61s ====="
+    ]))
+
+    assert outcomes(parser) == {
+        "tests/test_a.py::test_one": PASSED,
+        "tests/test_a.py::test_two": FAILED,
+        "tests/test_a.py::test_three": SKIPPED
+    }
+    assert parser.records["tests/test_a.py::test_one"].duration == 0.52
+    assert parser.summary()["total_tests"] == 2
+
+def test_pytest_fail_fast_stops_at_the_first_failure():
+    parser = PytestParser(fail_fast=True)
+    assert feed(parser, "a.py::t1 PASSED\na.py::t2 FAILED\na.py::t3 PASSED\n") == [False, True, False]
+
+def test_pytest_run_stopped_before_its_totals_counts_the_tests_that_ran():
+    # pytest -x -q: progress characters, then the failure; killed before the totals
+    parser = PytestParser(fail_fast=True)
+    stops = feed(parser, "tests/test_a.py ...s.F\nFAILED tests/test_a.py::test_six - AssertionError\n")
+    assert stops == [False, True]
+    assert parser.failing_tests == ["tests/test_a.py::test_six"]
+    assert parser.summary()["total_tests"] == 5
+
+def test_pytest_quiet_totals_count():
+    parser = PytestParser()
+    feed(parser, "..F                                                    [100%]\n1 failed, 2 passed in 0.05s\n")
+    assert parser.summary()["total_tests"] == 3
+
+def test_unittest_output_and_totals_add_up():
+    parser = PytestParser()
+    feed(parser, "\n".join([
+        "test_one (pkg.tests.TestX) ... ok",
+        "test_two (pkg.tests.TestX.test_two) ... FAIL",
+        "Ran 2 tests in 0.01s",
+        "Ran 3 tests in 0.02s"
+    ]))
+
+    assert outcomes(parser) == {"pkg.tests.TestX.test_one": PASSED, "pkg.tests.TestX.test_two": FAILED}
+    assert parser.summary()["total_tests"] == 5
+
+def test_mocha_spec_reporter_nests_suites_and_skips_failure_details():
+    parser = MochaParser()
+    feed(parser, "\n".join([
+        "",
+        "  Parser",
+        "    tokens",
+        "      ✓ reads words (12ms)",
+        "      1) reads numbers",
+        "      - reads dates",
+        "",
+        "  1 passing (20ms)",
+        "  1 failing",
+        "  1 pending",
+        "",
+        "  1) Parser tokens reads numbers:",
+    ]))
+
+    assert outcomes(parser) == {
+        "Parser tokens reads words": PASSED,
+        "Parser tokens reads numbers": FAILED,
+        "Parser tokens reads dates": SKIPPED
+    }
+    assert parser.records["Parser tokens reads words"].duration == 0.012
+    assert parser.summary()["total_tests"] == 2
+
+def test_mocha_tap_output():
+    parser = MochaParser()
+    feed(parser, "1..3\nok 1 - adds # time=5ms\nnot ok 2 - subtracts\nok 3 - divides # SKIP later\n")
+
+    assert outcomes(parser) == {"adds": PASSED, "subtracts": FAILED, "divides": SKIPPED}
+    assert parser.records["adds"].duration == 0.005
+    assert parser.summary()["total_tests"] == 3
@@ -0,0 +1,39 @@
+"""Tests for tiered fail-fast test execution"""
+from green_agent.managers.tiered import run_tiered
+
+def tier_results(**results):
+    ran = []
+
+    def run_tier(tier):
+        ran.append(tier)
+        return results.get(tier)
+
+    return run_tier, ran
+
+def test_stops_at_the_first_failing_tier():
+    run_tier, ran = tier_results(
+        trigger={"success": True, "output": "t", "failing_tests": []},
+        relevant={"success": False, "output": "r", "failing_tests": ["A::x"]},
+        all={"success": True, "output": "a", "failing_tests": []}
+    )
+
+    result = run_tiered(run_tier)
+
+    assert ran == ["trigger", "relevant"]
+    assert result["tier"] == "relevant"
+    assert result["tiers"] == {"trigger": True, "relevant": False}
+    assert result["failing_tests"] == ["A::x"]
+    assert result["output"] == "=== trigger tests ===\nt\n=== relevant tests ===\nr"
+
+def test_tiers_without_tests_are_skipped():
+    run_tier, ran = tier_results(all={"success": True, "output": "", "failing_tests": []})
+
+    result = run_tiered(run_tier)
+
+    assert ran == ["trigger", "relevant", "all"]
+    assert result["success"] is True
+    assert result["tiers"] == {"all": True}
+
+def test_no_tier_with_tests_is_a_failure():
+    run_tier, _ = tier_results()
+    assert run_tiered(run_tier) == {"success": False, "output": "", "failing_tests": [], "tier": None, "tiers": {}}
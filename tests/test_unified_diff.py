@@ -0,0 +1,128 @@
+"""Tests for parsing and applying unified diffs in process"""
+import difflib
+import os
+
+import pytest
+
+from green_agent.evaluator import unified_diff
+from green_agent.evaluator.unified_diff import PatchError, apply_contents, apply_patch, parse_patch
+
+ORIGINAL = "".join(f"line {n}\n" for n in range(1, 31))
+
+def make_patch(original, fixed, path="a.txt"):
+    return "".join(difflib.unified_diff(original.splitlines(True), fixed.splitlines(True),
+                                        f"a/{path}", f"b/{path}"))
+
+def test_applies_exactly(tmp_path):
+    (tmp_path / "a.txt").write_text(ORIGINAL)
+    fixed = ORIGINAL.replace("line 10\n", "ten\n")
+
+    result = apply_patch(tmp_path, make_patch(ORIGINAL, fixed))
+
+    assert result.success and result.changed == ["a.txt"] and result.offsets == []
+    assert (tmp_path / "a.txt").read_text() == fixed
+
+def test_applies_at_an_offset(tmp_path):
+    patch = make_patch(ORIGINAL, ORIGINAL.replace("line 20\n", "twenty\n"))
+    (tmp_path / "a.txt").write_text("new 1\nnew 2\nnew 3\n" + ORIGINAL)
+
+    result = apply_patch(tmp_path, patch)
+
+    assert result.success
+    assert result.offsets == [("a.txt", 1, 3, 0)]
+    assert "twenty\n" in (tmp_path / "a.txt").read_text()
+
+def test_applies_with_fuzz(tmp_path):
+    patch = make_patch(ORIGINAL, ORIGINAL.replace("line 15\n", "fifteen\n"))
+    # The outermost context lines no longer match
+    (tmp_path / "a.txt").write_text(ORIGINAL.replace("line 12\n", "changed 12\n").replace("line 18\n", "changed 18\n"))
+
+    result = apply_patch(tmp_path, patch)
+
+    assert result.success
+    assert result.offsets[0][3] == 1
+    text = (tmp_path / "a.txt").read_text()
+    assert "fifteen\n" in text and "changed 12\n" in text and "changed 18\n" in text
+
+def test_mismatched_context_changes_nothing(tmp_path):
+    (tmp_path / "a.txt").write_text(ORIGINAL)
+    (tmp_path / "b.txt").write_text(ORIGINAL)
+    patch = (make_patch(ORIGINAL, ORIGINAL.replace("line 5\n", "five\n"), "a.txt")
+             + make_patch("other\n", "changed\n", "b.txt"))
+
+    result = apply_patch(tmp_path, patch)
+
+    assert not result.success
+    assert [(f.path, f.reason) for f in result.failures] == [("b.txt", "Context does not match")]
+    assert (tmp_path / "a.txt").read_text() == ORIGINAL
+
+def test_missing_newline_at_end_of_file(tmp_path):
+    (tmp_path / "a.txt").write_text("one\ntwo")
+    patch = "--- a/a.txt\n+++ b/a.txt\n@@ -1,2 +1,2 @@\n one\n-two\n\\ No newline at end of file\n+three\n"
+
+    hunk = parse_patch(patch)[0].hunks[0]
+    assert not hunk.old_eof_newline and hunk.new_eof_newline
+
+    assert apply_patch(tmp_path, patch).success
+    assert (tmp_path / "a.txt").read_text() == "one\nthree\n"
+
+def test_creates_and_deletes_files(tmp_path):
+    (tmp_path / "old.txt").write_text("gone\n")
+    patch = ("--- /dev/null\n+++ b/pkg/new.txt\n@@ -0,0 +1,2 @@\n+hello\n+world\n"
+             "--- a/old.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-gone\n")
+
+    result = apply_patch(tmp_path, patch)
+
+    assert result.success and sorted(result.changed) == ["old.txt", "pkg/new.txt"]
+    assert (tmp_path / "pkg" / "new.txt").read_text() == "hello\nworld\n"
+    assert not (tmp_path / "old.txt").exists()
+
+def test_git_renames_are_reported(tmp_path):
+    (tmp_path / "old.txt").write_text(ORIGINAL)
+    patch = ("diff --git a/old.txt b/new.txt\nsimilarity index 100%\n"
+             "rename from old.txt\nrename to new.txt\n")
+
+    result = apply_patch(tmp_path, patch)
+
+    assert not result.success
+    assert result.failures[0].path == "new.txt"
+    assert "rename of old.txt to new.txt" in result.failures[0].reason
+    assert (tmp_path / "old.txt").read_text() == ORIGINAL
+
+def test_git_rename_with_changes_is_one_file_patch():
+    patch = ("diff --git a/old.txt b/new.txt\nsimilarity index 90%\nrename from old.txt\nrename to new.txt\n"
+             "--- a/old.txt\n+++ b/new.txt\n@@ -1 +1 @@\n-x\n+y\n")
+
+    [file_patch] = parse_patch(patch)
+    assert file_patch.git_operation == "rename"
+    assert len(file_patch.hunks) == 1
+
+def test_malformed_patches_raise():
+    with pytest.raises(PatchError):
+        parse_patch("@@ -1 +1 @@\n-x\n+y\n")
+    with pytest.raises(PatchError):
+        parse_patch("--- a/a.txt\n+++ b/a.txt\n@@ -1,3 +1,3 @@\n a\n-b\n")
+
+def test_paths_outside_the_checkout_are_rejected(tmp_path):
+    result = apply_contents(tmp_path, {"../escape.txt": "x"})
+    assert not result.success
+    assert not (tmp_path.parent / "escape.txt").exists()
+
+def test_failed_write_restores_files_and_leaves_no_temp_files(tmp_path, monkeypatch):
+    (tmp_path / "a.txt").write_text("a\n")
+    (tmp_path / "b.txt").write_text("b\n")
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if str(dst).endswith("b.txt"):
+            raise OSError("disk full")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(unified_diff.os, "replace", replace)
+    result = apply_contents(tmp_path, {"a.txt": "A\n", "b.txt": "B\n", "c.txt": "C\n"})
+
+    assert not result.success and result.changed == []
+    assert result.failures[0].path == "b.txt"
+    assert (tmp_path / "a.txt").read_text() == "a\n"
+    assert (tmp_path / "b.txt").read_text() == "b\n"
+    assert sorted(os.listdir(tmp_path)) == ["a.txt", "b.txt"]
@@ -0,0 +1,41 @@
+"""Tests for the sharing rules of pooled BugsInPy virtualenvs"""
+from green_agent.cache import venv_pool
+from green_agent.cache.venv_pool import VenvPool
+
+def make_checkout(root, name, setup=False):
+    bug_dir = root / name
+    bug_dir.mkdir()
+    (bug_dir / "bugsinpy_bug.info").write_text('python_version="3.8.3"\n')
+    (bug_dir / "bugsinpy_requirements.txt").write_text("pytest==6.2.5\n")
+    if setup:
+        (bug_dir / "bugsinpy_setup.sh").write_text("pip install -e .\n")
+    return bug_dir
+
+def test_plain_checkouts_share_an_instance(tmp_path):
+    pool = VenvPool(str(tmp_path / "pool"))
+    first = make_checkout(tmp_path, "a")
+    second = make_checkout(tmp_path, "b")
+    fingerprint = pool.fingerprint(first)
+    assert pool._claim(fingerprint, first, False) == pool._claim(fingerprint, second, False)
+
+def test_exclusively_used_instance_is_not_handed_to_plain_checkouts(tmp_path):
+    pool = VenvPool(str(tmp_path / "pool"))
+    setup = make_checkout(tmp_path, "setup", setup=True)
+    fingerprint = pool.fingerprint(setup)
+    dirty = pool._claim(fingerprint, setup, True)
+    pool.release(setup)
+
+    plain = make_checkout(tmp_path, "plain")
+    assert pool._claim(fingerprint, plain, False) != dirty
+
+    # Another setup-script checkout may still reuse it once it is free
+    other_setup = make_checkout(tmp_path, "other", setup=True)
+    assert pool._claim(fingerprint, other_setup, True) == dirty
+
+def test_base_requirements_are_part_of_the_fingerprint(tmp_path, monkeypatch):
+    pool = VenvPool(str(tmp_path / "pool"))
+    bug_dir = make_checkout(tmp_path, "a")
+    before = pool.fingerprint(bug_dir)
+
+    monkeypatch.setattr(venv_pool, "BASE_REQUIREMENTS", venv_pool.BASE_REQUIREMENTS + ["pytest-timeout"])
+    assert pool.fingerprint(bug_dir) != before
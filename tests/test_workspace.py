@@ -0,0 +1,79 @@
+"""Tests for the workspace allocator"""
+import threading
+import time
+
+import pytest
+
+from green_agent.managers.workspace import WorkspaceAllocator
+
+@pytest.fixture
+def make_allocator(tmp_path):
+    allocators = []
+
+    def make(**kwargs):
+        allocator = WorkspaceAllocator(str(tmp_path / "workspace"), **kwargs)
+        allocators.append(allocator)
+        return allocator
+
+    yield make
+    for allocator in allocators:
+        allocator.shutdown()
+
+def test_every_allocation_gets_its_own_directory(make_allocator):
+    allocator = make_allocator()
+    first = allocator.allocate("Lang", 1)
+    second = allocator.allocate("Lang", 1)
+
+    assert first != second
+    assert first.name.startswith("Lang_1_buggy-")
+    assert allocator.allocate("Lang", 1, buggy=False).name.startswith("Lang_1_fixed-")
+    assert not first.exists()
+
+def test_released_checkouts_are_moved_aside_and_reaped(make_allocator):
+    allocator = make_allocator(reap_interval=3600)
+    bug_dir = allocator.allocate("black", 2)
+    (bug_dir / "src").mkdir(parents=True)
+    (bug_dir / "src" / "black.py").write_text("x = 1\n")
+
+    allocator.release(bug_dir)
+    assert not bug_dir.exists()
+    allocator.reap()
+    assert list(allocator.trash.iterdir()) == []
+
+def test_trash_left_by_an_earlier_run_is_deleted(tmp_path, make_allocator):
+    leftover = tmp_path / "workspace" / ".trash" / "Lang_1_buggy-0000"
+    leftover.mkdir(parents=True)
+    (leftover / "A.java").write_text("class A {}\n")
+
+    make_allocator()
+    deadline = time.time() + 5
+    while leftover.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert not leftover.exists()
+
+def test_allocate_waits_for_the_reaper_when_over_quota(make_allocator):
+    allocator = make_allocator(quota_mb=1, reap_interval=3600, quota_wait=5)
+    bug_dir = allocator.allocate("Lang", 1)
+    bug_dir.mkdir()
+    (bug_dir / "big.jar").write_bytes(b"\0" * (2 * 1024 * 1024))
+    allocator.reap()
+
+    allocated = []
+    waiter = threading.Thread(target=lambda: allocated.append(allocator.allocate("Lang", 2)))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+
+    allocator.release(bug_dir)
+    waiter.join(5)
+    assert allocated and allocated[0].name.startswith("Lang_2_buggy-")
+
+def test_allocate_gives_up_when_the_quota_stays_exceeded(make_allocator):
+    allocator = make_allocator(quota_mb=1, reap_interval=3600, quota_wait=0.1)
+    bug_dir = allocator.allocate("Lang", 1)
+    bug_dir.mkdir()
+    (bug_dir / "big.jar").write_bytes(b"\0" * (2 * 1024 * 1024))
+    allocator.reap()
+
+    with pytest.raises(Exception, match="over its quota"):
+        allocator.allocate("Lang", 2)